@@ -1,25 +1,44 @@
+import os
+import sys
 import tkinter as tk
 from tkinter import ttk, messagebox
-from batterpy.report_generator import generate_battery_report, parse_xml, get_report_information, get_system_information, get_battery_information, get_recent_usage
+from batterpy.background import ReportWorker
 from batterpy.calculations import calculate_battery_health, calculate_battery_degradation
-from batterpy.display_functions import display_report_information, display_system_information, display_battery_information, display_recent_usage
-from batterpy.graph_generator import create_graphs, update_graphs
+from batterpy.display_functions import configure_display_logging, display_report_information, display_system_information, display_battery_information, display_recent_usage
+from batterpy.usage_table import USAGE_COLUMNS
+from batterpy.virtual_table import VirtualTable
+from batterpy import tracing
 from loguru import logger
 
 def generate_and_display_report():
-    report_path = generate_battery_report()
-    root = parse_xml(report_path)
-    if root is None:
-        messagebox.showerror("Error", "Failed to parse the battery report.")
+    # Generation and parsing run on the worker thread; poll_report_worker picks up the result on the Tk thread
+    if not report_worker.start():
         return
-    
-    ns = '{http://schemas.microsoft.com/battery/2012}'
-    
-    report_info = get_report_information(root, ns)
-    system_info = get_system_information(root, ns)
-    battery_info = get_battery_information(root, ns)
-    recent_usage = get_recent_usage(root, ns)
-    
+    generate_button.config(state=tk.DISABLED)
+    cancel_button.config(state=tk.NORMAL)
+    progress.start(10)
+    app.after(100, poll_report_worker)
+
+def poll_report_worker():
+    result = report_worker.poll()
+    if result is None:
+        app.after(100, poll_report_worker)
+        return
+    progress.stop()
+    generate_button.config(state=tk.NORMAL)
+    cancel_button.config(state=tk.DISABLED)
+    status, payload = result
+    if status == 'done':
+        display_report(*payload)
+    elif status == 'error':
+        messagebox.showerror("Error", payload)
+
+def cancel_report():
+    report_worker.cancel()
+    cancel_button.config(state=tk.DISABLED)
+
+@tracing.traced('display_report')
+def display_report(report_info, system_info, battery_info, recent_usage):
     display_report_information(report_info)
     display_system_information(system_info)
     display_battery_information(battery_info, calculate_battery_health, calculate_battery_degradation)
@@ -40,21 +59,52 @@ def generate_and_display_report():
     battery_text.insert(tk.END, "\n\n".join([format_dict(battery) + f"\nHealth: {calculate_battery_health(battery):.2f}%\nDegradation: {calculate_battery_degradation(battery):.2f}%" for battery in battery_info]))
     battery_text.config(state=tk.DISABLED)
     
-    # Update Treeview with recent usage
-    for i in usage_tree.get_children():
-        usage_tree.delete(i)
-    for usage in recent_usage:
-        usage_tree.insert("", "end", values=list(usage.values()))
+    # Update the virtual table with recent usage; rows are formatted only as they scroll into view
+    with tracing.span('fill_usage_table'):
+        usage_table.set_rows(recent_usage)
     
-    # Update graphs
-    update_graphs(fig1, canvas1, fig2, canvas2, fig3, canvas3, fig4, canvas4, fig5, canvas5, fig6, canvas6, fig7, canvas7, fig8, canvas8, fig9, canvas9, recent_usage, battery_info)
+    # Update graphs, or keep the data until the Graphs tab is first opened
+    graph_state['data'] = (recent_usage, battery_info, report_info)
+    if graph_state['manager'] is not None:
+        graph_state['manager'].update(recent_usage, battery_info, report_info)
 
 def format_dict(data):
     return "\n".join([f"{key}: {value}" for key, value in data.items()])
 
+def ensure_graphs():
+    # matplotlib and the nine figures are only loaded the first time the Graphs tab is opened
+    if graph_state['manager'] is None:
+        from batterpy.graph_generator import create_graphs, GraphManager
+        fig1, canvas1, fig2, canvas2, fig3, canvas3, fig4, canvas4, fig5, canvas5, fig6, canvas6, fig7, canvas7, fig8, canvas8, fig9, canvas9, _ = create_graphs(frame_graphs)
+        graph_state['manager'] = GraphManager([fig1, fig2, fig3, fig4, fig5, fig6, fig7, fig8, fig9],
+                                              [canvas1, canvas2, canvas3, canvas4, canvas5, canvas6, canvas7, canvas8, canvas9])
+        if graph_state['data'] is not None:
+            graph_state['manager'].update(*graph_state['data'])
+        # Lay out the new canvases before working out which of them are in view
+        app.update_idletasks()
+    return graph_state['manager']
+
+def refresh_graph_visibility(*_):
+    # Only figures on the selected Graphs tab and inside the scrolled viewport get drawn
+    if notebook.select() == str(frame_graphs_container):
+        from batterpy.graph_generator import visible_figures
+        graph_manager = ensure_graphs()
+        graph_manager.set_visible(visible_figures(canvas, graph_manager.canvases))
+    elif graph_state['manager'] is not None:
+        graph_state['manager'].set_visible([])
+
+def on_graphs_scrolled(*args):
+    scroll_y.set(*args)
+    refresh_graph_visibility()
+
 def on_mouse_wheel(event):
     canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
 
+# Subcommands such as `batch` run headless, without creating the Tk window
+if len(sys.argv) > 1:
+    from batterpy.cli import main
+    sys.exit(main(sys.argv[1:]))
+
 app = tk.Tk()
 app.title("Battery Report Viewer")
 
@@ -89,7 +139,7 @@ notebook.add(frame_usage, text='Recent Usage')
 notebook.add(frame_graphs_container, text='Graphs')
 
 # Configure canvas and scrollbar
-canvas.configure(yscrollcommand=scroll_y.set)
+canvas.configure(yscrollcommand=on_graphs_scrolled)
 scroll_y.pack(side="right", fill="y")
 canvas.pack(side="left", fill="both", expand=True)
 canvas.create_window((0, 0), window=frame_graphs, anchor="nw")
@@ -118,24 +168,30 @@ battery_text.pack(fill='both', expand=True)
 # Recent Usage
 ttk.Label(frame_usage, text="Recent Usage", style='TLabel').pack(anchor=tk.W)
 
-# Create Treeview for recent usage
-columns = ("Timestamp", "LocalTimestamp", "Duration", "Ac", "EntryType", "ChargeCapacity", "Discharge", "FullChargeCapacity", "IsNextOnBattery")
-usage_tree = ttk.Treeview(frame_usage, columns=columns, show="headings", height=10)
-for col in columns:
-    usage_tree.heading(col, text=col)
-    usage_tree.column(col, width=100)
-
-# Add Treeview to frame with a scrollbar
-scrollbar = ttk.Scrollbar(frame_usage, orient=tk.VERTICAL, command=usage_tree.yview)
-usage_tree.configure(yscroll=scrollbar.set)
-usage_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-# Graphs
-fig1, canvas1, fig2, canvas2, fig3, canvas3, fig4, canvas4, fig5, canvas5, fig6, canvas6, fig7, canvas7, fig8, canvas8, fig9, canvas9, _ = create_graphs(frame_graphs)
-
-# Generate Report Button
-ttk.Button(app, text="Generate Report", command=generate_and_display_report, style='TButton').pack(pady=10)
+# Create a virtual table for recent usage; click a heading to sort by that column
+usage_table = VirtualTable(frame_usage, USAGE_COLUMNS, height=10)
+usage_table.pack(fill=tk.BOTH, expand=True)
+
+# Graphs are created lazily by ensure_graphs
+graph_state = {'manager': None, 'data': None}
+notebook.bind("<<NotebookTabChanged>>", refresh_graph_visibility)
+
+# Generate Report and Cancel buttons with a progress indicator
+report_worker = ReportWorker()
+controls = ttk.Frame(app)
+controls.pack(pady=10)
+generate_button = ttk.Button(controls, text="Generate Report", command=generate_and_display_report, style='TButton')
+generate_button.pack(side=tk.LEFT, padx=5)
+cancel_button = ttk.Button(controls, text="Cancel", command=cancel_report, style='TButton', state=tk.DISABLED)
+cancel_button.pack(side=tk.LEFT, padx=5)
+progress = ttk.Progressbar(controls, mode='indeterminate', length=200)
+progress.pack(side=tk.LEFT, padx=5)
 
 logger.add("battery_report.log", rotation="1 MB")
-app.mainloop()
+configure_display_logging(os.environ.get('BATTERPY_LOG_MODE', 'structured'),
+                          usage_limit=int(os.environ['BATTERPY_USAGE_LOG_LIMIT']) if os.environ.get('BATTERPY_USAGE_LOG_LIMIT') else None,
+                          usage_sample=int(os.environ.get('BATTERPY_USAGE_LOG_SAMPLE', '1')))
+
+# BATTERPY_TRACE=<path> records stage timings and writes a Chrome trace-event file when the window closes
+with tracing.tracing_to(os.environ.get('BATTERPY_TRACE')):
+    app.mainloop()
@@ -0,0 +1,215 @@
+import io
+import json
+import os
+import pathlib
+import numpy as np
+from loguru import logger
+from typing import BinaryIO, List, Dict, Optional, Tuple, Union
+from .report_generator import BATTERY_NS, parse_report_sections
+from .tracing import traced
+from .usage_table import UsageTable, decode_raw, encode_raw
+
+ARCHIVE_MAGIC = b'BATARCH1'
+ARCHIVE_VERSION = 1
+ALIGNMENT = 64
+
+# Tables stored as columns, with the column each one is sorted by so it can be read by time range
+ARCHIVE_TABLES = {
+    'RecentUsage': 'Timestamp',
+    'History': 'StartDate',
+    'BatteryHistory': 'StartDate',
+    'EnergyDrains': 'StartTimestamp',
+}
+# Small sections stored in the JSON header
+ARCHIVE_SECTIONS = ('ReportInformation', 'SystemInformation', 'Batteries', 'RuntimeEstimates')
+
+def _is_sorted(times: np.ndarray) -> bool:
+    # NaT compares false, so a column with NaT anywhere but the end is not sorted
+    return len(times) < 2 or bool(np.all(times[1:] >= times[:-1]))
+
+def _sorted_by(table: UsageTable, key: str) -> UsageTable:
+    if not table.has_column(key) or _is_sorted(table.columns[key]):
+        return table
+    # NaT sorts last, so time-range reads never see it
+    return table.take(np.argsort(table.columns[key], kind='stable'))
+
+def _little_endian(column: np.ndarray) -> np.ndarray:
+    return np.ascontiguousarray(column, dtype=column.dtype.newbyteorder('<'))
+
+def _padding(offset: int) -> int:
+    return -offset % ALIGNMENT
+
+def _write(report: Dict[str, object], archive_file: BinaryIO, sort: bool = True) -> int:
+    """Write the archive layout to a binary stream and return the number of bytes written.
+
+    Tables are sorted by their time column unless sort is False, in which case only tables that already are get
+    time-range reads.
+    """
+    header = {'version': ARCHIVE_VERSION, 'sections': {name: report.get(name) for name in ARCHIVE_SECTIONS}, 'tables': {}}
+    blocks = []
+    offset = 0
+    for name, time_column in ARCHIVE_TABLES.items():
+        table = report.get(name) or []
+        if not isinstance(table, UsageTable):
+            table = UsageTable.from_entries(table, infer_types=True)
+        if sort:
+            table = _sorted_by(table, time_column)
+        sorted_by = time_column if table.has_column(time_column) and _is_sorted(table.columns[time_column]) else None
+        layout = {'length': len(table), 'sorted_by': sorted_by, 'columns': {}, 'raw': encode_raw(table.raw)}
+        for key, column in table.columns.items():
+            entry = {}
+            for part, array in (('data', column), ('present', table.present.get(key))):
+                if array is None:
+                    continue
+                array = _little_endian(array)
+                entry[part] = {'dtype': array.dtype.str, 'offset': offset}
+                blocks.append(array)
+                offset += array.nbytes + _padding(array.nbytes)
+            if key in table.categories:
+                entry['categories'] = table.categories[key]
+            if key in table.formats:
+                entry['format'] = table.formats[key]
+            layout['columns'][key] = entry
+        header['tables'][name] = layout
+
+    encoded = json.dumps(header).encode('utf-8')
+    header_end = len(ARCHIVE_MAGIC) + 8 + len(encoded)
+    archive_file.write(ARCHIVE_MAGIC)
+    archive_file.write(np.array([len(encoded)], dtype='<u8').tobytes())
+    archive_file.write(encoded + bytes(_padding(header_end)))
+    for array in blocks:
+        archive_file.write(array.tobytes())
+        archive_file.write(bytes(_padding(array.nbytes)))
+    return header_end + _padding(header_end) + offset
+
+def encode_archive(report: Dict[str, object], sort: bool = True) -> bytes:
+    """Return an extracted report in the archive layout as bytes (see write_archive and read_archive)."""
+    buffer = io.BytesIO()
+    _write(report, buffer, sort)
+    return buffer.getvalue()
+
+@traced('write_archive')
+def write_archive(report: Dict[str, object], path: str):
+    """Write an extracted report (as returned by extract_report) to a memory-mappable archive file.
+
+    Layout: 8-byte magic, little-endian uint64 header length, JSON header, then every column as a contiguous
+    little-endian array aligned to 64 bytes. The header holds the small sections and, per table, the length,
+    column dtypes and offsets, dictionary vocabularies and the offsets of presence masks. Attribute-dict tables
+    are converted with UsageTable.from_entries(infer_types=True).
+    """
+    temp_path = pathlib.Path(f"{path}.{os.getpid()}.tmp")
+    with open(temp_path, 'wb') as archive_file:
+        size = _write(report, archive_file)
+    temp_path.replace(path)
+    logger.info(f"Wrote archive {path} ({size} bytes)")
+
+def export_archive(report_path: str, archive_path: str, ns: str = BATTERY_NS):
+    """Extract a report file in one streaming pass and write it as an archive.
+
+    Raises OSError or ET.ParseError if the report cannot be read; archive_path is then left as it was.
+    """
+    write_archive(parse_report_sections(report_path, ns), archive_path)
+
+class BatteryArchive:
+    """Read-only view of an archive file; tables are memory-mapped and sliced by time range without copying.
+
+    The UsageTable objects it returns wrap the mapped columns directly, so calculations and update_graphs
+    read from the file rather than from a copy of it. Given data, the archive is read from those bytes instead
+    (see read_archive) and path is only used in messages.
+    """
+
+    def __init__(self, path: str, data: Optional[bytes] = None):
+        self.path = path
+        with (io.BytesIO(data) if data is not None else open(path, 'rb')) as archive_file:
+            magic = archive_file.read(len(ARCHIVE_MAGIC))
+            if magic != ARCHIVE_MAGIC:
+                raise ValueError(f"{path} is not a Batterpy archive")
+            header_length = int(np.frombuffer(archive_file.read(8), dtype='<u8')[0])
+            header = json.loads(archive_file.read(header_length).decode('utf-8'))
+        if header['version'] != ARCHIVE_VERSION:
+            raise ValueError(f"Unsupported archive version {header['version']} in {path}")
+        data_start = len(ARCHIVE_MAGIC) + 8 + header_length
+        data_start += _padding(data_start)
+        self.header = header
+        self.sections = header['sections']
+        size = len(data) if data is not None else pathlib.Path(path).stat().st_size
+        if size <= data_start:
+            self._data = np.zeros(0, dtype=np.uint8)
+        elif data is not None:
+            self._data = np.frombuffer(data, dtype=np.uint8, offset=data_start)
+        else:
+            self._data = np.memmap(path, dtype=np.uint8, mode='r', offset=data_start)
+
+    @property
+    def report_info(self) -> Dict[str, str]:
+        return self.sections['ReportInformation'] or {}
+
+    @property
+    def system_info(self) -> Dict[str, str]:
+        return self.sections['SystemInformation'] or {}
+
+    @property
+    def battery_info(self) -> List[Dict[str, str]]:
+        return self.sections['Batteries'] or []
+
+    @property
+    def runtime_estimates(self) -> Dict[str, Dict[str, str]]:
+        return self.sections['RuntimeEstimates'] or {}
+
+    def _array(self, block: Dict, length: int) -> np.ndarray:
+        dtype = np.dtype(block['dtype'])
+        return self._data[block['offset']:block['offset'] + length * dtype.itemsize].view(dtype)
+
+    def _range(self, name: str, start, end) -> Tuple[int, int]:
+        layout = self.header['tables'][name]
+        if layout['sorted_by'] is None or (start is None and end is None):
+            return 0, layout['length']
+        times = self._array(layout['columns'][layout['sorted_by']]['data'], layout['length'])
+        lo = np.searchsorted(times, np.datetime64(start, 's'), side='left') if start is not None else 0
+        hi = np.searchsorted(times, np.datetime64(end, 's'), side='left') if end is not None else len(times)
+        return int(lo), int(hi)
+
+    def table(self, name: str, start: Optional[str] = None, end: Optional[str] = None) -> UsageTable:
+        """Return a stored table, optionally limited to start <= time < end on its sort column."""
+        layout = self.header['tables'][name]
+        lo, hi = self._range(name, start, end)
+        columns = {}
+        present = {}
+        categories = {}
+        formats = {}
+        for key, entry in layout['columns'].items():
+            columns[key] = self._array(entry['data'], layout['length'])[lo:hi]
+            if 'present' in entry:
+                present[key] = self._array(entry['present'], layout['length'])[lo:hi]
+            if 'categories' in entry:
+                categories[key] = entry['categories']
+            if 'format' in entry:
+                formats[key] = entry['format']
+        return UsageTable(columns, present, categories, formats, decode_raw(layout.get('raw'), lo, hi))
+
+    def usage(self, start: Optional[str] = None, end: Optional[str] = None) -> UsageTable:
+        """Return the recent usage, optionally limited to start <= Timestamp < end."""
+        return self.table('RecentUsage', start, end)
+
+    def load(self, start: Optional[str] = None, end: Optional[str] = None) -> Tuple[Dict[str, str], Dict[str, str], List[Dict[str, str]], UsageTable]:
+        """Return the same (report_info, system_info, battery_info, recent_usage) tuple as load_report."""
+        return self.report_info, self.system_info, self.battery_info, self.usage(start, end)
+
+    def to_report(self) -> Dict[str, object]:
+        """Return every section in the same shape as extract_report.
+
+        RecentUsage is a UsageTable and the other tables are lists of attribute dicts, in time order when the
+        archive was written sorted.
+        """
+        report: Dict[str, object] = dict(self.sections)
+        for name in ARCHIVE_TABLES:
+            report[name] = self.usage() if name == 'RecentUsage' else self.table(name).to_dicts()
+        return report
+
+def open_archive(path: Union[str, pathlib.Path]) -> BatteryArchive:
+    """Open an archive written by write_archive."""
+    return BatteryArchive(str(path))
+
+def read_archive(data: bytes, name: str = '<bytes>') -> BatteryArchive:
+    """Open an archive held in memory, as returned by encode_archive; its tables are views of data."""
+    return BatteryArchive(name, data)
@@ -0,0 +1,70 @@
+import queue
+import threading
+from loguru import logger
+from typing import List, Optional, Tuple
+from .report_generator import BATTERY_NS, DEFAULT_REPORT_TIMEOUT, ReportCancelled, generate_battery_report, load_report
+
+class ReportWorker:
+    """Generate and parse battery reports on a background thread.
+
+    The GUI calls start() from the Tk thread and then polls poll() with app.after; the worker never touches Tk.
+    poll() returns None while a report is in progress and then exactly one of ('done', report),
+    ('error', message) or ('cancelled', None). A command that runs longer than timeout seconds is killed and
+    reported as an error.
+    """
+
+    def __init__(self, command: Optional[List[str]] = None, ns: str = BATTERY_NS, timeout: Optional[float] = DEFAULT_REPORT_TIMEOUT):
+        self.command = command
+        self.ns = ns
+        self.timeout = timeout
+        self._results: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._cancel_event = threading.Event()
+
+    @property
+    def busy(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> bool:
+        """Start generating a report; returns False if one is already in progress."""
+        if self.busy:
+            return False
+        self._cancel_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._cancel_event,), daemon=True)
+        self._thread.start()
+        return True
+
+    def cancel(self):
+        """Ask the running generation to stop; its result is discarded."""
+        self._cancel_event.set()
+
+    def poll(self) -> Optional[Tuple[str, object]]:
+        """Return the outcome of the current generation once it has finished."""
+        try:
+            result = self._results.get_nowait()
+        except queue.Empty:
+            return None
+        self._thread = None
+        return result
+
+    def _run(self, cancel_event: threading.Event):
+        report_path = None
+        try:
+            report_path = generate_battery_report(self.command, cancel_event, self.timeout)
+            report = None if cancel_event.is_set() else load_report(str(report_path), self.ns)
+            if cancel_event.is_set():
+                self._results.put(('cancelled', None))
+            elif report is None:
+                self._results.put(('error', "Failed to parse the battery report."))
+            else:
+                self._results.put(('done', report))
+        except ReportCancelled:
+            logger.info("Battery report generation cancelled")
+            self._results.put(('cancelled', None))
+        except Exception as e:
+            logger.exception("Battery report generation failed")
+            self._results.put(('error', str(e)))
+        finally:
+            # The report has been parsed (or abandoned); only the extracted data is kept
+            if report_path is not None:
+                report_path.unlink(missing_ok=True)
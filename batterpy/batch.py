@@ -0,0 +1,129 @@
+import csv
+import os
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+from loguru import logger
+from typing import List, Dict, Iterable, Optional, Tuple
+from .report_generator import load_report
+from .report_cache import ReportCache, DEFAULT_CACHE_SIZE
+from .calculations import calculate_battery_health, calculate_battery_degradation
+
+SUMMARY_FIELDS = ('ReportPath', 'ComputerName', 'SystemManufacturer', 'SystemProductName', 'BIOSVersion', 'OSBuild',
+                  'ScanTime', 'ReportDuration', 'Id', 'Manufacturer', 'SerialNumber', 'Chemistry', 'DesignCapacity',
+                  'FullChargeCapacity', 'CycleCount', 'Health', 'Degradation', 'UsageEntries', 'Error')
+# Type of each numeric summary column in typed outputs; every other column is a string
+NUMERIC_FIELDS = {'DesignCapacity': int, 'FullChargeCapacity': int, 'CycleCount': int, 'UsageEntries': int,
+                  'Health': float, 'Degradation': float}
+
+def find_reports(directory: str, pattern: str = '*.xml') -> List[pathlib.Path]:
+    """Return every report file below the directory, sorted for a stable output order."""
+    return sorted(path for path in pathlib.Path(directory).rglob(pattern) if path.is_file())
+
+# Each worker process opens its own handle on the shared cache directory
+_worker_cache: Optional[ReportCache] = None
+
+def _init_worker(cache_dir: Optional[str], cache_size: int):
+    global _worker_cache
+    _worker_cache = ReportCache(cache_dir, cache_size) if cache_dir else None
+
+def _analyze_in_worker(report_path: str) -> Tuple[List[Dict[str, object]], Optional[bool]]:
+    if _worker_cache is None:
+        return analyze_report(report_path), None
+    hits = _worker_cache.hits
+    rows = analyze_report(report_path, _worker_cache)
+    return rows, _worker_cache.hits > hits
+
+def analyze_report(report_path: str, cache: Optional[ReportCache] = None) -> List[Dict[str, object]]:
+    """Parse a single report and return one summary row per battery."""
+    row: Dict[str, object] = {field: '' for field in SUMMARY_FIELDS}
+    row['ReportPath'] = str(report_path)
+    try:
+        report = cache.load(report_path) if cache is not None else load_report(report_path)
+        if report is None:
+            row['Error'] = 'Failed to parse report'
+            return [row]
+        report_info, system_info, battery_info, recent_usage = report
+        row.update({key: value for key, value in {**report_info, **system_info}.items() if key in row})
+        row['UsageEntries'] = len(recent_usage)
+        if not battery_info:
+            row['Error'] = 'No batteries in report'
+            return [row]
+        rows = []
+        for battery in battery_info:
+            battery_row = dict(row)
+            battery_row.update({key: value for key, value in battery.items() if key in battery_row})
+            battery_row['Health'] = round(calculate_battery_health(battery), 2)
+            battery_row['Degradation'] = round(calculate_battery_degradation(battery), 2)
+            rows.append(battery_row)
+        return rows
+    except Exception as e:
+        row['Error'] = f"{type(e).__name__}: {e}"
+        return [row]
+
+def write_csv(rows: Iterable[Dict[str, object]], output_path: pathlib.Path):
+    """Write summary rows to a CSV file."""
+    with open(output_path, 'w', newline='', encoding='utf-8') as output:
+        writer = csv.DictWriter(output, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def _typed(value: object, kind: type) -> Optional[object]:
+    try:
+        return kind(value) if value != '' else None
+    except (TypeError, ValueError):
+        return None
+
+def typed_columns(rows: List[Dict[str, object]]) -> Dict[str, list]:
+    """Return the summary rows as columns, with NUMERIC_FIELDS converted and empty or invalid cells as None."""
+    columns = {}
+    for field in SUMMARY_FIELDS:
+        kind = NUMERIC_FIELDS.get(field, str)
+        columns[field] = [_typed(row[field], kind) for row in rows] if kind is not str else [str(row[field]) for row in rows]
+    return columns
+
+def write_parquet(rows: List[Dict[str, object]], output_path: pathlib.Path):
+    """Write summary rows to a Parquet file (requires pyarrow), with int64 capacities and float64 health columns."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Writing Parquet output requires pyarrow to be installed") from e
+    arrow_types = {int: pa.int64(), float: pa.float64(), str: pa.string()}
+    schema = pa.schema([(field, arrow_types[NUMERIC_FIELDS.get(field, str)]) for field in SUMMARY_FIELDS])
+    pq.write_table(pa.table(typed_columns(rows), schema=schema), output_path)
+
+def run_batch(directory: str, output_path: str, workers: Optional[int] = None, progress_every: int = 100,
+              cache_dir: Optional[str] = None, cache_size: int = DEFAULT_CACHE_SIZE) -> List[Dict[str, object]]:
+    """Analyze every report in a directory with a process pool and write one aggregated table."""
+    if progress_every < 1:
+        raise ValueError("progress_every must be at least 1")
+    reports = find_reports(directory)
+    total = len(reports)
+    workers = workers or os.cpu_count() or 1
+    logger.info(f"Analyzing {total} reports from {directory} with {workers} workers")
+
+    rows: List[Dict[str, object]] = []
+    failed = 0
+    hits = misses = 0
+    # Large chunks keep inter-process overhead small when there are thousands of small reports
+    chunksize = max(1, min(64, total // (workers * 4) if total else 1))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cache_dir, cache_size)) as executor:
+        results = executor.map(_analyze_in_worker, map(str, reports), chunksize=chunksize)
+        for done, (report_rows, hit) in enumerate(results, start=1):
+            rows.extend(report_rows)
+            failed += any(row['Error'] for row in report_rows)
+            if hit is not None:
+                hits += hit
+                misses += not hit
+            if done % progress_every == 0 or done == total:
+                logger.info(f"Processed {done}/{total} reports ({failed} with errors)")
+
+    output = pathlib.Path(output_path)
+    if output.suffix.lower() == '.parquet':
+        write_parquet(rows, output)
+    else:
+        write_csv(rows, output)
+    logger.info(f"Wrote {len(rows)} rows to {output}")
+    if cache_dir:
+        logger.info(f"Report cache: {hits} hits, {misses} misses")
+    return rows
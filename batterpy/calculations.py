@@ -1,4 +1,10 @@
-from typing import List, Dict
+import math
+import numpy as np
+from .tracing import traced
+from .usage_table import UsageTable
+from typing import List, Dict, Optional, Union
+
+Usage = Union[UsageTable, List[Dict[str, str]]]
 
 def calculate_battery_health(battery_info: Dict[str, str]) -> float:
     """Calculate the battery health percentage."""
@@ -16,25 +22,50 @@ def calculate_battery_degradation(battery_info: Dict[str, str]) -> float:
         return 0.0
     return ((design_capacity - full_charge_capacity) / design_capacity) * 100
 
-def calculate_cycle_count_over_time(recent_usage: List[Dict[str, str]]) -> List[int]:
+@traced('calculate_cycle_count_over_time')
+def calculate_cycle_count_over_time(recent_usage: Usage) -> List[int]:
     """Calculate the cycle count over time."""
+    if isinstance(recent_usage, UsageTable):
+        if not recent_usage.has_column('CycleCount'):
+            return [0] * len(recent_usage)
+        cycle_count = np.where(recent_usage.mask('CycleCount'), recent_usage.column('CycleCount'), '0')
+        return calculate_cycle_count_over_time_batch(cycle_count).tolist()
     return [int(entry.get('CycleCount', 0)) for entry in recent_usage]
 
-def calculate_discharge_rate(recent_usage: List[Dict[str, str]]) -> List[float]:
+@traced('calculate_discharge_rate')
+def calculate_discharge_rate(recent_usage: Usage) -> List[float]:
     """Calculate the discharge rate over time."""
+    if isinstance(recent_usage, UsageTable):
+        if not (recent_usage.has_column('Discharge') and recent_usage.has_column('Duration')):
+            return []
+        present = recent_usage.mask('Discharge') & recent_usage.mask('Duration')
+        return calculate_discharge_rate_batch(recent_usage.column('Discharge'), recent_usage.column('Duration'), present).tolist()
     return [int(entry['Discharge']) / int(entry['Duration']) for entry in recent_usage if 'Discharge' in entry and 'Duration' in entry]
 
-def calculate_historical_health(recent_usage: List[Dict[str, str]], design_capacity: int) -> List[float]:
+@traced('calculate_historical_health')
+def calculate_historical_health(recent_usage: Usage, design_capacity: int) -> List[float]:
     """Calculate the historical battery health over time."""
+    if isinstance(recent_usage, UsageTable):
+        if not recent_usage.has_column('FullChargeCapacity'):
+            return []
+        return calculate_historical_health_batch(recent_usage.column('FullChargeCapacity'), design_capacity,
+                                                 recent_usage.mask('FullChargeCapacity')).tolist()
     return [(int(entry['FullChargeCapacity']) / design_capacity) * 100 for entry in recent_usage if 'FullChargeCapacity' in entry]
 
-def calculate_average_discharge_rate(recent_usage: List[Dict[str, str]]) -> float:
+@traced('calculate_average_discharge_rate')
+def calculate_average_discharge_rate(recent_usage: Usage) -> float:
     """Calculate the average discharge rate."""
     discharge_rates = calculate_discharge_rate(recent_usage)
-    return sum(discharge_rates) / len(discharge_rates) if discharge_rates else 0.0
+    # fsum is correctly rounded, so the average does not depend on summation order or the Python version
+    return math.fsum(discharge_rates) / len(discharge_rates) if discharge_rates else 0.0
 
-def count_charge_discharge_cycles(recent_usage: List[Dict[str, str]]) -> int:
+@traced('count_charge_discharge_cycles')
+def count_charge_discharge_cycles(recent_usage: Usage) -> int:
     """Count the number of charge and discharge cycles."""
+    if isinstance(recent_usage, UsageTable):
+        if not recent_usage.has_column('ChargeCapacity'):
+            return 0
+        return count_charge_discharge_cycles_batch(recent_usage.column('ChargeCapacity'))
     cycles = 0
     last_charge = None
     for entry in recent_usage:
@@ -56,7 +87,14 @@ def estimate_time_to_empty(current_capacity: int, discharge_rate: float) -> floa
         return float('inf')
     return current_capacity / discharge_rate
 
-def calculate_energy_consumption(recent_usage: List[Dict[str, str]]) -> List[float]:
+@traced('calculate_energy_consumption')
+def calculate_energy_consumption(recent_usage: Usage) -> List[float]:
+    """Calculate the capacity consumed between consecutive usage entries."""
+    if isinstance(recent_usage, UsageTable):
+        if len(recent_usage) and not recent_usage.has_column('ChargeCapacity'):
+            raise KeyError('ChargeCapacity')
+        charge = recent_usage.column('ChargeCapacity') if len(recent_usage) else np.zeros(0, dtype=np.int64)
+        return calculate_energy_consumption_batch(charge, recent_usage.mask('ChargeCapacity')).tolist()
     energy_consumption = []
     previous_capacity = None
     
@@ -68,8 +106,14 @@ def calculate_energy_consumption(recent_usage: List[Dict[str, str]]) -> List[flo
     
     return energy_consumption
 
-def calculate_charge_discharge_efficiency(recent_usage: List[Dict[str, str]]) -> List[float]:
+@traced('calculate_charge_discharge_efficiency')
+def calculate_charge_discharge_efficiency(recent_usage: Usage) -> List[float]:
     """Calculate the charge/discharge efficiency."""
+    if isinstance(recent_usage, UsageTable):
+        length = len(recent_usage)
+        charge = recent_usage.column('ChargeCapacity') if recent_usage.has_column('ChargeCapacity') else np.zeros(length, dtype=np.int64)
+        discharge = recent_usage.column('Discharge') if recent_usage.has_column('Discharge') else np.zeros(length, dtype=np.int64)
+        return calculate_charge_discharge_efficiency_batch(charge, discharge).tolist()
     efficiency = []
     for entry in recent_usage:
         charge = int(entry.get('ChargeCapacity', 0))
@@ -77,3 +121,85 @@ def calculate_charge_discharge_efficiency(recent_usage: List[Dict[str, str]]) ->
         if charge > 0:
             efficiency.append((charge - discharge) / charge * 100)
     return efficiency
+
+# Vectorized batch implementations. These take NumPy arrays (as held by UsageTable, with missing values filled
+# with 0 and an optional presence mask) and return exactly what the per-entry functions above return, including
+# raising the same exceptions where the per-entry versions would.
+
+def _select(values: np.ndarray, present: Optional[np.ndarray]) -> np.ndarray:
+    values = np.asarray(values)
+    return values if present is None else values[np.asarray(present, dtype=bool)]
+
+def calculate_battery_health_batch(design_capacity: np.ndarray, full_charge_capacity: np.ndarray) -> np.ndarray:
+    """Calculate the battery health percentage for arrays of batteries."""
+    design = np.asarray(design_capacity, dtype=np.float64)
+    full = np.asarray(full_charge_capacity, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(design == 0, 0.0, full / design * 100)
+
+def calculate_battery_degradation_batch(design_capacity: np.ndarray, full_charge_capacity: np.ndarray) -> np.ndarray:
+    """Calculate the battery degradation percentage for arrays of batteries."""
+    design = np.asarray(design_capacity, dtype=np.float64)
+    full = np.asarray(full_charge_capacity, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(design == 0, 0.0, (design - full) / design * 100)
+
+def calculate_cycle_count_over_time_batch(cycle_count: np.ndarray) -> np.ndarray:
+    """Calculate the cycle count over time."""
+    return np.asarray(cycle_count, dtype=np.int64)
+
+def calculate_discharge_rate_batch(discharge: np.ndarray, duration: np.ndarray, present: Optional[np.ndarray] = None) -> np.ndarray:
+    """Calculate the discharge rate for every entry where both Discharge and Duration are present."""
+    discharge = _select(discharge, present)
+    duration = _select(duration, present)
+    if np.any(duration == 0):
+        raise ZeroDivisionError("division by zero")
+    return discharge / duration
+
+def calculate_historical_health_batch(full_charge_capacity: np.ndarray, design_capacity: int, present: Optional[np.ndarray] = None) -> np.ndarray:
+    """Calculate the historical battery health for every entry where FullChargeCapacity is present."""
+    full = _select(full_charge_capacity, present)
+    if design_capacity == 0 and len(full):
+        raise ZeroDivisionError("division by zero")
+    return full / design_capacity * 100 if len(full) else np.zeros(0, dtype=np.float64)
+
+def calculate_average_discharge_rate_batch(discharge: np.ndarray, duration: np.ndarray, present: Optional[np.ndarray] = None) -> float:
+    """Calculate the average discharge rate."""
+    discharge_rates = calculate_discharge_rate_batch(discharge, duration, present)
+    if not len(discharge_rates):
+        return 0.0
+    return math.fsum(discharge_rates.tolist()) / len(discharge_rates)
+
+def count_charge_discharge_cycles_batch(charge_capacity: np.ndarray) -> int:
+    """Count the number of charge and discharge cycles."""
+    charge = np.asarray(charge_capacity)
+    return int(np.count_nonzero(charge[1:] < charge[:-1]))
+
+def estimate_time_to_full_charge_batch(current_capacity: np.ndarray, full_charge_capacity: np.ndarray, charge_rate: np.ndarray) -> np.ndarray:
+    """Estimate the time to full charge for arrays of capacities and charge rates."""
+    current, full, rate = np.broadcast_arrays(np.asarray(current_capacity, dtype=np.float64),
+                                              np.asarray(full_charge_capacity, dtype=np.float64),
+                                              np.asarray(charge_rate, dtype=np.float64))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(rate == 0, np.inf, (full - current) / rate)
+
+def estimate_time_to_empty_batch(current_capacity: np.ndarray, discharge_rate: np.ndarray) -> np.ndarray:
+    """Estimate the time to empty for arrays of capacities and discharge rates."""
+    current, rate = np.broadcast_arrays(np.asarray(current_capacity, dtype=np.float64),
+                                        np.asarray(discharge_rate, dtype=np.float64))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(rate == 0, np.inf, current / rate)
+
+def calculate_energy_consumption_batch(charge_capacity: np.ndarray, present: Optional[np.ndarray] = None) -> np.ndarray:
+    """Calculate the capacity consumed between consecutive entries."""
+    if present is not None and not np.all(present):
+        raise KeyError('ChargeCapacity')
+    charge = np.asarray(charge_capacity, dtype=np.int64)
+    return charge[:-1] - charge[1:]
+
+def calculate_charge_discharge_efficiency_batch(charge_capacity: np.ndarray, discharge: np.ndarray) -> np.ndarray:
+    """Calculate the charge/discharge efficiency for every entry with a positive charge capacity."""
+    charge = np.asarray(charge_capacity, dtype=np.int64)
+    discharge = np.asarray(discharge, dtype=np.int64)
+    charging = charge > 0
+    return (charge[charging] - discharge[charging]) / charge[charging] * 100
@@ -0,0 +1,125 @@
+import argparse
+import sys
+from loguru import logger
+from typing import List, Optional
+
+def positive_int(value: str) -> int:
+    """argparse type for options that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='batterpy', description="Headless battery report tools.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    batch = subparsers.add_parser('batch', help="Analyze a directory of powercfg XML reports.")
+    batch.add_argument('directory', help="Directory searched recursively for *.xml reports.")
+    batch.add_argument('-o', '--output', default='battery_summary.csv', help="Output table (.csv or .parquet).")
+    batch.add_argument('-w', '--workers', type=int, default=None, help="Number of worker processes (default: CPU count).")
+    batch.add_argument('--progress-every', type=positive_int, default=100, help="Log progress every N reports.")
+    batch.add_argument('--cache-dir', default=None, help="Cache extracted reports in this directory.")
+    batch.add_argument('--cache-size', type=int, default=256, help="Maximum cache size in MB (default: 256).")
+
+    history = subparsers.add_parser('history', help="Ingest reports into the incremental usage history store.")
+    history.add_argument('store', help="History store directory.")
+    history.add_argument('reports', nargs='+', help="Report files to ingest, oldest first.")
+
+    archive = subparsers.add_parser('archive', help="Convert a report to the memory-mapped columnar archive format.")
+    archive.add_argument('report', help="powercfg XML report.")
+    archive.add_argument('output', help="Archive file to write.")
+
+    export = subparsers.add_parser('export', help="Render the charts of reports offscreen to images and HTML.")
+    export.add_argument('paths', nargs='+', help="Report or archive files, or directories to search.")
+    export.add_argument('-o', '--output', default='battery_charts', help="Output directory (one subdirectory per report).")
+    export.add_argument('-f', '--format', nargs='+', default=['png'], choices=['png', 'svg', 'pdf'], help="Image formats.")
+    export.add_argument('-w', '--workers', type=int, default=None, help="Number of worker processes (default: CPU count).")
+    export.add_argument('--dpi', type=int, default=100, help="Resolution of raster images.")
+    export.add_argument('--no-html', action='store_true', help="Only write the images, not the HTML report.")
+
+    collect = subparsers.add_parser('collect', help="Run report commands concurrently and save each report as an archive.")
+    collect.add_argument('output', help="Directory for the archives (report1.bta, report2.bta, ...).")
+    collect.add_argument('-c', '--command', dest='commands', action='append', default=None,
+                         help="Report command, repeatable. {report_path} makes it write a file; otherwise its stdout is parsed.")
+    collect.add_argument('--concurrency', type=int, default=4, help="Commands to run at once.")
+    collect.add_argument('--timeout', type=float, default=120.0, help="Seconds each command may take.")
+
+    forecast = subparsers.add_parser('forecast', help="Project when each battery's health drops below a threshold.")
+    forecast.add_argument('directory', help="Directory searched recursively for *.xml reports and *.bta archives.")
+    forecast.add_argument('-o', '--output', default='battery_forecast.csv', help="Output CSV.")
+    forecast.add_argument('-t', '--threshold', type=float, default=80.0, help="Health threshold in percent of design capacity.")
+    forecast.add_argument('--horizon-days', type=int, default=91, help="Flag batteries crossing within this many days.")
+    forecast.add_argument('-m', '--model', default='best', choices=['best', 'linear', 'exponential'], help="Fade model.")
+    forecast.add_argument('-w', '--workers', type=int, default=None, help="Number of worker processes (default: CPU count).")
+
+    synthetic = subparsers.add_parser('synthetic', help="Write a synthetic powercfg-schema battery report.")
+    synthetic.add_argument('output', help="Output XML path, or - for stdout.")
+    synthetic.add_argument('-n', '--entries', type=int, default=1000, help="Number of usage entries.")
+    synthetic.add_argument('-b', '--batteries', type=int, default=1, help="Number of batteries.")
+    synthetic.add_argument('--seed', type=int, default=0, help="Random seed.")
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == 'batch':
+        from .batch import run_batch
+        run_batch(args.directory, args.output, workers=args.workers, progress_every=args.progress_every,
+                  cache_dir=args.cache_dir, cache_size=args.cache_size * 1024 * 1024)
+    elif args.command == 'history':
+        import xml.etree.ElementTree as ET
+        from .history_store import HistoryStore
+        store = HistoryStore(args.store)
+        failed = 0
+        for report_path in args.reports:
+            try:
+                store.ingest_report(report_path)
+            except (OSError, ET.ParseError) as e:
+                failed += 1
+                logger.error(f"Failed to ingest {report_path}: {type(e).__name__}: {e}")
+        for key in store.machines():
+            try:
+                logger.info(f"{key}: {store.metrics(key).snapshot()}")
+            except ValueError as e:
+                logger.warning(str(e))
+        return 1 if failed else 0
+    elif args.command == 'archive':
+        import xml.etree.ElementTree as ET
+        from .archive import export_archive
+        try:
+            export_archive(args.report, args.output)
+        except (OSError, ET.ParseError) as e:
+            logger.error(f"Failed to archive {args.report}: {type(e).__name__}: {e}")
+            return 1
+    elif args.command == 'export':
+        from .export import export_paths, export_reports
+        results = export_reports(export_paths(args.paths), args.output, formats=args.format, write_html=not args.no_html,
+                                 workers=args.workers, dpi=args.dpi)
+        return 1 if any(target is None for target in results.values()) else 0
+    elif args.command == 'collect':
+        import asyncio
+        import pathlib
+        import shlex
+        from .archive import write_archive
+        from .collector import collect_reports
+        commands = [shlex.split(command) for command in args.commands] if args.commands else [None]
+        results = asyncio.run(collect_reports(commands, concurrency=args.concurrency, timeout=args.timeout))
+        output = pathlib.Path(args.output)
+        output.mkdir(parents=True, exist_ok=True)
+        failed = 0
+        for index, result in enumerate(results, start=1):
+            if isinstance(result, BaseException):
+                failed += 1
+                logger.error(f"Command {index} failed: {type(result).__name__}: {result}")
+            else:
+                write_archive(result, str(output / f'report{index}.bta'))
+        return 1 if failed else 0
+    elif args.command == 'forecast':
+        from .forecast import run_forecast
+        run_forecast(args.directory, args.output, threshold=args.threshold, horizon_days=args.horizon_days,
+                     workers=args.workers, model=args.model)
+    elif args.command == 'synthetic':
+        from .synthetic import write_synthetic_report
+        output = sys.stdout if args.output == '-' else args.output
+        write_synthetic_report(output, entries=args.entries, batteries=args.batteries, seed=args.seed)
+    return 0
@@ -0,0 +1,111 @@
+import asyncio
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+from loguru import logger
+from typing import List, Dict, Iterable, Optional, Union
+from .report_generator import (BATTERY_NS, DEFAULT_REPORT_TIMEOUT, ReportTimeout, collect_records, empty_report,
+                               kill_process_group, parse_report_sections, report_command, report_records)
+from .usage_table import UsageTable
+
+DEFAULT_TIMEOUT = DEFAULT_REPORT_TIMEOUT
+DEFAULT_CONCURRENCY = 4
+CHUNK_SIZE = 64 * 1024
+REPORT_PATH_PLACEHOLDER = '{report_path}'
+
+def stand_in_command(entries: int = 1000, batteries: int = 1, seed: int = 0) -> List[str]:
+    """Return a command that writes a synthetic report to stdout, for running collectors off Windows."""
+    return [sys.executable, '-m', 'batterpy.synthetic', '-', '--entries', str(entries), '--batteries', str(batteries),
+            '--seed', str(seed)]
+
+async def _stop(process: asyncio.subprocess.Process):
+    if process.returncode is None:
+        kill_process_group(process)
+        await process.wait()
+
+async def _parse_stream(stdout: asyncio.StreamReader, ns: str) -> Dict[str, object]:
+    """Feed the command's stdout to an XMLPullParser as it arrives and extract every section."""
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    report = empty_report()
+    usage: List[Dict[str, str]] = []
+    stack: List[ET.Element] = []
+    while True:
+        chunk = await stdout.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        parser.feed(chunk)
+        usage.extend(collect_records(report, report_records(parser.read_events(), ns, stack)))
+    parser.close()
+    usage.extend(collect_records(report, report_records(parser.read_events(), ns, stack)))
+    report['RecentUsage'] = UsageTable.from_entries(usage)
+    return report
+
+async def _collect(args: List[str], stream: bool, report_path: Optional[pathlib.Path], ns: str) -> Dict[str, object]:
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.PIPE if stream else asyncio.subprocess.DEVNULL,
+        creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0),  # Prevent a console window from opening on Windows
+        start_new_session=os.name == 'posix'
+    )
+    try:
+        try:
+            report = await _parse_stream(process.stdout, ns) if stream else None
+        except ET.ParseError:
+            # A command that failed usually leaves truncated output; report the exit status instead
+            if await process.wait() != 0:
+                raise subprocess.CalledProcessError(process.returncode, args) from None
+            raise
+        returncode = await process.wait()
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, args)
+        if report is None:
+            # Parsing a file is blocking work, so it runs on the default executor
+            report = await asyncio.get_running_loop().run_in_executor(None, parse_report_sections, str(report_path), ns)
+        return report
+    finally:
+        # Reached on errors, timeouts and cancellation as well
+        await _stop(process)
+
+async def collect_report(command: Optional[List[str]] = None, timeout: Optional[float] = DEFAULT_TIMEOUT,
+                         semaphore: Optional[asyncio.Semaphore] = None, stream: Optional[bool] = None,
+                         ns: str = BATTERY_NS) -> Dict[str, object]:
+    """Run a report command and return every extracted section (as extract_report does).
+
+    A command containing {report_path} writes to a temporary file, which is always removed afterwards; any other
+    command is expected to write the XML to stdout, which is parsed as it arrives without touching disk. Pass
+    stream to override the detection. The whole run, including parsing, must finish within timeout seconds or the
+    command is killed and ReportTimeout raised. With a semaphore, at most that many commands run at once.
+    A truncated or malformed report raises ET.ParseError in either mode.
+    """
+    command = list(command or report_command())
+    stream = REPORT_PATH_PLACEHOLDER not in ' '.join(command) if stream is None else stream
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(1)
+    async with semaphore:
+        report_path = None
+        if not stream:
+            descriptor, name = tempfile.mkstemp(suffix='.xml')
+            os.close(descriptor)
+            report_path = pathlib.Path(name)
+        args = [arg.replace(REPORT_PATH_PLACEHOLDER, str(report_path)) for arg in command]
+        logger.debug(f"Collecting battery report with {args[0]} ({'stdout' if stream else report_path})")
+        try:
+            return await asyncio.wait_for(_collect(args, stream, report_path, ns), timeout)
+        except asyncio.TimeoutError:
+            raise ReportTimeout(f"Report command did not finish within {timeout} seconds: {args[0]}") from None
+        finally:
+            if report_path is not None:
+                report_path.unlink(missing_ok=True)
+
+async def collect_reports(commands: Iterable[List[str]], concurrency: int = DEFAULT_CONCURRENCY,
+                          timeout: Optional[float] = DEFAULT_TIMEOUT, ns: str = BATTERY_NS) -> List[Union[Dict[str, object], BaseException]]:
+    """Run several report commands with at most concurrency at a time.
+
+    Returns one result per command in order: the extracted report, or the exception that command raised.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*(collect_report(command, timeout, semaphore, ns=ns) for command in commands),
+                                return_exceptions=True)
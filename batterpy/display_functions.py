@@ -1,20 +1,63 @@
+import json
 from loguru import logger
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+LOG_MODES = ('verbose', 'structured', 'jsonl')
+
+# verbose: one record per field (the original format); structured: one record per section; jsonl: one record per
+# section holding a JSON object per line. Usage logging can be sampled (every Nth entry) and capped.
+_settings = {'mode': 'structured', 'usage_limit': None, 'usage_sample': 1, 'level': 'INFO'}
+
+def configure_display_logging(mode: str = 'structured', usage_limit: Optional[int] = None, usage_sample: int = 1, level: str = 'INFO'):
+    """Choose how the display_* functions log and how much of the recent usage they include."""
+    if mode not in LOG_MODES:
+        raise ValueError(f"Unknown display log mode {mode!r}; expected one of {', '.join(LOG_MODES)}")
+    if usage_sample < 1:
+        raise ValueError("usage_sample must be at least 1")
+    _settings.update(mode=mode, usage_limit=usage_limit, usage_sample=usage_sample, level=level)
+
+def _log_section(title: str, records):
+    """Log a whole section as one record; `records` is only called if some handler accepts the level."""
+    jsonl = _settings['mode'] == 'jsonl'
+
+    def render() -> str:
+        if jsonl:
+            return "\n".join(json.dumps(record, separators=(',', ':'), default=str) for record in records())
+        return "\n".join("  " + ", ".join(f"{key}={value}" for key, value in record.items()) for record in records())
+    logger.opt(lazy=True, depth=1).log(_settings['level'], "{}:\n{}", lambda: title, render)
+
+def _sampled(usage) -> List[int]:
+    indices = range(0, len(usage), _settings['usage_sample'])
+    if _settings['usage_limit'] is not None:
+        indices = indices[:_settings['usage_limit']]
+    return list(indices)
 
 def display_report_information(info: Dict[str, str]):
     """Display report information."""
+    if _settings['mode'] != 'verbose':
+        _log_section("Report Information", lambda: [info])
+        return
     logger.info("Report Information:")
     for key, value in info.items():
         logger.info(f"  {key}: {value}")
 
 def display_system_information(info: Dict[str, str]):
     """Display system information."""
+    if _settings['mode'] != 'verbose':
+        _log_section("System Information", lambda: [info])
+        return
     logger.info("System Information:")
     for key, value in info.items():
         logger.info(f"  {key}: {value}")
 
 def display_battery_information(batteries: List[Dict[str, str]], calculate_battery_health, calculate_battery_degradation):
     """Display battery information."""
+    if _settings['mode'] != 'verbose':
+        _log_section("Battery Information", lambda: [
+            {**battery, 'Health': f"{calculate_battery_health(battery):.2f}%",
+             'Degradation': f"{calculate_battery_degradation(battery):.2f}%"}
+            for battery in batteries])
+        return
     logger.info("Battery Information:")
     for battery in batteries:
         logger.info("  Battery:")
@@ -27,8 +70,12 @@ def display_battery_information(batteries: List[Dict[str, str]], calculate_batte
 
 def display_recent_usage(usage: List[Dict[str, str]]):
     """Display recent usage information."""
+    if _settings['mode'] != 'verbose':
+        # Rows are only fetched (and, for a UsageTable, formatted) when the record is actually emitted
+        _log_section(f"Recent Usage ({len(usage)} entries)", lambda: (usage[index] for index in _sampled(usage)))
+        return
     logger.info("Recent Usage:")
-    for entry in usage:
+    for index in _sampled(usage):
         logger.info("  Entry:")
-        for key, value in entry.items():
+        for key, value in usage[index].items():
             logger.info(f"    {key}: {value}")
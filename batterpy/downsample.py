@@ -0,0 +1,72 @@
+import numpy as np
+
+DEFAULT_POINT_BUDGET = 2000
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Return the indices of the points kept by largest-triangle-three-buckets downsampling.
+
+    The first and last points are always kept; every bucket in between contributes the point forming the largest
+    triangle with the previously kept point and the average of the next bucket. x must be sorted.
+    """
+    length = len(x)
+    if threshold >= length or threshold < 3:
+        return np.arange(length)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, length - 1, threshold - 1).astype(np.int64)
+    # Averages of every bucket, used as the third triangle vertex for the bucket before it
+    sums_x = np.add.reduceat(x[:length - 1], edges[:-1])
+    sums_y = np.add.reduceat(y[:length - 1], edges[:-1])
+    counts = np.diff(edges)
+    average_x = np.append(sums_x / counts, x[-1])
+    average_y = np.append(sums_y / counts, y[-1])
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = length - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        bucket_x = x[start:end]
+        bucket_y = y[start:end]
+        area = np.abs((x[previous] - average_x[bucket + 1]) * (bucket_y - y[previous])
+                      - (x[previous] - bucket_x) * (average_y[bucket + 1] - y[previous]))
+        previous = start + int(np.argmax(area))
+        indices[bucket + 1] = previous
+    return indices
+
+def minmax(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Return the indices of the minimum and maximum of y in each of threshold // 2 buckets of near-equal size.
+
+    Keeps every extreme visible, which suits spiky series better than LTTB. NaN gaps are skipped. The output is
+    sorted by x.
+    """
+    length = len(x)
+    buckets = threshold // 2
+    if threshold >= length or buckets < 1:
+        return np.arange(length)
+    y = np.asarray(y, dtype=np.float64)
+    # length > 2 * buckets, so every bucket holds at least two points
+    edges = np.linspace(0, length, buckets + 1).astype(np.int64)
+    bucket_of = np.repeat(np.arange(buckets), np.diff(edges))
+    lows = np.flatnonzero(y == np.fmin.reduceat(y, edges[:-1])[bucket_of])
+    highs = np.flatnonzero(y == np.fmax.reduceat(y, edges[:-1])[bucket_of])
+    # Keep the first occurrence in each bucket, as argmin/argmax would; an all-NaN bucket has none
+    lows = lows[np.unique(bucket_of[lows], return_index=True)[1]]
+    highs = highs[np.unique(bucket_of[highs], return_index=True)[1]]
+    return np.unique(np.concatenate(([0, length - 1], lows, highs)))
+
+DOWNSAMPLERS = {'lttb': lttb, 'minmax': minmax}
+
+def downsample(x: np.ndarray, y: np.ndarray, threshold: int = DEFAULT_POINT_BUDGET, method: str = 'lttb'):
+    """Downsample a series to about threshold points and return the reduced (x, y)."""
+    x = np.asarray(x)
+    y = np.asarray(y)
+    indices = DOWNSAMPLERS[method](x, y, threshold)
+    return x[indices], y[indices]
+
+def visible_slice(x: np.ndarray, lower: float, upper: float) -> slice:
+    """Return the slice of sorted x inside [lower, upper], widened by one point on each side so lines reach the edges."""
+    start = max(int(np.searchsorted(x, lower, side='left')) - 1, 0)
+    stop = min(int(np.searchsorted(x, upper, side='right')) + 1, len(x))
+    return slice(start, stop)
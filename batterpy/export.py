@@ -0,0 +1,178 @@
+import base64
+import hashlib
+import html
+import io
+import os
+import pathlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from loguru import logger
+from typing import List, Dict, Iterable, Optional, Sequence, Tuple
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from .batch import find_reports
+from .calculations import calculate_battery_health, calculate_battery_degradation
+from .graph_generator import CHARTS, compute_chart_data, draw_chart
+from .report_generator import load_report
+
+EXPORT_FORMATS = ('png', 'svg', 'pdf')
+ARCHIVE_SUFFIX = '.bta'
+
+def load_any(report_path: str):
+    """Load a powercfg XML report or a Batterpy archive as (report_info, system_info, battery_info, recent_usage)."""
+    if pathlib.Path(report_path).suffix.lower() == ARCHIVE_SUFFIX:
+        from .archive import open_archive
+        return open_archive(report_path).load()
+    return load_report(report_path)
+
+def render_chart(index: int, data: Dict[str, object], formats: Sequence[str] = ('png',), dpi: int = 100) -> Dict[str, bytes]:
+    """Draw one of the nine charts on an offscreen Agg canvas and return the encoded image per format."""
+    fig = Figure(figsize=(8, 6), dpi=dpi)
+    FigureCanvasAgg(fig)
+    draw_chart(CHARTS[index], fig, data)
+    images = {}
+    for image_format in formats:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=image_format)
+        images[image_format] = buffer.getvalue()
+    return images
+
+def _prepare(report_path: str) -> Optional[Tuple[Dict[str, str], Dict[str, str], List[Dict[str, str]], Dict[str, object]]]:
+    report = load_any(report_path)
+    if report is None:
+        return None
+    report_info, system_info, battery_info, recent_usage = report
+    return report_info, system_info, battery_info, compute_chart_data(recent_usage, battery_info, report_info)
+
+def _table(rows: Iterable[Tuple[str, object]]) -> str:
+    return '<table>' + ''.join(f'<tr><th>{html.escape(str(key))}</th><td>{html.escape(str(value or ""))}</td></tr>'
+                               for key, value in rows) + '</table>'
+
+def build_html(title: str, report_info: Dict[str, str], system_info: Dict[str, str], battery_info: List[Dict[str, str]],
+               images: List[Dict[str, bytes]]) -> str:
+    """Return a self-contained HTML report with the charts embedded (inline SVG if rendered, else PNG data URIs)."""
+    parts = [f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{html.escape(title)}</title>',
+             '<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;margin-bottom:1em}'
+             'th,td{border:1px solid #ccc;padding:2px 8px;text-align:left}figure{margin:1em 0}'
+             'img,svg{max-width:100%;height:auto}</style></head><body>',
+             f'<h1>{html.escape(title)}</h1>', '<h2>Report Information</h2>', _table(report_info.items()),
+             '<h2>System Information</h2>', _table(system_info.items())]
+    for battery in battery_info:
+        parts.append(f"<h2>Battery {html.escape(battery.get('Id') or '')}</h2>")
+        parts.append(_table(list(battery.items()) + [('Health', f"{calculate_battery_health(battery):.2f}%"),
+                                                     ('Degradation', f"{calculate_battery_degradation(battery):.2f}%")]))
+    parts.append('<h2>Charts</h2>')
+    for chart, chart_images in zip(CHARTS, images):
+        if 'svg' in chart_images:
+            svg = chart_images['svg'].decode('utf-8')
+            # Drop the XML prolog and doctype so the SVG can be inlined
+            body = svg[svg.index('<svg'):]
+        else:
+            encoded = base64.b64encode(chart_images['png']).decode('ascii')
+            body = f'<img alt="{html.escape(chart.title)}" src="data:image/png;base64,{encoded}">'
+        parts.append(f'<figure>{body}</figure>')
+    parts.append('</body></html>')
+    return '\n'.join(parts)
+
+def output_names(report_paths: Sequence[str]) -> Dict[str, str]:
+    """Name each report's output subdirectory after its file stem, adding a hash of its full path when stems clash.
+
+    Stems are compared case-insensitively, since a.xml and A.bta share a directory on case-insensitive file systems.
+    """
+    stems = Counter(pathlib.Path(path).stem.lower() for path in report_paths)
+    names = {}
+    for path in report_paths:
+        name = pathlib.Path(path).stem
+        if stems[name.lower()] > 1:
+            digest = hashlib.sha1(str(pathlib.Path(path).resolve()).encode('utf-8')).hexdigest()[:8]
+            name = f'{name}-{digest}'
+        names[path] = name
+    if len({name.lower() for name in names.values()}) != len(names):
+        raise ValueError("Reports would share an output directory; rename one of them")
+    return names
+
+def _write_report(report_path: str, target: pathlib.Path, prepared, images: List[Dict[str, bytes]],
+                  formats: Sequence[str], write_html: bool) -> pathlib.Path:
+    report_info, system_info, battery_info, _ = prepared
+    target.mkdir(parents=True, exist_ok=True)
+    for index, chart_images in enumerate(images, start=1):
+        for image_format in formats:
+            (target / f'chart{index}.{image_format}').write_bytes(chart_images[image_format])
+    if write_html:
+        title = f"Battery report {system_info.get('ComputerName') or pathlib.Path(report_path).stem}"
+        (target / 'report.html').write_text(build_html(title, report_info, system_info, battery_info, images), encoding='utf-8')
+    return target
+
+def export_reports(report_paths: Iterable[str], output_dir: str, formats: Sequence[str] = ('png',), write_html: bool = True,
+                   workers: Optional[int] = None, dpi: int = 100) -> Dict[str, Optional[pathlib.Path]]:
+    """Render the nine charts of every report offscreen and write the images and an HTML report per report.
+
+    One process pool does all the work: a worker loads each report and computes its chart data, then each chart
+    is rendered as a separate task, so the nine figures of a report are drawn in parallel. Only Agg is used, so
+    no display server is needed. Each report gets its own subdirectory (see output_names). Returns the output
+    directory per report, or None for reports that failed.
+    """
+    unknown = set(formats) - set(EXPORT_FORMATS)
+    if unknown:
+        raise ValueError(f"Unsupported export formats: {', '.join(sorted(unknown))}")
+    # The HTML report embeds SVG when it was rendered and PNG otherwise
+    render_formats = list(formats) if not write_html or {'png', 'svg'} & set(formats) else list(formats) + ['png']
+    output = pathlib.Path(output_dir)
+    report_paths = list(dict.fromkeys(str(path) for path in report_paths))
+    names = output_names(report_paths)
+    workers = workers or os.cpu_count() or 1
+    logger.info(f"Exporting charts for {len(report_paths)} reports with {workers} workers")
+
+    results: Dict[str, Optional[pathlib.Path]] = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(_prepare, path): ('prepare', path, None) for path in report_paths}
+        prepared: Dict[str, object] = {}
+        images: Dict[str, List[Optional[Dict[str, bytes]]]] = {}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, path, index = pending.pop(future)
+                if path in results:
+                    continue
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to export {path}: {type(e).__name__}: {e}")
+                    results[path] = None
+                    prepared.pop(path, None)
+                    images.pop(path, None)
+                    continue
+                if stage == 'prepare':
+                    if result is None:
+                        logger.error(f"Failed to export {path}: could not parse report")
+                        results[path] = None
+                        continue
+                    prepared[path] = result
+                    images[path] = [None] * len(CHARTS)
+                    data = result[3]
+                    for chart_index, chart in enumerate(CHARTS):
+                        # Only ship the series each chart plots to its worker
+                        chart_data = {key: data[key] for key in chart.keys}
+                        future = executor.submit(render_chart, chart_index, chart_data, render_formats, dpi)
+                        pending[future] = ('render', path, chart_index)
+                    continue
+                images[path][index] = result
+                if all(chart_images is not None for chart_images in images[path]):
+                    target = _write_report(path, output / names[path], prepared.pop(path), images.pop(path), formats,
+                                           write_html)
+                    results[path] = target
+                    logger.info(f"Exported {path} to {target}")
+    failed = sum(target is None for target in results.values())
+    logger.info(f"Exported {len(results) - failed}/{len(results)} reports to {output}")
+    return results
+
+def export_paths(paths: Iterable[str]) -> List[str]:
+    """Expand directories into the reports and archives below them."""
+    reports = []
+    for path in paths:
+        if pathlib.Path(path).is_dir():
+            reports.extend(str(report) for report in find_reports(path))
+            reports.extend(str(report) for report in find_reports(path, f'*{ARCHIVE_SUFFIX}'))
+        else:
+            reports.append(path)
+    return reports
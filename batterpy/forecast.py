@@ -0,0 +1,256 @@
+import csv
+import os
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from loguru import logger
+from typing import List, Dict, Iterable, Optional, Tuple
+from .archive import open_archive
+from .batch import find_reports
+from .history_store import machine_key
+from .report_generator import load_report_sections
+from .time_index import UsageIndex
+from .usage_table import UsageTable, DATETIME_DTYPE
+
+DEFAULT_THRESHOLD = 80.0
+DEFAULT_HORIZON_DAYS = 91
+SECONDS_PER_DAY = 86400
+# Crossings further out than this are reported as never
+MAX_PROJECTION_DAYS = 100 * 365
+FADE_MODELS = ('linear', 'exponential')
+HISTORY_COLUMNS = ('StartDate', 'DesignCapacity', 'FullChargeCapacity')
+
+FORECAST_FIELDS = ('Machine', 'Battery', 'Points', 'FirstObserved', 'LastObserved', 'LastHealth', 'Model', 'LinearSlopePerYear',
+                   'ExponentialRatePerYear', 'CrossingDate', 'CrossesWithinHorizon')
+
+Series = Tuple[np.ndarray, np.ndarray]
+
+def pack_series(series: Iterable[Series]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """Flatten per-battery (timestamps, health %) series into (battery index, time in days, health) arrays."""
+    groups, days, health = [], [], []
+    count = 0
+    for index, (timestamps, values) in enumerate(series):
+        timestamps = np.asarray(timestamps, dtype=DATETIME_DTYPE)
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnat(timestamps) & np.isfinite(values)
+        groups.append(np.full(np.count_nonzero(valid), index, dtype=np.int64))
+        days.append(timestamps[valid].astype(np.int64) / SECONDS_PER_DAY)
+        health.append(values[valid])
+        count = index + 1
+    if not count:
+        return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0), 0
+    return np.concatenate(groups), np.concatenate(days), np.concatenate(health), count
+
+def _group_lines(groups: np.ndarray, x: np.ndarray, y: np.ndarray, weights: np.ndarray, count: int):
+    """Least-squares line per group from grouped sums: returns (points, mean x, mean y, slope)."""
+    points = np.bincount(groups, weights, minlength=count)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_x = np.bincount(groups, weights * x, minlength=count) / points
+        mean_y = np.bincount(groups, weights * y, minlength=count) / points
+        dx = np.where(weights > 0, x - mean_x[groups], 0.0)
+        dy = np.where(weights > 0, y - mean_y[groups], 0.0)
+        # Centred sums keep the fit well conditioned for timestamps ~20000 days from the epoch
+        slope = np.bincount(groups, dx * dy, minlength=count) / np.bincount(groups, dx * dx, minlength=count)
+    return points, mean_x, mean_y, slope
+
+def fit_capacity_fade(groups: np.ndarray, days: np.ndarray, health: np.ndarray, count: int) -> Dict[str, np.ndarray]:
+    """Fit linear and exponential capacity fade to every battery at once.
+
+    The linear model is health = a + b * t and the exponential one health = h0 * exp(-k * t), fitted as a line
+    on log(health) over the points with positive health. Both are closed-form least squares evaluated with
+    bincount over all batteries together, so the cost is O(total points) with no per-battery Python loop.
+    Batteries with fewer than two distinct times get NaN parameters. 'model' picks the fit with the smaller sum of
+    squared residuals in health percent.
+    """
+    ones = np.ones(len(groups))
+    points, mean_day, mean_health, slope = _group_lines(groups, days, health, ones, count)
+    positive = (health > 0).astype(np.float64)
+    log_health = np.log(np.where(health > 0, health, 1.0))
+    _, log_mean_day, mean_log_health, log_slope = _group_lines(groups, days, log_health, positive, count)
+
+    with np.errstate(invalid='ignore', over='ignore'):
+        linear_residual = health - (mean_health[groups] + slope[groups] * (days - mean_day[groups]))
+        exponential_residual = health - np.exp(mean_log_health[groups] + log_slope[groups] * (days - log_mean_day[groups]))
+    linear_sse = np.bincount(groups, linear_residual ** 2, minlength=count)
+    exponential_sse = np.bincount(groups, exponential_residual ** 2, minlength=count)
+
+    first = np.full(count, np.inf)
+    last = np.full(count, -np.inf)
+    np.minimum.at(first, groups, days)
+    np.maximum.at(last, groups, days)
+    # Health at each battery's latest observation
+    order = np.lexsort((days, groups))
+    is_last = np.append(groups[order][1:] != groups[order][:-1], True) if len(order) else np.zeros(0, dtype=bool)
+    last_health = np.full(count, np.nan)
+    last_health[groups[order][is_last]] = health[order][is_last]
+
+    fitted = np.isfinite(slope)
+    exponential_fitted = np.isfinite(log_slope)
+    model = np.where(exponential_fitted & (~fitted | (exponential_sse < linear_sse)), 'exponential', 'linear')
+    model = np.where(fitted | exponential_fitted, model, '')
+    return {
+        'points': points.astype(np.int64),
+        'first_day': first,
+        'last_day': last,
+        'last_health': last_health,
+        'linear_mean_day': mean_day,
+        'linear_mean_health': mean_health,
+        'linear_slope': slope,
+        'linear_sse': np.where(fitted, linear_sse, np.nan),
+        'exponential_mean_day': log_mean_day,
+        'exponential_mean_log_health': mean_log_health,
+        'exponential_rate': -log_slope,
+        'exponential_sse': np.where(exponential_fitted, exponential_sse, np.nan),
+        'model': model,
+    }
+
+def project_threshold_crossing(fit: Dict[str, np.ndarray], threshold: float = DEFAULT_THRESHOLD, model: str = 'best') -> np.ndarray:
+    """Return the date each battery's fitted health reaches threshold percent (NaT if it never does).
+
+    model is 'linear', 'exponential' or 'best' (each battery's better fit). Only fading fits cross; the date can
+    lie before the last observation when a battery is already below the threshold.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        linear = fit['linear_mean_day'] + (threshold - fit['linear_mean_health']) / fit['linear_slope']
+        linear = np.where(fit['linear_slope'] < 0, linear, np.nan)
+        exponential = fit['exponential_mean_day'] + (np.log(threshold) - fit['exponential_mean_log_health']) / -fit['exponential_rate']
+        exponential = np.where(fit['exponential_rate'] > 0, exponential, np.nan)
+    if model == 'linear':
+        day = linear
+    elif model == 'exponential':
+        day = exponential
+    elif model == 'best':
+        day = np.where(fit['model'] == 'exponential', exponential, linear)
+    else:
+        raise ValueError(f"Unknown fade model {model!r}; expected 'best' or one of {', '.join(FADE_MODELS)}")
+    valid = np.isfinite(day) & (day < fit['last_day'] + MAX_PROJECTION_DAYS)
+    seconds = np.where(valid, np.round(np.where(valid, day, 0) * SECONDS_PER_DAY), 0).astype(np.int64)
+    return np.where(valid, seconds.astype(DATETIME_DTYPE), np.datetime64('NaT', 's'))
+
+def forecast_fleet(series: Iterable[Series], threshold: float = DEFAULT_THRESHOLD, model: str = 'best') -> Dict[str, np.ndarray]:
+    """Fit every battery's (timestamps, health %) series and add its projected threshold 'crossing' date."""
+    fit = fit_capacity_fade(*pack_series(series))
+    fit['crossing'] = project_threshold_crossing(fit, threshold, model)
+    return fit
+
+def crossing_within(fit: Dict[str, np.ndarray], start, end) -> np.ndarray:
+    """Return a mask of the batteries projected to cross the threshold in [start, end), e.g. next quarter."""
+    crossing = fit['crossing']
+    with np.errstate(invalid='ignore'):
+        return ~np.isnat(crossing) & (crossing >= np.datetime64(start, 's')) & (crossing < np.datetime64(end, 's'))
+
+def battery_name(battery: Dict[str, str]) -> str:
+    """Name a battery in forecasts by its serial number, or its Id when it has none."""
+    return battery.get('SerialNumber') or battery.get('Id') or ''
+
+def _history_health(history: UsageTable) -> Optional[Series]:
+    """Return (StartDate, health %) of a capacity history with at least two periods, else None."""
+    if len(history) < 2 or not all(history.has_column(name) for name in HISTORY_COLUMNS):
+        return None
+    design = history.column('DesignCapacity').astype(np.float64)
+    valid = history.mask('DesignCapacity') & history.mask('FullChargeCapacity') & (design > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        health = np.where(valid, history.column('FullChargeCapacity') / design * 100, np.nan)
+    return history.column('StartDate'), health
+
+def health_series(report: Dict[str, object]) -> List[Tuple[str, str, np.ndarray, np.ndarray]]:
+    """Return (machine key, battery, timestamps, health %) series from an extracted report.
+
+    Each battery gets its own series from the per-battery capacity history (BatteryHistory) when that has at
+    least two periods for it. Otherwise one series covers the whole machine: the capacity history, or failing
+    that the daily mean FullChargeCapacity of the recent usage relative to the total design capacity. Such a
+    series is named after the battery on single-battery machines and '' on machines with several.
+    """
+    system_info = report['SystemInformation'] or {}
+    batteries = report['Batteries'] or []
+    machine = machine_key(system_info, batteries)
+    # BatteryHistory records may identify their battery by Id or by serial number
+    names = {battery[field]: battery_name(battery) for battery in batteries for field in ('Id', 'SerialNumber')
+             if battery.get(field)}
+    per_battery: Dict[str, List[Dict[str, str]]] = {}
+    for record in report.get('BatteryHistory') or []:
+        name = battery_name(record)
+        per_battery.setdefault(names.get(name, name), []).append(record)
+    series = []
+    for battery, records in per_battery.items():
+        health = _history_health(UsageTable.from_entries(records, infer_types=True))
+        if health is not None:
+            series.append((machine, battery, *health))
+    if series:
+        return series
+
+    battery = battery_name(batteries[0]) if len(batteries) == 1 else ''
+    history = report['History']
+    if not isinstance(history, UsageTable):
+        history = UsageTable.from_entries(history or [], infer_types=True)
+    health = _history_health(history)
+    if health is not None:
+        return [(machine, battery, *health)]
+    design = sum(int(battery_info.get('DesignCapacity') or 0) for battery_info in batteries)
+    usage = report['RecentUsage']
+    if not design or not len(usage):
+        return []
+    daily = UsageIndex(usage).aggregates('day')
+    return [(machine, battery, daily['start'], daily['FullChargeCapacity_mean'] / design * 100)]
+
+def _load_series(report_path: str) -> List[Tuple[str, str, np.ndarray, np.ndarray]]:
+    try:
+        if pathlib.Path(report_path).suffix.lower() == '.bta':
+            report = open_archive(report_path).to_report()
+        else:
+            report = load_report_sections(report_path)
+        return health_series(report) if report is not None else []
+    except Exception as e:
+        logger.error(f"Skipping {report_path}: {type(e).__name__}: {e}")
+        return []
+
+def run_forecast(directory: str, output_path: str, threshold: float = DEFAULT_THRESHOLD, horizon_days: int = DEFAULT_HORIZON_DAYS,
+                 workers: Optional[int] = None, model: str = 'best') -> Dict[str, np.ndarray]:
+    """Load every report and archive below a directory, fit the fleet and write one CSV row per series.
+
+    Series are per battery where the reports have per-battery history (see health_series); the Battery column is
+    empty for a multi-battery machine forecast as a whole. Series of the same battery from several reports are
+    merged before fitting. CrossesWithinHorizon flags the series projected to reach the threshold within
+    horizon_days of today.
+    """
+    reports = [str(path) for path in find_reports(directory) + find_reports(directory, '*.bta')]
+    workers = workers or os.cpu_count() or 1
+    logger.info(f"Loading capacity history from {len(reports)} reports with {workers} workers")
+    merged: Dict[Tuple[str, str], List[Series]] = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for series in executor.map(_load_series, reports, chunksize=max(1, len(reports) // (workers * 4) or 1)):
+            for machine, battery, timestamps, health in series:
+                merged.setdefault((machine, battery), []).append((timestamps, health))
+
+    keys = sorted(merged)
+    series = []
+    for key in keys:
+        timestamps = np.concatenate([timestamps for timestamps, _ in merged[key]]).astype(DATETIME_DTYPE)
+        health = np.concatenate([health for _, health in merged[key]])
+        # Overlapping reports repeat periods; keep one point per timestamp
+        timestamps, unique = np.unique(timestamps, return_index=True)
+        series.append((timestamps, health[unique]))
+    fit = forecast_fleet(series, threshold, model)
+    today = np.datetime64('today', 's')
+    soon = crossing_within(fit, today, today + np.timedelta64(horizon_days, 'D'))
+
+    with open(output_path, 'w', newline='', encoding='utf-8') as output:
+        writer = csv.DictWriter(output, fieldnames=FORECAST_FIELDS)
+        writer.writeheader()
+        for index, (machine, battery) in enumerate(keys):
+            writer.writerow({
+                'Machine': machine,
+                'Battery': battery,
+                'Points': int(fit['points'][index]),
+                'FirstObserved': np.datetime64(int(fit['first_day'][index] * SECONDS_PER_DAY), 's') if fit['points'][index] else '',
+                'LastObserved': np.datetime64(int(fit['last_day'][index] * SECONDS_PER_DAY), 's') if fit['points'][index] else '',
+                'LastHealth': round(float(fit['last_health'][index]), 2),
+                'Model': fit['model'][index] if model == 'best' else model,
+                'LinearSlopePerYear': round(float(fit['linear_slope'][index]) * 365, 3),
+                'ExponentialRatePerYear': round(float(fit['exponential_rate'][index]) * 365, 5),
+                'CrossingDate': '' if np.isnat(fit['crossing'][index]) else fit['crossing'][index],
+                'CrossesWithinHorizon': int(soon[index]),
+            })
+    logger.info(f"Wrote {len(keys)} forecasts to {output_path}; {int(soon.sum())} cross {threshold}% "
+                f"within {horizon_days} days")
+    return fit
@@ -1,13 +1,19 @@
-import matplotlib.pyplot as plt
 from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from .calculations import (calculate_battery_health, calculate_historical_health, calculate_cycle_count_over_time,
                           calculate_discharge_rate, calculate_average_discharge_rate, count_charge_discharge_cycles, 
                           estimate_time_to_full_charge, estimate_time_to_empty, calculate_energy_consumption)
-import tkinter as tk
-from typing import List, Dict
+from .downsample import DEFAULT_POINT_BUDGET, downsample, visible_slice
+from .tracing import span, traced
+from .usage_table import UsageTable, parse_utc_offset
+import matplotlib.dates as mdates
+import numpy as np
+from typing import List, Dict, Optional, Union
 
 def create_graphs(parent_frame):
+    # Tk and its matplotlib backend are only needed by the GUI; headless rendering uses this module without them
+    import tkinter as tk
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
     frame = tk.Frame(parent_frame)
     frame.pack(fill=tk.BOTH, expand=True)
 
@@ -58,136 +64,236 @@ def create_graphs(parent_frame):
 
     return fig1, canvas1, fig2, canvas2, fig3, canvas3, fig4, canvas4, fig5, canvas5, fig6, canvas6, fig7, canvas7, fig8, canvas8, fig9, canvas9, frame
 
-def update_graphs(fig1, canvas1, fig2, canvas2, fig3, canvas3, fig4, canvas4, fig5, canvas5, fig6, canvas6, fig7, canvas7, fig8, canvas8, fig9, canvas9, recent_usage: List[Dict[str, str]], battery_info: List[Dict[str, str]]):
-    timestamps = [entry['Timestamp'] for entry in recent_usage]
-    charge_capacities = [int(entry['ChargeCapacity']) for entry in recent_usage]
-    full_charge_capacities = [int(entry['FullChargeCapacity']) for entry in recent_usage]
+@traced('compute_chart_data')
+def compute_chart_data(recent_usage: Union[UsageTable, List[Dict[str, str]]], battery_info: List[Dict[str, str]],
+                       report_info: Optional[Dict[str, str]] = None) -> Dict[str, object]:
+    """Compute every series plotted by the nine charts.
+
+    Timestamps are UTC; they are shifted by the report's UtcOffset so the charts show the machine's local time.
+    """
+    usage = recent_usage if isinstance(recent_usage, UsageTable) else UsageTable.from_entries(recent_usage)
+    utc_offset = parse_utc_offset((report_info or {}).get('UtcOffset'))
+    timestamps = mdates.date2num(usage.column('Timestamp') + utc_offset) if usage.has_column('Timestamp') else np.zeros(0)
+    charge_capacities = usage.column('ChargeCapacity') if usage.has_column('ChargeCapacity') else np.zeros(0, dtype=np.int64)
+    full_charge_capacities = usage.column('FullChargeCapacity') if usage.has_column('FullChargeCapacity') else np.zeros(0, dtype=np.int64)
     design_capacity = int(battery_info[0]['DesignCapacity']) if battery_info else 0
-    
-    # Plot battery capacity over time
-    fig1.clear()
-    ax1 = fig1.add_subplot(111)
-    ax1.plot(timestamps, charge_capacities, label='Charge Capacity')
-    ax1.plot(timestamps, full_charge_capacities, label='Full Charge Capacity')
-    ax1.set_xlabel('Timestamp')
-    ax1.set_ylabel('Capacity (mWh)')
-    ax1.set_title('Battery Capacity Over Time')
-    ax1.legend()
-    ax1.xaxis.set_major_locator(plt.MaxNLocator(6))
-    fig1.autofmt_xdate()
-    fig1.tight_layout()
-    canvas1.draw()
-    
-    # Plot overall battery health
-    health_values = [calculate_battery_health(battery) for battery in battery_info]
-    labels = [battery['Id'] for battery in battery_info]
-    
-    fig2.clear()
-    ax2 = fig2.add_subplot(111)
-    ax2.bar(labels, health_values, color='green')
-    ax2.set_xlabel('Battery')
-    ax2.set_ylabel('Health (%)')
-    ax2.set_title('Battery Health')
-    fig2.tight_layout()
-    canvas2.draw()
 
-    # Plot historical battery health
-    historical_health = calculate_historical_health(recent_usage, design_capacity)
-    
-    fig3.clear()
-    ax3 = fig3.add_subplot(111)
-    ax3.plot(timestamps, historical_health, label='Historical Health', color='blue')
-    ax3.set_xlabel('Timestamp')
-    ax3.set_ylabel('Health (%)')
-    ax3.set_title('Historical Battery Health')
-    ax3.legend()
-    ax3.xaxis.set_major_locator(plt.MaxNLocator(6))
-    fig3.autofmt_xdate()
-    fig3.tight_layout()
-    canvas3.draw()
-    
-    # Plot cycle count over time
-    cycle_counts = calculate_cycle_count_over_time(recent_usage)
-    
-    fig4.clear()
-    ax4 = fig4.add_subplot(111)
-    if cycle_counts:
-        ax4.plot(timestamps, cycle_counts, label='Cycle Count', color='purple')
-    ax4.set_xlabel('Timestamp')
-    ax4.set_ylabel('Cycle Count')
-    ax4.set_title('Battery Cycle Count Over Time')
-    ax4.legend()
-    ax4.xaxis.set_major_locator(plt.MaxNLocator(6))
-    fig4.autofmt_xdate()
-    fig4.tight_layout()
-    canvas4.draw()
-    
-    # Plot discharge rate over time
-    discharge_rates = calculate_discharge_rate(recent_usage)
-    
-    fig5.clear()
-    ax5 = fig5.add_subplot(111)
-    if discharge_rates:
-        ax5.plot(timestamps[:len(discharge_rates)], discharge_rates, label='Discharge Rate', color='red')
-    ax5.set_xlabel('Timestamp')
-    ax5.set_ylabel('Discharge Rate')
-    ax5.set_title('Battery Discharge Rate Over Time')
-    ax5.legend()
-    ax5.xaxis.set_major_locator(plt.MaxNLocator(6))
-    fig5.autofmt_xdate()
-    fig5.tight_layout()
-    canvas5.draw()
+    average_discharge_rate = calculate_average_discharge_rate(usage)
+    current_capacity = int(charge_capacities[-1]) if len(charge_capacities) else 0
+    full_charge_capacity = int(full_charge_capacities[-1]) if len(full_charge_capacities) else 0
+    # Make sure the discharge rate is negative of charge rate
+    time_to_full_charge = estimate_time_to_full_charge(current_capacity, full_charge_capacity, average_discharge_rate)
+    time_to_empty = estimate_time_to_empty(current_capacity, average_discharge_rate)
 
-    # Plot energy consumption over time
-    energy_consumption = calculate_energy_consumption(recent_usage)
-    
-    fig6.clear()
-    ax6 = fig6.add_subplot(111)
-    if isinstance(energy_consumption, list):
-        ax6.plot(timestamps[:len(energy_consumption)], energy_consumption, label='Energy Consumption', color='orange')
-    ax6.set_xlabel('Timestamp')
-    ax6.set_ylabel('Energy (mWh)')
-    ax6.set_title('Energy Consumption Over Time')
-    ax6.legend()
-    ax6.xaxis.set_major_locator(plt.MaxNLocator(6))
-    fig6.autofmt_xdate()
-    fig6.tight_layout()
-    canvas6.draw()
+    return {
+        'timestamps': timestamps,
+        'time_label': _time_label(utc_offset),
+        'charge_capacities': charge_capacities,
+        'full_charge_capacities': full_charge_capacities,
+        'battery_labels': [battery['Id'] for battery in battery_info],
+        'health_values': [calculate_battery_health(battery) for battery in battery_info],
+        'historical_health': calculate_historical_health(usage, design_capacity),
+        'cycle_counts': calculate_cycle_count_over_time(usage),
+        'discharge_rates': calculate_discharge_rate(usage),
+        'energy_consumption': calculate_energy_consumption(usage),
+        'average_discharge_rate': [average_discharge_rate],
+        'charge_discharge_cycles': [count_charge_discharge_cycles(usage)],
+        'time_estimates': [time_to_full_charge, time_to_empty],
+    }
 
-    # Plot average discharge rate
-    average_discharge_rate = calculate_average_discharge_rate(recent_usage)
-    
-    fig7.clear()
-    ax7 = fig7.add_subplot(111)
-    ax7.bar(['Average Discharge Rate'], [average_discharge_rate], color='blue')
-    ax7.set_ylabel('Discharge Rate')
-    ax7.set_title('Average Discharge Rate')
-    fig7.tight_layout()
-    canvas7.draw()
+def _time_label(utc_offset: np.timedelta64) -> str:
+    minutes = int(utc_offset / np.timedelta64(1, 'm'))
+    sign = '-' if minutes < 0 else '+'
+    return f"Local time (UTC{sign}{abs(minutes) // 60:02d}:{abs(minutes) % 60:02d})"
 
-    # Plot charge/discharge cycles
-    charge_discharge_cycles = count_charge_discharge_cycles(recent_usage)
-    
-    fig8.clear()
-    ax8 = fig8.add_subplot(111)
-    ax8.bar(['Charge/Discharge Cycles'], [charge_discharge_cycles], color='green')
-    ax8.set_ylabel('Cycles')
-    ax8.set_title('Charge/Discharge Cycles')
-    fig8.tight_layout()
-    canvas8.draw()
+def _same(a, b) -> bool:
+    if a is None or b is None:
+        return a is b
+    return len(a) == len(b) and np.array_equal(np.asarray(a), np.asarray(b))
 
-    # Plot estimated time to full charge and to empty
-    current_capacity = charge_capacities[-1] if charge_capacities else 0
-    full_charge_capacity = full_charge_capacities[-1] if full_charge_capacities else 0
-    average_discharge_rate = calculate_average_discharge_rate(recent_usage)  # Make sure the discharge rate is negative of charge rate
-    
-    time_to_full_charge = estimate_time_to_full_charge(current_capacity, full_charge_capacity, average_discharge_rate)
-    time_to_empty = estimate_time_to_empty(current_capacity, average_discharge_rate)
-    
-    fig9.clear()
-    ax9 = fig9.add_subplot(111)
-    ax9.bar(['Time to Full Charge', 'Time to Empty'], [time_to_full_charge, time_to_empty], color=['blue', 'red'])
-    ax9.set_ylabel('Time (hours)')
-    ax9.set_title('Estimated Time to Full Charge and Empty')
-    fig9.tight_layout()
-    canvas9.draw()
+class LineChart:
+    """A time-series chart whose lines are created once and updated with set_data.
+
+    Each line keeps its full series and only hands matplotlib a downsampled copy of the part inside the current
+    x limits, recomputed whenever the axes are zoomed or panned.
+    """
+
+    def __init__(self, title: str, ylabel: str, series):
+        self.title = title
+        self.ylabel = ylabel
+        # (data key, label, color) per line
+        self.series = series
+        self.keys = ('timestamps', 'time_label') + tuple(key for key, _, _ in series)
+
+    def setup(self, fig: Figure, point_budget: int = DEFAULT_POINT_BUDGET, method: str = 'lttb'):
+        ax = fig.add_subplot(111)
+        lines = [ax.plot([], [], label=label, color=color)[0] for _, label, color in self.series]
+        # Real date axis: tick positions follow the visible span, and labels only repeat what changes between ticks
+        locator = mdates.AutoDateLocator()
+        ax.xaxis_date()
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+        ax.set_xlabel('Timestamp')
+        ax.set_ylabel(self.ylabel)
+        ax.set_title(self.title)
+        ax.legend()
+        state = {'ax': ax, 'lines': lines, 'data': [None] * len(lines), 'point_budget': point_budget, 'method': method}
+        ax.callbacks.connect('xlim_changed', lambda _: self.resample(state))
+        return state
+
+    def update(self, artists, data: Dict[str, object]):
+        ax = artists['ax']
+        timestamps = data['timestamps']
+        ax.set_xlabel(data['time_label'])
+        for index, (key, _, _) in enumerate(self.series):
+            values = np.asarray(data[key])
+            artists['data'][index] = (timestamps[:len(values)], values)
+        self.resample(artists, full=True)
+        ax.relim()
+        ax.autoscale_view()
+
+    def resample(self, artists, full: bool = False):
+        """Replace each line's points with a downsampled copy of its visible range."""
+        lower, upper = artists['ax'].get_xlim()
+        for line, series in zip(artists['lines'], artists['data']):
+            if series is None:
+                continue
+            x, y = series
+            if not full and len(x):
+                window = visible_slice(x, lower, upper)
+                x, y = x[window], y[window]
+            line.set_data(*downsample(x, y, artists['point_budget'], artists['method']))
+
+class BarChart:
+    """A bar chart whose bars are updated in place while the set of labels stays the same."""
+
+    def __init__(self, title: str, ylabel: str, values_key: str, color, labels=None, labels_key: str = None, xlabel: str = None):
+        self.title = title
+        self.ylabel = ylabel
+        self.values_key = values_key
+        self.color = color
+        self.labels = labels
+        self.labels_key = labels_key
+        self.xlabel = xlabel
+        self.keys = (values_key,) + ((labels_key,) if labels_key else ())
+
+    def setup(self, fig: Figure):
+        ax = fig.add_subplot(111)
+        if self.xlabel:
+            ax.set_xlabel(self.xlabel)
+        ax.set_ylabel(self.ylabel)
+        ax.set_title(self.title)
+        return {'ax': ax, 'bars': None, 'labels': None}
+
+    def update(self, artists, data: Dict[str, object]):
+        ax = artists['ax']
+        labels = list(data[self.labels_key]) if self.labels_key else self.labels
+        values = data[self.values_key]
+        if artists['bars'] is None or artists['labels'] != labels:
+            if artists['bars'] is not None:
+                artists['bars'].remove()
+            artists['bars'] = ax.bar(labels, values, color=self.color)
+            artists['labels'] = labels
+        else:
+            for bar, value in zip(artists['bars'], values):
+                bar.set_height(value)
+        ax.relim()
+        ax.autoscale_view()
+
+CHARTS = [
+    LineChart('Battery Capacity Over Time', 'Capacity (mWh)',
+              [('charge_capacities', 'Charge Capacity', None), ('full_charge_capacities', 'Full Charge Capacity', None)]),
+    BarChart('Battery Health', 'Health (%)', 'health_values', 'green', labels_key='battery_labels', xlabel='Battery'),
+    LineChart('Historical Battery Health', 'Health (%)', [('historical_health', 'Historical Health', 'blue')]),
+    LineChart('Battery Cycle Count Over Time', 'Cycle Count', [('cycle_counts', 'Cycle Count', 'purple')]),
+    LineChart('Battery Discharge Rate Over Time', 'Discharge Rate', [('discharge_rates', 'Discharge Rate', 'red')]),
+    LineChart('Energy Consumption Over Time', 'Energy (mWh)', [('energy_consumption', 'Energy Consumption', 'orange')]),
+    BarChart('Average Discharge Rate', 'Discharge Rate', 'average_discharge_rate', 'blue', labels=['Average Discharge Rate']),
+    BarChart('Charge/Discharge Cycles', 'Cycles', 'charge_discharge_cycles', 'green', labels=['Charge/Discharge Cycles']),
+    BarChart('Estimated Time to Full Charge and Empty', 'Time (hours)', 'time_estimates', ['blue', 'red'],
+             labels=['Time to Full Charge', 'Time to Empty']),
+]
+
+def draw_chart(chart, fig: Figure, data: Dict[str, object]):
+    """Draw a chart from scratch onto a figure."""
+    fig.clear()
+    chart.update(chart.setup(fig), data)
+    fig.tight_layout()
+
+class GraphManager:
+    """Keeps the nine figures' artists alive between refreshes and redraws only what changed and is visible."""
+
+    def __init__(self, figures: List[Figure], canvases, point_budget: int = DEFAULT_POINT_BUDGET):
+        self.figures = figures
+        self.canvases = canvases
+        self.artists = []
+        for chart, fig in zip(CHARTS, figures):
+            fig.clear()
+            self.artists.append(chart.setup(fig, point_budget) if isinstance(chart, LineChart) else chart.setup(fig))
+        self._draws = [traced(f'canvas.draw[{index}]')(canvas.draw) for index, canvas in enumerate(canvases, start=1)]
+        self._pending = set()
+        self._inputs = [None] * len(CHARTS)
+        self._dirty = set()
+        self.visible = set()
+
+    @traced('GraphManager.update')
+    def update(self, recent_usage: Union[UsageTable, List[Dict[str, str]]], battery_info: List[Dict[str, str]],
+               report_info: Optional[Dict[str, str]] = None):
+        """Feed new data to every chart whose inputs changed, then render the visible ones."""
+        data = compute_chart_data(recent_usage, battery_info, report_info)
+        for index, chart in enumerate(CHARTS):
+            inputs = [data[key] for key in chart.keys]
+            previous = self._inputs[index]
+            if previous is not None and all(_same(a, b) for a, b in zip(inputs, previous)):
+                continue
+            chart.update(self.artists[index], data)
+            self._inputs[index] = inputs
+            self._dirty.add(index)
+        self.render()
+
+    def set_visible(self, indices):
+        """Record which figures are on screen and render any of them that are out of date."""
+        self.visible = set(indices)
+        self.render()
+
+    def render(self):
+        for index in sorted(self._dirty & self.visible):
+            with span('render_figure', figure=index + 1, title=CHARTS[index].title):
+                self.figures[index].tight_layout()
+                self._draw_idle(index)
+            self._dirty.discard(index)
+
+    def _draw_idle(self, index: int):
+        """Draw a canvas once the Tk event loop is idle, as canvas.draw_idle does, with the draw itself traced."""
+        if index in self._pending:
+            return
+        self._pending.add(index)
+        def draw():
+            self._pending.discard(index)
+            self._draws[index]()
+        self.canvases[index].get_tk_widget().after_idle(draw)
+
+def visible_figures(scroll_canvas, canvases) -> List[int]:
+    """Return the indices of the figure canvases that overlap the visible part of a scrolled Tk canvas."""
+    if not scroll_canvas.winfo_ismapped():
+        return []
+    top = scroll_canvas.canvasy(0)
+    bottom = top + scroll_canvas.winfo_height()
+    visible = []
+    for index, canvas in enumerate(canvases):
+        widget = canvas.get_tk_widget()
+        y = widget.winfo_y()
+        if y < bottom and y + widget.winfo_height() > top:
+            visible.append(index)
+    return visible
+
+@traced('update_graphs')
+def update_graphs(fig1, canvas1, fig2, canvas2, fig3, canvas3, fig4, canvas4, fig5, canvas5, fig6, canvas6, fig7, canvas7, fig8, canvas8, fig9, canvas9, recent_usage: Union[UsageTable, List[Dict[str, str]]], battery_info: List[Dict[str, str]], report_info: Optional[Dict[str, str]] = None):
+    """Redraw all nine figures from scratch."""
+    data = compute_chart_data(recent_usage, battery_info, report_info)
+    figures = [fig1, fig2, fig3, fig4, fig5, fig6, fig7, fig8, fig9]
+    canvases = [canvas1, canvas2, canvas3, canvas4, canvas5, canvas6, canvas7, canvas8, canvas9]
+    for index, (chart, fig, canvas) in enumerate(zip(CHARTS, figures, canvases), start=1):
+        with span('draw_figure', figure=index, title=chart.title):
+            draw_chart(chart, fig, data)
+            canvas.draw()
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import pathlib
+import re
+import numpy as np
+from loguru import logger
+from typing import List, Dict, Optional, Union
+from .archive import encode_archive, open_archive
+from .report_generator import BATTERY_NS, REPORT_SECTIONS, iterparse_report
+from .streaming_metrics import StreamingMetrics
+from .usage_table import UsageTable
+
+META_FILE = 'meta.json'
+
+def machine_key(system_info: Dict[str, str], battery_info: List[Dict[str, str]]) -> str:
+    """Identify a machine by its ComputerName and the serial numbers of its batteries."""
+    serials = sorted(battery.get('SerialNumber') or '' for battery in battery_info)
+    return '|'.join([system_info.get('ComputerName') or ''] + serials)
+
+def new_usage(recent_usage: UsageTable, last_timestamp: Optional[np.datetime64]) -> UsageTable:
+    """Return the rows of recent_usage recorded strictly after last_timestamp, in Timestamp order.
+
+    Rows without a Timestamp are dropped. The order matters because the store is read by binary search.
+    """
+    if not recent_usage.has_column('Timestamp'):
+        return recent_usage[:0]
+    timestamps = recent_usage.column('Timestamp')
+    keep = ~np.isnat(timestamps) if last_timestamp is None else timestamps > last_timestamp
+    rows = np.flatnonzero(keep)
+    kept = timestamps[rows]
+    if np.any(kept[1:] < kept[:-1]):
+        rows = rows[np.argsort(kept, kind='stable')]
+    return recent_usage.take(rows)
+
+class HistoryStore:
+    """Append-only per-machine store of usage history built from successive reports.
+
+    Each machine gets a directory holding one archive segment per ingest with that ingest's new rows (see
+    write_archive), so every row reads back with the strings of its report, and a small meta.json listing the
+    segments with their Timestamp ranges, the last ingested Timestamp and the running StreamingMetrics totals,
+    which each ingest advances by the new rows only. A segment is written before the metadata that lists it is
+    replaced, so an interrupted ingest never exposes a partial segment.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _machine_dir(self, key: str) -> pathlib.Path:
+        readable = re.sub(r'[^A-Za-z0-9_.-]+', '_', key).strip('_')[:64]
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+        return self.directory / f"{readable}-{digest}"
+
+    def _read_meta(self, machine_dir: pathlib.Path) -> Dict:
+        try:
+            meta = json.loads((machine_dir / META_FILE).read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            meta = {'count': 0, 'last_timestamp': None, 'segments': [], 'metrics': None, 'metrics_error': None}
+        return meta
+
+    def _write_meta(self, machine_dir: pathlib.Path, meta: Dict):
+        temp_path = machine_dir / f"{META_FILE}.tmp"
+        temp_path.write_text(json.dumps(meta), encoding='utf-8')
+        os.replace(temp_path, machine_dir / META_FILE)
+
+    def _write_segment(self, machine_dir: pathlib.Path, name: str, report: Dict[str, object]):
+        temp_path = machine_dir / f"{name}.tmp"
+        temp_path.write_bytes(encode_archive(report))
+        os.replace(temp_path, machine_dir / name)
+
+    def machines(self) -> List[str]:
+        """Return the keys of every machine in the store."""
+        keys = []
+        for machine_dir in sorted(self.directory.iterdir()):
+            if (machine_dir / META_FILE).exists():
+                keys.append(self._read_meta(machine_dir)['key'])
+        return keys
+
+    def last_timestamp(self, key: str) -> Optional[np.datetime64]:
+        """Return the newest Timestamp ingested for a machine, or None if nothing has been stored."""
+        value = self._read_meta(self._machine_dir(key))['last_timestamp']
+        return np.datetime64(value) if value else None
+
+    def ingest(self, system_info: Dict[str, str], battery_info: List[Dict[str, str]],
+               recent_usage: Union[UsageTable, List[Dict[str, str]]]) -> int:
+        """Append the usage rows newer than the last ingested Timestamp and return how many were added."""
+        if not isinstance(recent_usage, UsageTable):
+            recent_usage = UsageTable.from_entries(recent_usage)
+        key = machine_key(system_info, battery_info)
+        machine_dir = self._machine_dir(key)
+        machine_dir.mkdir(exist_ok=True)
+        meta = self._read_meta(machine_dir)
+        last = np.datetime64(meta['last_timestamp']) if meta['last_timestamp'] else None
+
+        rows = new_usage(recent_usage, last)
+        if not len(rows):
+            return 0
+        metrics = None
+        metrics_error = meta['metrics_error']
+        if not meta['count']:
+            metrics = StreamingMetrics(keep_series=False)
+        elif meta['metrics']:
+            metrics = StreamingMetrics.from_state(meta['metrics'])
+        if metrics is not None:
+            try:
+                metrics.extend(rows)
+            except (KeyError, ZeroDivisionError) as e:
+                # The batch functions reject the whole history for such a row, so the running totals stop here
+                metrics_error = f"{type(e).__name__}: {e}"
+                logger.warning(f"Running metrics for {key} disabled by a row they cannot use: {metrics_error}")
+                metrics = None
+
+        # Named after the first row, so a segment left behind by an interrupted ingest is simply overwritten
+        name = f"usage-{meta['count']:012d}.bta"
+        self._write_segment(machine_dir, name, {'SystemInformation': system_info, 'Batteries': battery_info,
+                                                'RecentUsage': rows})
+        timestamps = rows.column('Timestamp')
+        meta['segments'].append({'file': name, 'count': len(rows), 'first': str(timestamps[0]), 'last': str(timestamps[-1])})
+        meta.update({
+            'key': key,
+            'count': meta['count'] + len(rows),
+            'metrics': metrics.state() if metrics is not None else None,
+            'metrics_error': metrics_error,
+            'last_timestamp': str(timestamps[-1]),
+        })
+        self._write_meta(machine_dir, meta)
+        logger.info(f"Ingested {len(rows)} new usage rows for {key}")
+        return len(rows)
+
+    def ingest_report(self, report_path: str, ns: str = BATTERY_NS) -> int:
+        """Ingest the new usage rows of a report file.
+
+        The report is streamed and, when SystemInformation and Batteries come before RecentUsage (as they do in
+        powercfg reports), reading stops at the end of RecentUsage instead of parsing the sections after it.
+        Raises OSError or ET.ParseError, without storing anything, if the part of the report it reads is unreadable.
+        """
+        usage_tag = REPORT_SECTIONS['RecentUsage'][1]
+        battery_tag = REPORT_SECTIONS['Batteries'][1]
+        system_info: Dict[str, str] = {}
+        battery_info: List[Dict[str, str]] = []
+        entries: List[Dict[str, str]] = []
+        stop_after_usage = None
+        for section, data in iterparse_report(report_path, ns):
+            if section == usage_tag:
+                if stop_after_usage is None:
+                    stop_after_usage = bool(system_info) and bool(battery_info)
+                entries.append(data)
+            elif entries and stop_after_usage:
+                break
+            elif section == 'SystemInformation':
+                system_info = data
+            elif section == battery_tag:
+                battery_info.append(data)
+        return self.ingest(system_info, battery_info, UsageTable.from_entries(entries))
+
+    def metrics(self, key: str) -> StreamingMetrics:
+        """Return the running metrics over every row stored for a machine without rescanning them.
+
+        Raises ValueError if a stored row is one the metrics cannot use (a zero Duration, a missing ChargeCapacity).
+        """
+        meta = self._read_meta(self._machine_dir(key))
+        if meta['metrics_error']:
+            raise ValueError(f"No running metrics for {key}: {meta['metrics_error']}")
+        if not meta['count']:
+            return StreamingMetrics(keep_series=False)
+        return StreamingMetrics.from_state(meta['metrics'])
+
+    def load(self, key: str, start: Optional[str] = None, end: Optional[str] = None) -> UsageTable:
+        """Return the stored usage of a machine, optionally limited to start <= Timestamp < end.
+
+        Only the segments whose Timestamp range overlaps the window are opened, and each is memory-mapped and
+        sliced by binary search.
+        """
+        machine_dir = self._machine_dir(key)
+        meta = self._read_meta(machine_dir)
+        start_time = np.datetime64(start, 's') if start else None
+        end_time = np.datetime64(end, 's') if end else None
+        tables = []
+        for segment in meta['segments']:
+            if (start_time is not None and np.datetime64(segment['last']) < start_time) or \
+                    (end_time is not None and np.datetime64(segment['first']) >= end_time):
+                continue
+            tables.append(open_archive(machine_dir / segment['file']).usage(start, end))
+        return UsageTable.concat(tables) if tables else UsageTable.from_entries([])
@@ -0,0 +1,133 @@
+import hashlib
+import os
+import pathlib
+from collections import OrderedDict
+from loguru import logger
+from typing import List, Dict, Optional, Tuple
+from .archive import encode_archive, read_archive
+from .report_generator import BATTERY_NS, load_report
+from .usage_table import UsageTable
+
+Report = Tuple[Dict[str, str], Dict[str, str], List[Dict[str, str]], UsageTable]
+
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+ENTRY_SUFFIX = '.bta'
+KEY_SUFFIX = '.key'
+
+def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as report:
+        for chunk in iter(lambda: report.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _atomic_write(path: pathlib.Path, data: bytes):
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    temp_path.write_bytes(data)
+    os.replace(temp_path, path)
+
+def serialize_report(report: Report) -> bytes:
+    """Encode an extracted report in the archive layout (see archive.encode_archive), keeping the row order."""
+    report_info, system_info, battery_info, recent_usage = report
+    return encode_archive({'ReportInformation': report_info, 'SystemInformation': system_info,
+                           'Batteries': battery_info, 'RecentUsage': recent_usage}, sort=False)
+
+def deserialize_report(data: bytes) -> Report:
+    """Decode a report encoded by serialize_report; the usage columns are read-only views of data."""
+    return read_archive(data).load()
+
+class ReportCache:
+    """On-disk cache of extracted reports keyed by file size, mtime and content hash, with LRU eviction.
+
+    A small key file maps (path, size, mtime) to the content digest so unchanged files are not even re-hashed;
+    the extracted data itself is stored once per digest. Every file is written atomically, so several
+    processes can share one cache directory.
+
+    The directory is scanned once, when the cache is opened; after that the total size and the least recently
+    used order are kept in memory, so a miss costs O(1) bookkeeping rather than a listing of the directory. Each
+    process only evicts files it knows about (those present at startup and those it has used since).
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_CACHE_SIZE, ns: str = BATTERY_NS):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ns = ns
+        self.hits = 0
+        self.misses = 0
+        # Cache files by path, least recently used first, with their sizes
+        self._files: 'OrderedDict[str, int]' = OrderedDict()
+        self._bytes = 0
+        for _, path, size in sorted((entry.stat().st_mtime_ns, entry.path, entry.stat().st_size) for entry in self._entries()):
+            self._files[path] = size
+            self._bytes += size
+
+    def stats(self) -> Dict[str, int]:
+        """Return the hit/miss counters and the size of the cache files this instance knows about."""
+        return {'hits': self.hits, 'misses': self.misses, 'bytes': self._bytes}
+
+    def _used(self, path: pathlib.Path, size: int):
+        """Record a cache file as the most recently used one."""
+        key = str(path)
+        self._bytes += size - self._files.pop(key, 0)
+        self._files[key] = size
+
+    def _digest(self, file_path: pathlib.Path) -> str:
+        stat = file_path.stat()
+        stat_key = hashlib.sha1(f"{file_path.resolve()}|{stat.st_size}|{stat.st_mtime_ns}".encode('utf-8')).hexdigest()
+        key_path = self.directory / f"{stat_key}{KEY_SUFFIX}"
+        try:
+            digest = key_path.read_text(encoding='utf-8')
+        except OSError:
+            digest = hash_file(str(file_path))
+            _atomic_write(key_path, digest.encode('utf-8'))
+        self._used(key_path, len(digest))
+        return digest
+
+    def load(self, file_path: str) -> Optional[Report]:
+        """Return the extracted report, parsing the XML only on a cache miss."""
+        path = pathlib.Path(file_path)
+        entry_path = self.directory / f"{self._digest(path)}{ENTRY_SUFFIX}"
+        try:
+            data = entry_path.read_bytes()
+            report = deserialize_report(data)
+            # Touching the entry keeps mtime ordered by last use for the scan of the next run
+            os.utime(entry_path)
+            self._used(entry_path, len(data))
+            self.hits += 1
+            return report
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry {entry_path}: {e}")
+
+        self.misses += 1
+        report = load_report(str(path), self.ns)
+        if report is not None:
+            data = serialize_report(report)
+            _atomic_write(entry_path, data)
+            self._used(entry_path, len(data))
+            self.evict()
+        return report
+
+    def _entries(self) -> List[os.DirEntry]:
+        return [entry for entry in os.scandir(self.directory) if entry.name.endswith((ENTRY_SUFFIX, KEY_SUFFIX))]
+
+    def evict(self):
+        """Delete least recently used files until the cache fits within max_bytes."""
+        while self._bytes > self.max_bytes and self._files:
+            path, size = self._files.popitem(last=False)
+            self._bytes -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Already evicted by another process
+                pass
+
+    def clear(self):
+        """Delete every cache entry."""
+        for entry in self._entries():
+            os.remove(entry.path)
+        self._files.clear()
+        self._bytes = 0
@@ -1,32 +1,102 @@
 import xml.etree.ElementTree as ET
+import functools
+import os
+import shlex
+import signal
 import subprocess
 import pathlib
 import tempfile
+import threading
+import time
 from loguru import logger
-from typing import List, Dict, Optional
+from .tracing import traced
+from .usage_table import UsageTable
+from typing import List, Dict, Iterable, Optional, Iterator, Tuple
 
-def generate_battery_report() -> pathlib.Path:
-    """Generate the battery report using a PowerShell script and return the report path."""
+BATTERY_NS = '{http://schemas.microsoft.com/battery/2012}'
+DEFAULT_REPORT_TIMEOUT = 120.0
+
+REPORT_INFORMATION_FIELDS = ('ReportGuid', 'ReportVersion', 'ScanTime', 'LocalScanTime', 'ReportStartTime',
+                             'LocalReportStartTime', 'ReportDuration', 'UtcOffset')
+SYSTEM_INFORMATION_FIELDS = ('ComputerName', 'SystemManufacturer', 'SystemProductName', 'BIOSDate', 'BIOSVersion',
+                             'OSBuild', 'PlatformRole', 'ConnectedStandby')
+BATTERY_FIELDS = ('Id', 'Manufacturer', 'SerialNumber', 'ManufactureDate', 'Chemistry', 'LongTerm',
+                  'RelativeCapacity', 'DesignCapacity', 'FullChargeCapacity', 'CycleCount')
+
+class ReportCancelled(Exception):
+    """Raised when report generation is cancelled before the command finishes."""
+
+class ReportTimeout(TimeoutError):
+    """Raised when the report command does not finish within its timeout."""
+
+def report_command() -> List[str]:
+    """Return the command that writes the XML report to {report_path}.
+
+    Set BATTERPY_REPORT_COMMAND to replace the PowerShell call, e.g. with a command that copies a fixture report.
+    """
+    override = os.environ.get('BATTERPY_REPORT_COMMAND')
+    if override:
+        return shlex.split(override)
+    script_path = pathlib.Path(__file__).parent.parent / 'Battery-Check.ps1'
+    return ['powershell', '-NoProfile', '-ExecutionPolicy', 'Bypass', '-File', str(script_path), '-HideConsole', '-ReportPath', '{report_path}']
+
+def kill_process_group(process):
+    """Kill a command started with start_new_session, including any children a wrapper script started.
+
+    Outside POSIX only the process itself is killed. Works for subprocess.Popen and asyncio processes alike.
+    """
+    if os.name == 'posix':
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    else:
+        process.kill()
+
+@traced('generate_battery_report')
+def generate_battery_report(command: Optional[List[str]] = None, cancel_event: Optional[threading.Event] = None,
+                            timeout: Optional[float] = DEFAULT_REPORT_TIMEOUT) -> pathlib.Path:
+    """Generate the battery report using a PowerShell script (or report_command()) and return the report path.
+
+    Raises ReportCancelled once cancel_event is set and ReportTimeout after timeout seconds, killing the command's
+    process group in both cases, and CalledProcessError on a non-zero exit status. The temporary report file is
+    removed whenever no report path is returned.
+    """
     with tempfile.NamedTemporaryFile(delete=False, suffix='.xml') as temp_file:
         report_path = pathlib.Path(temp_file.name)
         logger.info(f"Temporary report path: {report_path}")
 
-    script_path = pathlib.Path(__file__).parent.parent / 'Battery-Check.ps1'
-    logger.debug(f"Running {script_path} to generate battery report at {report_path}")
+    args = [arg.replace('{report_path}', str(report_path)) for arg in (command or report_command())]
+    logger.debug(f"Running {args[0]} to generate battery report at {report_path}")
+    deadline = None if timeout is None else time.monotonic() + timeout
     try:
-        subprocess.run(
-            ['powershell', '-NoProfile', '-ExecutionPolicy', 'Bypass', '-File', str(script_path), '-HideConsole', '-ReportPath', str(report_path)],
-            check=True,
-            creationflags=subprocess.CREATE_NO_WINDOW  # Prevent the PowerShell window from opening
+        process = subprocess.Popen(
+            args,
+            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0),  # Prevent the PowerShell window from opening
+            start_new_session=os.name == 'posix'
         )
-        logger.info(f"Battery report generated at {report_path}")
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error generating battery report: {e}")
-    except FileNotFoundError as e:
-        logger.error(f"PowerShell script not found: {e}")
-    
+        while True:
+            try:
+                returncode = process.wait(timeout=0.1)
+                break
+            except subprocess.TimeoutExpired:
+                if cancel_event is not None and cancel_event.is_set():
+                    kill_process_group(process)
+                    process.wait()
+                    raise ReportCancelled(f"Report generation cancelled: {args[0]}")
+                if deadline is not None and time.monotonic() >= deadline:
+                    kill_process_group(process)
+                    process.wait()
+                    raise ReportTimeout(f"Report command did not finish within {timeout} seconds: {args[0]}")
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, args)
+    except BaseException:
+        report_path.unlink(missing_ok=True)
+        raise
+    logger.info(f"Battery report generated at {report_path}")
     return report_path
 
+@traced('parse_xml')
 def parse_xml(file_path: str) -> Optional[ET.Element]:
     """Load the XML file and return the root element."""
     try:
@@ -36,77 +106,230 @@ def parse_xml(file_path: str) -> Optional[ET.Element]:
         logger.error(f"Error loading XML file: {e}")
         return None
 
-def extract_text_from_element(element, tag: str, ns: str) -> str:
-    """Extract text from a specific tag within an element."""
-    child = element.find(f'{ns}{tag}')
-    return child.text if child is not None else ""
+def _child_text(element, wanted: Dict[str, str], fields) -> Dict[str, str]:
+    # The first matching child wins and missing fields are ""
+    found = {}
+    for child in element:
+        field = wanted.get(child.tag)
+        if field is not None and field not in found:
+            found[field] = child.text
+    return {field: found.get(field, "") for field in fields}
+
+def _local_name(tag: str, ns: str) -> str:
+    return tag[len(ns):] if tag.startswith(ns) else tag
+
+# Every section Batterpy extracts, keyed by its tag under <BatteryReport>, as (layout, child tag, fields):
+#   fields   - the text of the listed child elements
+#   records  - one dict of child element text per repeated child
+#   entries  - the attributes of each repeated child; children of an entry are per-battery records
+#   groups   - the text of every grandchild, grouped by child tag (e.g. runtime at full charge / design capacity)
+REPORT_SECTIONS = {
+    'ReportInformation': ('fields', None, REPORT_INFORMATION_FIELDS),
+    'SystemInformation': ('fields', None, SYSTEM_INFORMATION_FIELDS),
+    'Batteries': ('records', 'Battery', BATTERY_FIELDS),
+    'RecentUsage': ('entries', 'UsageEntry', None),
+    'EnergyDrains': ('entries', 'Drain', None),
+    'History': ('entries', 'HistoryEntry', None),
+    'RuntimeEstimates': ('groups', None, None),
+}
+# Per-battery records nested in an entries section are collected under these keys
+NESTED_SECTIONS = {'History': 'BatteryHistory'}
+
+@functools.lru_cache(maxsize=None)
+def _section_table(ns: str) -> Dict[str, Tuple[str, str, Optional[str], Optional[Dict[str, str]], Optional[tuple]]]:
+    """Map each namespaced section tag to (name, layout, namespaced child tag, field lookup, fields)."""
+    return {f'{ns}{name}': (name, layout, f'{ns}{child}' if child else None,
+                            {f'{ns}{field}': field for field in fields} if fields else None, fields)
+            for name, (layout, child, fields) in REPORT_SECTIONS.items()}
+
+def empty_report() -> Dict[str, object]:
+    """Return the extraction result of a report that has none of the sections."""
+    report: Dict[str, object] = {}
+    for name, (layout, _, _) in REPORT_SECTIONS.items():
+        report[name] = {} if layout in ('fields', 'groups') else []
+    for nested in NESTED_SECTIONS.values():
+        report[nested] = []
+    report['RecentUsage'] = UsageTable.from_entries([])
+    return report
+
+def _extract_section(element, name: str, layout: str, child_tag: Optional[str], wanted, fields, ns: str):
+    if layout == 'fields':
+        return _child_text(element, wanted, fields)
+    if layout == 'records':
+        return [_child_text(child, wanted, fields) for child in element if child.tag == child_tag]
+    if layout == 'groups':
+        return {_local_name(child.tag, ns): {_local_name(item.tag, ns): item.text or "" for item in child}
+                for child in element}
+    entries = [child for child in element if child.tag == child_tag]
+    if name == 'RecentUsage':
+        return UsageTable.from_entries(entry.attrib for entry in entries)
+    return [dict(entry.attrib) for entry in entries]
+
+def _nested_records(entry, ns: str) -> List[Dict[str, str]]:
+    """Return the per-battery records inside an entry, tagged with the entry's period."""
+    period = {key: entry.attrib[key] for key in ('StartDate', 'EndDate') if key in entry.attrib}
+    return [{**period, **child.attrib} for child in entry]
+
+@traced('extract_report')
+def extract_report(root: ET.Element, ns: str = BATTERY_NS) -> Dict[str, object]:
+    """Extract every known section from a parsed report in a single walk over the tree.
+
+    Returns a dict keyed by section name (see REPORT_SECTIONS) plus 'BatteryHistory'; sections missing from the
+    report come back empty. Each element is visited once, so the cost is linear in the size of the report.
+    """
+    table = _section_table(ns)
+    report = empty_report()
+    for element in root:
+        section = table.get(element.tag)
+        if section is None:
+            continue
+        name, layout, child_tag, wanted, fields = section
+        report[name] = _extract_section(element, name, layout, child_tag, wanted, fields, ns)
+        if name in NESTED_SECTIONS:
+            report[NESTED_SECTIONS[name]] = [record for child in element if child.tag == child_tag
+                                             for record in _nested_records(child, ns)]
+    return report
 
+def _get_section(root: ET.Element, name: str, ns: str):
+    element = root.find(f'{ns}{name}')
+    if element is None:
+        return empty_report()[name]
+    _, layout, child_tag, wanted, fields = _section_table(ns)[f'{ns}{name}']
+    return _extract_section(element, name, layout, child_tag, wanted, fields, ns)
+
+@traced('get_report_information')
 def get_report_information(root: ET.Element, ns: str) -> Dict[str, str]:
     """Extract report information from the XML."""
-    report_info = root.find(f'{ns}ReportInformation')
-    if report_info is None:
-        return {}
-    info = {
-        'ReportGuid': extract_text_from_element(report_info, 'ReportGuid', ns),
-        'ReportVersion': extract_text_from_element(report_info, 'ReportVersion', ns),
-        'ScanTime': extract_text_from_element(report_info, 'ScanTime', ns),
-        'LocalScanTime': extract_text_from_element(report_info, 'LocalScanTime', ns),
-        'ReportStartTime': extract_text_from_element(report_info, 'ReportStartTime', ns),
-        'LocalReportStartTime': extract_text_from_element(report_info, 'LocalReportStartTime', ns),
-        'ReportDuration': extract_text_from_element(report_info, 'ReportDuration', ns),
-        'UtcOffset': extract_text_from_element(report_info, 'UtcOffset', ns),
-    }
-    return info
+    return _get_section(root, 'ReportInformation', ns)
 
+@traced('get_system_information')
 def get_system_information(root: ET.Element, ns: str) -> Dict[str, str]:
     """Extract system information from the XML."""
-    system_info = root.find(f'{ns}SystemInformation')
-    if system_info is None:
-        return {}
-    info = {
-        'ComputerName': extract_text_from_element(system_info, 'ComputerName', ns),
-        'SystemManufacturer': extract_text_from_element(system_info, 'SystemManufacturer', ns),
-        'SystemProductName': extract_text_from_element(system_info, 'SystemProductName', ns),
-        'BIOSDate': extract_text_from_element(system_info, 'BIOSDate', ns),
-        'BIOSVersion': extract_text_from_element(system_info, 'BIOSVersion', ns),
-        'OSBuild': extract_text_from_element(system_info, 'OSBuild', ns),
-        'PlatformRole': extract_text_from_element(system_info, 'PlatformRole', ns),
-        'ConnectedStandby': extract_text_from_element(system_info, 'ConnectedStandby', ns),
-    }
-    return info
+    return _get_section(root, 'SystemInformation', ns)
 
+@traced('get_battery_information')
 def get_battery_information(root: ET.Element, ns: str) -> List[Dict[str, str]]:
     """Extract battery information from the XML."""
-    batteries = root.find(f'{ns}Batteries')
-    battery_list = []
-    if batteries is None:
-        return battery_list
-    for battery in batteries.findall(f'{ns}Battery'):
-        info = {
-            'Id': extract_text_from_element(battery, 'Id', ns),
-            'Manufacturer': extract_text_from_element(battery, 'Manufacturer', ns),
-            'SerialNumber': extract_text_from_element(battery, 'SerialNumber', ns),
-            'ManufactureDate': extract_text_from_element(battery, 'ManufactureDate', ns),
-            'Chemistry': extract_text_from_element(battery, 'Chemistry', ns),
-            'LongTerm': extract_text_from_element(battery, 'LongTerm', ns),
-            'RelativeCapacity': extract_text_from_element(battery, 'RelativeCapacity', ns),
-            'DesignCapacity': extract_text_from_element(battery, 'DesignCapacity', ns),
-            'FullChargeCapacity': extract_text_from_element(battery, 'FullChargeCapacity', ns),
-            'CycleCount': extract_text_from_element(battery, 'CycleCount', ns),
-        }
-        battery_list.append(info)
-    return battery_list
-
-def get_recent_usage(root: ET.Element, ns: str) -> List[Dict[str, str]]:
+    return _get_section(root, 'Batteries', ns)
+
+@traced('get_recent_usage')
+def get_recent_usage(root: ET.Element, ns: str) -> UsageTable:
     """Extract recent usage information from the XML."""
-    recent_usage = root.find(f'{ns}RecentUsage')
-    usage_list = []
-    if recent_usage is None:
-        return usage_list
-    for entry in recent_usage.findall(f'{ns}UsageEntry'):
-        info = {attr: entry.attrib[attr] for attr in entry.attrib}
-        usage_list.append(info)
-    return usage_list
+    return _get_section(root, 'RecentUsage', ns)
+
+@traced('get_battery_history')
+def get_battery_history(root: ET.Element, ns: str) -> List[Dict[str, str]]:
+    """Extract the capacity history (design and full charge capacity per period) from the XML."""
+    return _get_section(root, 'History', ns)
+
+@traced('get_energy_drains')
+def get_energy_drains(root: ET.Element, ns: str) -> List[Dict[str, str]]:
+    """Extract the battery usage (energy drain) periods from the XML."""
+    return _get_section(root, 'EnergyDrains', ns)
+
+@traced('get_runtime_estimates')
+def get_runtime_estimates(root: ET.Element, ns: str) -> Dict[str, Dict[str, str]]:
+    """Extract the battery life estimates from the XML."""
+    return _get_section(root, 'RuntimeEstimates', ns)
+
+@traced('load_report_sections')
+def load_report_sections(file_path: str, ns: str = BATTERY_NS) -> Optional[Dict[str, object]]:
+    """Parse a report file and extract every section, returning None if the file cannot be parsed."""
+    root = parse_xml(file_path)
+    if root is None:
+        return None
+    return extract_report(root, ns)
+
+@traced('load_report')
+def load_report(file_path: str, ns: str = BATTERY_NS) -> Optional[Tuple[Dict[str, str], Dict[str, str], List[Dict[str, str]], UsageTable]]:
+    """Parse a report file and extract the sections the GUI shows, returning None if the file cannot be parsed."""
+    report = load_report_sections(file_path, ns)
+    if report is None:
+        return None
+    return report['ReportInformation'], report['SystemInformation'], report['Batteries'], report['RecentUsage']
+
+def report_records(events: Iterable[Tuple[str, ET.Element]], ns: str = BATTERY_NS,
+                   stack: Optional[List[ET.Element]] = None) -> Iterator[Tuple[str, object]]:
+    """Turn ('start'/'end', element) events from iterparse or XMLPullParser into (section, data) records.
+
+    Consumed elements are discarded as they are read. To continue a document fed in pieces (e.g. to an
+    XMLPullParser), pass the same stack list to every call.
+    """
+    table = _section_table(ns)
+    stack = [] if stack is None else stack
+    for event, element in events:
+        if event == 'start':
+            stack.append(element)
+            continue
+        stack.pop()
+        depth = len(stack)
+        if depth == 0 or depth > 2:
+            continue
+        if depth == 2:
+            section = table.get(stack[-1].tag)
+            if section is None:
+                pass
+            elif section[1] in ('fields', 'groups'):
+                # Kept until the whole section has been read
+                continue
+            elif element.tag == section[2]:
+                name, layout, child_tag, wanted, fields = section
+                if layout == 'records':
+                    yield _local_name(child_tag, ns), _child_text(element, wanted, fields)
+                else:
+                    yield _local_name(child_tag, ns), dict(element.attrib)
+                    if name in NESTED_SECTIONS:
+                        for record in _nested_records(element, ns):
+                            yield NESTED_SECTIONS[name], record
+        else:
+            section = table.get(element.tag)
+            if section is not None and section[1] in ('fields', 'groups'):
+                yield section[0], _extract_section(element, *section, ns)
+        # The consumed element is always the last child, so removing it is O(1)
+        element.clear()
+        stack[-1].remove(element)
+
+def iterparse_report(file_path, ns: str = BATTERY_NS) -> Iterator[Tuple[str, object]]:
+    """Stream the report, yielding (section, data) pairs and discarding elements once they are consumed.
+
+    Sections laid out as fields or groups (e.g. ('ReportInformation', dict)) are yielded whole; the others are
+    yielded one record at a time under the child tag, e.g. ('Battery', dict), ('UsageEntry', dict),
+    ('HistoryEntry', dict) and ('BatteryHistory', dict), in document order. Peak memory does not grow with the report.
+    file_path may also be a binary file object, such as a pipe. A missing or malformed report raises OSError or
+    ET.ParseError from the iteration, after the records read before the error have been yielded.
+    """
+    yield from report_records(ET.iterparse(file_path, events=('start', 'end')), ns)
+
+# Record name -> section it is collected into, e.g. 'HistoryEntry' -> 'History'
+RECORD_SECTIONS = {child: name for name, (layout, child, _) in REPORT_SECTIONS.items() if child}
+RECORD_SECTIONS.update({nested: nested for nested in NESTED_SECTIONS.values()})
+
+def collect_records(report: Dict[str, object], records: Iterable[Tuple[str, object]]) -> Iterator[Dict[str, str]]:
+    """Store each record in its section of report and yield the usage entries, which the caller tabulates."""
+    usage_tag = REPORT_SECTIONS['RecentUsage'][1]
+    for section, data in records:
+        if section == usage_tag:
+            yield data
+        elif section in RECORD_SECTIONS:
+            report[RECORD_SECTIONS[section]].append(data)
+        else:
+            report[section] = data
+
+@traced('parse_report_sections')
+def parse_report_sections(file_path, ns: str = BATTERY_NS) -> Dict[str, object]:
+    """Extract every section in a single streaming pass; the result matches extract_report.
+
+    Raises OSError or ET.ParseError if the report is missing or malformed, rather than returning partial sections.
+    """
+    report = empty_report()
+    report['RecentUsage'] = UsageTable.from_entries(collect_records(report, iterparse_report(file_path, ns)))
+    return report
+
+@traced('parse_report_streaming')
+def parse_report_streaming(file_path: str, ns: str = BATTERY_NS) -> Tuple[Dict[str, str], Dict[str, str], List[Dict[str, str]], UsageTable]:
+    """Extract report, system, battery and recent usage information in a single streaming pass."""
+    report = parse_report_sections(file_path, ns)
+    return report['ReportInformation'], report['SystemInformation'], report['Batteries'], report['RecentUsage']
 
 def calculate_battery_health(battery_info: Dict[str, str]) -> float:
     """Calculate the battery health percentage."""
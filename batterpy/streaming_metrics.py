@@ -0,0 +1,199 @@
+import math
+import numpy as np
+from .calculations import (Usage, calculate_discharge_rate_batch, calculate_energy_consumption_batch,
+                           calculate_charge_discharge_efficiency_batch, estimate_time_to_full_charge, estimate_time_to_empty)
+from .usage_table import UsageTable
+from typing import List, Dict, Optional
+
+def _add_exact(partials: List[float], value: float):
+    """Add value to a list of non-overlapping partial sums whose exact total is the running sum (as math.fsum does)."""
+    index = 0
+    for partial in partials:
+        if abs(value) < abs(partial):
+            value, partial = partial, value
+        high = value + partial
+        low = partial - (high - value)
+        if low:
+            partials[index] = low
+            index += 1
+        value = high
+    partials[index:] = [value]
+
+def _exact_parts(values: List[float]) -> List[float]:
+    """Return a few floats whose exact sum is the exact sum of values, using math.fsum on the remainder until it is 0."""
+    parts: List[float] = []
+    while True:
+        part = math.fsum(values + [-p for p in parts])
+        if part == 0:
+            return parts
+        parts.append(part)
+        if not math.isfinite(part):
+            return [part]
+
+class StreamingMetrics:
+    """Running usage metrics updated in O(1) per entry instead of rescanning the whole usage history.
+
+    After any sequence of update/extend calls the results equal the batch functions in calculations applied to
+    all entries seen so far. Sums are kept exactly (as the partials of math.fsum), so the averages equal the
+    fsum-based batch averages whatever the chunking. An entry the batch functions would reject (a zero Duration,
+    a missing ChargeCapacity) raises the same exception and leaves the state unchanged.
+
+    With keep_series=False only the running totals are kept and memory use is constant; state() and from_state()
+    save and restore them, e.g. between ingests into a HistoryStore.
+    """
+
+    def __init__(self, keep_series: bool = True):
+        self.keep_series = keep_series
+        self.count = 0
+        self._rate_partials: List[float] = []
+        self._rate_count = 0
+        self.charge_discharge_cycles = 0
+        self.total_energy_consumption = 0
+        self._efficiency_partials: List[float] = []
+        self._efficiency_count = 0
+        self._last_charge: Optional[int] = None
+        self.current_capacity = 0
+        self.full_charge_capacity = 0
+        self.discharge_rates: List[float] = []
+        self.energy_consumption: List[int] = []
+        self.efficiency: List[float] = []
+
+    def update(self, entry: Dict[str, str]):
+        """Add one UsageEntry attribute dict."""
+        # Validate and convert everything before touching the state
+        charge = int(entry['ChargeCapacity'])
+        rate = int(entry['Discharge']) / int(entry['Duration']) if 'Discharge' in entry and 'Duration' in entry else None
+        discharge = int(entry.get('Discharge', 0))
+
+        self.count += 1
+        if rate is not None:
+            _add_exact(self._rate_partials, rate)
+            self._rate_count += 1
+            if self.keep_series:
+                self.discharge_rates.append(rate)
+        if self._last_charge is not None:
+            if charge < self._last_charge:
+                self.charge_discharge_cycles += 1
+            consumption = self._last_charge - charge
+            self.total_energy_consumption += consumption
+            if self.keep_series:
+                self.energy_consumption.append(consumption)
+        if charge > 0:
+            efficiency = (charge - discharge) / charge * 100
+            _add_exact(self._efficiency_partials, efficiency)
+            self._efficiency_count += 1
+            if self.keep_series:
+                self.efficiency.append(efficiency)
+        self._last_charge = charge
+        self.current_capacity = charge
+        if 'FullChargeCapacity' in entry:
+            self.full_charge_capacity = int(entry['FullChargeCapacity'])
+
+    def extend(self, recent_usage: Usage):
+        """Add many entries at once; a UsageTable is folded in with vectorized operations."""
+        if not isinstance(recent_usage, UsageTable):
+            for entry in recent_usage:
+                self.update(entry)
+            return
+        length = len(recent_usage)
+        if not length:
+            return
+        if not recent_usage.has_column('ChargeCapacity'):
+            raise KeyError('ChargeCapacity')
+        present = recent_usage.mask('ChargeCapacity')
+        charge = recent_usage.column('ChargeCapacity').astype(np.int64)
+        # The batch functions check the whole chunk before the state changes
+        consumption = calculate_energy_consumption_batch(
+            charge if self._last_charge is None else np.concatenate(([self._last_charge], charge)), present)
+        if recent_usage.has_column('Discharge') and recent_usage.has_column('Duration'):
+            rates = calculate_discharge_rate_batch(recent_usage.column('Discharge'), recent_usage.column('Duration'),
+                                                   recent_usage.mask('Discharge') & recent_usage.mask('Duration'))
+        else:
+            rates = np.zeros(0, dtype=np.float64)
+        discharge = recent_usage.column('Discharge') if recent_usage.has_column('Discharge') else np.zeros(length, dtype=np.int64)
+        efficiency = calculate_charge_discharge_efficiency_batch(charge, discharge)
+
+        self.count += length
+        if len(rates):
+            for part in _exact_parts(rates.tolist()):
+                _add_exact(self._rate_partials, part)
+            self._rate_count += len(rates)
+        self.charge_discharge_cycles += int(np.count_nonzero(consumption > 0))
+        self.total_energy_consumption += int(consumption.sum())
+        if len(efficiency):
+            for part in _exact_parts(efficiency.tolist()):
+                _add_exact(self._efficiency_partials, part)
+            self._efficiency_count += len(efficiency)
+        if self.keep_series:
+            self.discharge_rates.extend(rates.tolist())
+            self.energy_consumption.extend(consumption.tolist())
+            self.efficiency.extend(efficiency.tolist())
+        self._last_charge = int(charge[-1])
+        self.current_capacity = self._last_charge
+        if recent_usage.has_column('FullChargeCapacity'):
+            full = recent_usage.mask('FullChargeCapacity').nonzero()[0]
+            if len(full):
+                self.full_charge_capacity = int(recent_usage.column('FullChargeCapacity')[full[-1]])
+
+    @property
+    def average_discharge_rate(self) -> float:
+        """Same as calculate_average_discharge_rate over every entry seen."""
+        return math.fsum(self._rate_partials) / self._rate_count if self._rate_count else 0.0
+
+    @property
+    def average_efficiency(self) -> float:
+        """Mean of calculate_charge_discharge_efficiency over every entry seen."""
+        return math.fsum(self._efficiency_partials) / self._efficiency_count if self._efficiency_count else 0.0
+
+    @property
+    def time_to_full_charge(self) -> float:
+        return estimate_time_to_full_charge(self.current_capacity, self.full_charge_capacity, self.average_discharge_rate)
+
+    @property
+    def time_to_empty(self) -> float:
+        return estimate_time_to_empty(self.current_capacity, self.average_discharge_rate)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return the current totals as a dict."""
+        return {
+            'entries': self.count,
+            'average_discharge_rate': self.average_discharge_rate,
+            'charge_discharge_cycles': self.charge_discharge_cycles,
+            'total_energy_consumption': self.total_energy_consumption,
+            'average_efficiency': self.average_efficiency,
+            'current_capacity': self.current_capacity,
+            'full_charge_capacity': self.full_charge_capacity,
+            'time_to_full_charge': self.time_to_full_charge,
+            'time_to_empty': self.time_to_empty,
+        }
+
+    def state(self) -> Dict[str, object]:
+        """Return the running totals as a JSON-serializable dict (the series are not included)."""
+        return {
+            'count': self.count,
+            'rate_partials': list(self._rate_partials),
+            'rate_count': self._rate_count,
+            'charge_discharge_cycles': self.charge_discharge_cycles,
+            'total_energy_consumption': self.total_energy_consumption,
+            'efficiency_partials': list(self._efficiency_partials),
+            'efficiency_count': self._efficiency_count,
+            'last_charge': self._last_charge,
+            'current_capacity': self.current_capacity,
+            'full_charge_capacity': self.full_charge_capacity,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, object]) -> 'StreamingMetrics':
+        """Restore totals saved by state(); the result keeps no series."""
+        metrics = cls(keep_series=False)
+        metrics.count = state['count']
+        metrics._rate_partials = list(state['rate_partials'])
+        metrics._rate_count = state['rate_count']
+        metrics.charge_discharge_cycles = state['charge_discharge_cycles']
+        metrics.total_energy_consumption = state['total_energy_consumption']
+        metrics._efficiency_partials = list(state['efficiency_partials'])
+        metrics._efficiency_count = state['efficiency_count']
+        metrics._last_charge = state['last_charge']
+        metrics.current_capacity = state['current_capacity']
+        metrics.full_charge_capacity = state['full_charge_capacity']
+        return metrics
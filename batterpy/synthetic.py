@@ -0,0 +1,146 @@
+import sys
+import numpy as np
+from xml.sax.saxutils import escape
+from typing import TextIO, Union
+
+NAMESPACE = 'http://schemas.microsoft.com/battery/2012'
+
+USAGE_ENTRY = ('    <UsageEntry Timestamp="{ts}" LocalTimestamp="{local}" Duration="{duration}" Ac="{ac}" '
+               'EntryType="{entry_type}" ChargeCapacity="{charge}" Discharge="{discharge}" '
+               'FullChargeCapacity="{full}" IsNextOnBattery="{next_on_battery}" />\n')
+HISTORY_ENTRY = ('    <HistoryEntry StartDate="{start}" EndDate="{end}" LocalStartDate="{local_start}" '
+                 'LocalEndDate="{local_end}" DesignCapacity="{design}" FullChargeCapacity="{full}" CycleCount="{cycles}" '
+                 'ActiveAcTime="{active_ac}" CsAcTime="{cs_ac}" ActiveDcTime="{active_dc}" CsDcTime="{cs_dc}" '
+                 'ActiveDcEnergy="{active_dc_energy}" CsDcEnergy="{cs_dc_energy}" BatteryChanged="0" />\n')
+DRAIN_ENTRY = ('    <Drain StartTimestamp="{start}" LocalStartTimestamp="{local_start}" EndTimestamp="{end}" '
+               'LocalEndTimestamp="{local_end}" StartChargeCapacity="{start_charge}" EndChargeCapacity="{end_charge}" '
+               'FullChargeCapacity="{full}" />\n')
+
+def _element(tag: str, value) -> str:
+    return f"    <{tag}>{escape(str(value))}</{tag}>\n"
+
+def _format_times(times: np.ndarray) -> np.ndarray:
+    return np.datetime_as_string(times, unit='s')
+
+def write_synthetic_report(output: Union[str, TextIO], entries: int = 1000, batteries: int = 1, seed: int = 0,
+                           start: str = '2024-01-01T00:00:00', interval: int = 600, utc_offset_hours: int = -7,
+                           chunk_size: int = 50_000):
+    """Write a powercfg-schema battery report with the given number of batteries and usage entries.
+
+    Usage entries are generated and written in chunks, so even a million-entry report is produced in bounded
+    memory. The capacity follows charge/discharge cycles while the full charge capacity fades slowly over time.
+    """
+    if isinstance(output, str):
+        with open(output, 'w', encoding='utf-8') as report_file:
+            write_synthetic_report(report_file, entries, batteries, seed, start, interval, utc_offset_hours, chunk_size)
+        return
+
+    rng = np.random.default_rng(seed)
+    first = np.datetime64(start, 's')
+    step = np.timedelta64(interval, 's')
+    offset = np.timedelta64(utc_offset_hours * 3600, 's')
+    last = first + step * max(entries - 1, 0)
+    design_capacities = rng.integers(40_000, 90_000, batteries)
+    # Capacity fade over the report as a fraction of design capacity per entry
+    fade = rng.uniform(0.05, 0.25, batteries) / max(entries, 1)
+
+    write = output.write
+    write('<?xml version="1.0" encoding="utf-8"?>\n')
+    write(f'<BatteryReport xmlns="{NAMESPACE}">\n')
+    write('  <ReportInformation>\n')
+    write(_element('ReportVersion', 1))
+    write(_element('ReportGuid', '{%08x-0000-0000-0000-%012x}' % (seed, entries)))
+    write(_element('ScanTime', f"{last}Z"))
+    write(_element('LocalScanTime', last + offset))
+    write(_element('ReportStartTime', f"{first}Z"))
+    write(_element('LocalReportStartTime', first + offset))
+    write(_element('ReportDuration', int((last - first) / np.timedelta64(1, 's'))))
+    sign = '-' if utc_offset_hours < 0 else ''
+    write(_element('UtcOffset', f"{sign}{abs(utc_offset_hours):02d}:00:00"))
+    write('  </ReportInformation>\n')
+
+    write('  <SystemInformation>\n')
+    for tag, value in (('ComputerName', f'SYNTHETIC-{seed}'), ('SystemManufacturer', 'Batterpy'),
+                       ('SystemProductName', 'Synthetic Laptop'), ('BIOSDate', '01/01/2024'), ('BIOSVersion', '1.0'),
+                       ('OSBuild', '22631'), ('PlatformRole', '2'), ('ConnectedStandby', '1')):
+        write(_element(tag, value))
+    write('  </SystemInformation>\n')
+
+    write('  <Batteries>\n')
+    for index in range(batteries):
+        full = int(design_capacities[index] * (1 - fade[index] * entries))
+        write('   <Battery>\n')
+        for tag, value in (('Id', f'BAT{index + 1}'), ('Manufacturer', 'Synthetic'), ('SerialNumber', f'{seed:04d}{index:04d}'),
+                           ('ManufactureDate', ''), ('Chemistry', 'LION'), ('LongTerm', 1), ('RelativeCapacity', 0),
+                           ('DesignCapacity', design_capacities[index]), ('FullChargeCapacity', full),
+                           ('CycleCount', entries // 144)):
+            write(_element(tag, value))
+        write('   </Battery>\n')
+    write('  </Batteries>\n')
+
+    write('  <RecentUsage>\n')
+    design = int(design_capacities[0])
+    charge = design * 0.8
+    for chunk_start in range(0, entries, chunk_size):
+        count = min(chunk_size, entries - chunk_start)
+        positions = np.arange(chunk_start, chunk_start + count)
+        times = first + step * positions
+        full_capacity = (design * (1 - fade[0] * positions)).astype(np.int64)
+        on_ac = (positions // 36) % 3 == 0
+        durations = rng.integers(interval // 2, interval * 2, count)
+        drains = rng.integers(50, 1500, count)
+        timestamps = _format_times(times)
+        local_times = _format_times(times + offset)
+        for position in range(count):
+            full = int(full_capacity[position])
+            if on_ac[position]:
+                discharge = 0
+                charge = min(full, charge + full * 0.05)
+            else:
+                discharge = int(drains[position])
+                charge = max(full * 0.05, charge - discharge)
+            write(USAGE_ENTRY.format(ts=timestamps[position], local=local_times[position], duration=durations[position],
+                                     ac=int(on_ac[position]), entry_type='Active' if position % 5 else 'Standby',
+                                     charge=int(charge), discharge=discharge, full=full,
+                                     next_on_battery=int(not on_ac[position])))
+    write('  </RecentUsage>\n')
+
+    write('  <History>\n')
+    day = np.timedelta64(1, 'D')
+    days = max(1, int((last - first) / day))
+    for period_start in range(0, days, 7):
+        period_first = first + period_start * day
+        period_end = min(period_first + 7 * day, last)
+        position = min(entries - 1, int((period_end - first) / step)) if entries else 0
+        write(HISTORY_ENTRY.format(start=period_first, end=period_end, local_start=period_first + offset,
+                                   local_end=period_end + offset, design=design,
+                                   full=int(design * (1 - fade[0] * position)), cycles=position // 144,
+                                   active_ac=int(rng.integers(1, 40)) * 3600, cs_ac=int(rng.integers(1, 40)) * 3600,
+                                   active_dc=int(rng.integers(1, 40)) * 3600, cs_dc=int(rng.integers(1, 40)) * 3600,
+                                   active_dc_energy=int(rng.integers(10_000, 200_000)),
+                                   cs_dc_energy=int(rng.integers(1_000, 20_000))))
+    write('  </History>\n')
+
+    write('  <EnergyDrains>\n')
+    # One drain per battery stretch of the usage pattern (entries are on AC for one period in three)
+    for period_start in range(36, entries, 108):
+        period_end = min(period_start + 71, entries - 1)
+        full = int(design * (1 - fade[0] * period_start))
+        write(DRAIN_ENTRY.format(start=first + step * period_start, local_start=first + step * period_start + offset,
+                                 end=first + step * period_end, local_end=first + step * period_end + offset,
+                                 start_charge=full, end_charge=int(full * 0.1), full=full))
+    write('  </EnergyDrains>\n')
+
+    write('  <RuntimeEstimates>\n')
+    full = int(design * (1 - fade[0] * entries))
+    for tag, capacity in (('FullChargeCapacity', full), ('DesignCapacity', design)):
+        write(f'   <{tag}>\n')
+        write(_element('ActiveRuntime', f"PT{capacity // 10_000}H{capacity // 200 % 60}M"))
+        write(_element('ConnectedStandbyRuntime', f"PT{capacity // 500}H"))
+        write(f'   </{tag}>\n')
+    write('  </RuntimeEstimates>\n')
+    write('</BatteryReport>\n')
+
+if __name__ == '__main__':
+    from .cli import main
+    sys.exit(main(['synthetic'] + sys.argv[1:]))
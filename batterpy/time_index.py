@@ -0,0 +1,121 @@
+import numpy as np
+from .usage_table import UsageTable, DATETIME_DTYPE
+from typing import Dict, Optional, Tuple, Union
+
+TimeLike = Union[str, np.datetime64]
+
+# Bucket widths in seconds; weeks start on Monday (1970-01-05 is the first Monday after the epoch)
+BUCKETS = {'hour': 3600, 'day': 86400, 'week': 7 * 86400}
+BUCKET_ORIGINS = {'hour': 0, 'day': 0, 'week': 4 * 86400}
+AGGREGATED_COLUMNS = ('ChargeCapacity', 'FullChargeCapacity', 'DischargeRate')
+
+def _as_seconds(value: TimeLike) -> np.int64:
+    return np.datetime64(value, 's').astype(np.int64)
+
+class UsageIndex:
+    """Sorted Timestamp index over a UsageTable for windowed queries in O(log n + k).
+
+    The timestamps are parsed once into a sorted int64 array of epoch seconds (rows without a Timestamp are left
+    out), so a window is two binary searches. Per-bucket min, max and mean of ChargeCapacity, FullChargeCapacity
+    and the discharge rate are computed on first use for each bucket size and then reused, so zoomed-out views
+    can be drawn from a handful of buckets instead of every entry.
+    """
+
+    def __init__(self, usage: UsageTable):
+        self.usage = usage
+        if usage.has_column('Timestamp'):
+            timestamps = usage.column('Timestamp')
+            valid = ~np.isnat(timestamps)
+            seconds = timestamps.astype(DATETIME_DTYPE).astype(np.int64)
+        else:
+            valid = np.zeros(len(usage), dtype=bool)
+            seconds = np.zeros(len(usage), dtype=np.int64)
+        rows = np.flatnonzero(valid)
+        order = np.argsort(seconds[rows], kind='stable')
+        self.rows = rows[order]
+        self.seconds = seconds[self.rows]
+        # Windows are plain slices of the table when every row has a Timestamp and the rows are already in order
+        self._contiguous = len(self.rows) == len(usage) and bool(np.all(order[1:] > order[:-1]))
+        self._aggregates: Dict[str, Dict[str, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def bounds(self, start: Optional[TimeLike] = None, end: Optional[TimeLike] = None) -> Tuple[int, int]:
+        """Return the positions in the index of the entries with start <= Timestamp < end."""
+        lo = int(np.searchsorted(self.seconds, _as_seconds(start), side='left')) if start is not None else 0
+        hi = int(np.searchsorted(self.seconds, _as_seconds(end), side='left')) if end is not None else len(self.seconds)
+        return lo, max(lo, hi)
+
+    def window(self, start: Optional[TimeLike] = None, end: Optional[TimeLike] = None) -> UsageTable:
+        """Return the entries with start <= Timestamp < end, in chronological order."""
+        lo, hi = self.bounds(start, end)
+        if self._contiguous:
+            return self.usage[lo:hi]
+        return self.usage.take(self.rows[lo:hi])
+
+    def last(self, duration: np.timedelta64) -> UsageTable:
+        """Return the entries within duration of the newest one, e.g. last(np.timedelta64(24, 'h'))."""
+        if not len(self.seconds):
+            return self.usage[:0]
+        newest = self.seconds[-1]
+        start = np.datetime64(int(newest - duration / np.timedelta64(1, 's')), 's')
+        return self.window(start, None)
+
+    def _column(self, name: str) -> np.ndarray:
+        # Values in index order as floats, NaN where the entry has no value
+        usage = self.usage
+        if name == 'DischargeRate':
+            if not (usage.has_column('Discharge') and usage.has_column('Duration')):
+                return np.full(len(self.rows), np.nan)
+            discharge = usage.column('Discharge')[self.rows].astype(np.float64)
+            duration = usage.column('Duration')[self.rows].astype(np.float64)
+            present = (usage.mask('Discharge') & usage.mask('Duration'))[self.rows] & (duration != 0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(present, discharge / duration, np.nan)
+        if not usage.has_column(name):
+            return np.full(len(self.rows), np.nan)
+        return np.where(usage.mask(name)[self.rows], usage.column(name)[self.rows].astype(np.float64), np.nan)
+
+    def aggregates(self, bucket: str = 'day', start: Optional[TimeLike] = None, end: Optional[TimeLike] = None) -> Dict[str, np.ndarray]:
+        """Return per-bucket aggregates for the buckets overlapping [start, end).
+
+        The result has 'start' (bucket start times), 'count' (entries per bucket) and '<column>_min', '_max' and
+        '_mean' for each of AGGREGATED_COLUMNS; buckets are only listed if they hold at least one entry and the
+        statistics of a column are NaN in buckets where no entry has it.
+        """
+        if bucket not in self._aggregates:
+            self._aggregates[bucket] = self._compute_aggregates(bucket)
+        table = self._aggregates[bucket]
+        width, origin = BUCKETS[bucket], BUCKET_ORIGINS[bucket]
+        starts = table['start'].astype(np.int64)
+        # A bucket overlaps the window if it ends after start and begins before end
+        lo = int(np.searchsorted(starts, (_as_seconds(start) - origin) // width * width + origin, side='left')) if start is not None else 0
+        hi = int(np.searchsorted(starts, _as_seconds(end), side='left')) if end is not None else len(starts)
+        return {key: values[lo:max(lo, hi)] for key, values in table.items()}
+
+    def _compute_aggregates(self, bucket: str) -> Dict[str, np.ndarray]:
+        width, origin = BUCKETS[bucket], BUCKET_ORIGINS[bucket]
+        keys = (self.seconds - origin) // width
+        if not len(keys):
+            edges = np.zeros(0, dtype=np.int64)
+        else:
+            edges = np.concatenate(([0], np.flatnonzero(keys[1:] != keys[:-1]) + 1))
+        table = {
+            'start': (keys[edges] * width + origin).astype(DATETIME_DTYPE),
+            'count': np.diff(np.append(edges, len(keys))),
+        }
+        for name in AGGREGATED_COLUMNS:
+            values = self._column(name)
+            if not len(edges):
+                for statistic in ('min', 'max', 'mean'):
+                    table[f'{name}_{statistic}'] = np.zeros(0)
+                continue
+            missing = np.isnan(values)
+            counts = np.add.reduceat((~missing).astype(np.int64), edges)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                # fmin/fmax skip NaN unless the whole bucket is NaN
+                table[f'{name}_min'] = np.fmin.reduceat(values, edges)
+                table[f'{name}_max'] = np.fmax.reduceat(values, edges)
+                table[f'{name}_mean'] = np.where(counts > 0, np.add.reduceat(np.where(missing, 0.0, values), edges) / counts, np.nan)
+        return table
@@ -0,0 +1,138 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from loguru import logger
+from typing import List, Dict, Optional
+
+class _NullSpan:
+    """Shared do-nothing context manager returned by span() while tracing is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'args', 'start')
+
+    def __init__(self, tracer: 'Tracer', name: str, args: Optional[Dict[str, object]]):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+class Tracer:
+    """Collects completed spans as Chrome trace-event "complete" events.
+
+    Spans nest naturally: the trace viewer stacks events on the same thread by their start time and duration.
+    """
+
+    def __init__(self):
+        self.events: List[Dict[str, object]] = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+
+    def record(self, name: str, start_ns: int, end_ns: int, args: Optional[Dict[str, object]] = None):
+        event = {
+            'name': name,
+            'ph': 'X',
+            'ts': (start_ns - self._origin) / 1000,
+            'dur': (end_ns - start_ns) / 1000,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+        }
+        if args:
+            event['args'] = args
+        with self._lock:
+            self.events.append(event)
+
+    def write_chrome_trace(self, path: str):
+        """Write the spans as a Chrome trace-event JSON file (open in chrome://tracing or Perfetto)."""
+        with self._lock:
+            events = list(self.events)
+        with open(path, 'w', encoding='utf-8') as trace_file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, trace_file)
+        logger.info(f"Wrote {len(events)} trace spans to {path}")
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Return the call count, total and maximum duration in milliseconds of each span name."""
+        totals: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            events = list(self.events)
+        for event in events:
+            stats = totals.setdefault(event['name'], {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            duration = event['dur'] / 1000
+            stats['count'] += 1
+            stats['total_ms'] += duration
+            stats['max_ms'] = max(stats['max_ms'], duration)
+        return totals
+
+    def log_summary(self):
+        """Log the per-stage summary, slowest stages first."""
+        summary = sorted(self.summary().items(), key=lambda item: item[1]['total_ms'], reverse=True)
+        logger.info("Trace summary:")
+        for name, stats in summary:
+            logger.info(f"  {name}: {stats['count']} calls, {stats['total_ms']:.1f} ms total, {stats['max_ms']:.1f} ms max")
+
+_tracer: Optional[Tracer] = None
+
+def enable() -> Tracer:
+    """Start recording spans and return the active tracer."""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+def disable() -> Optional[Tracer]:
+    """Stop recording spans and return the tracer that was active."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+def active_tracer() -> Optional[Tracer]:
+    return _tracer
+
+def span(name: str, **args):
+    """Time a block as a named span; a shared no-op context manager is returned while tracing is disabled."""
+    if _tracer is None:
+        return _NULL_SPAN
+    return _Span(_tracer, name, args or None)
+
+def traced(name: str):
+    """Decorator form of span() for whole functions."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return function(*args, **kwargs)
+            with _Span(_tracer, name, None):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@contextmanager
+def tracing_to(path: Optional[str]):
+    """Enable tracing for the duration of a block and write the trace and summary at the end; no-op for None."""
+    if not path:
+        yield None
+        return
+    tracer = enable()
+    try:
+        yield tracer
+    finally:
+        disable()
+        tracer.write_chrome_trace(path)
+        tracer.log_summary()
@@ -0,0 +1,392 @@
+import re
+import numpy as np
+from collections.abc import Sequence
+from typing import List, Dict, Iterable, Iterator, Optional
+
+USAGE_COLUMNS = ('Timestamp', 'LocalTimestamp', 'Duration', 'Ac', 'EntryType', 'ChargeCapacity', 'Discharge',
+                 'FullChargeCapacity', 'IsNextOnBattery')
+DATETIME_COLUMNS = ('Timestamp', 'LocalTimestamp')
+INTEGER_COLUMNS = ('Duration', 'ChargeCapacity', 'Discharge', 'FullChargeCapacity')
+BOOLEAN_COLUMNS = ('Ac', 'IsNextOnBattery')
+
+DATETIME_DTYPE = 'datetime64[s]'
+
+# Timezone suffix of a timestamp, e.g. "+02:00" or "-0700"; numpy does not accept these
+TIMESTAMP_OFFSET_PATTERN = re.compile(r'([+-])(\d{2}):?(\d{2})$')
+
+def _parse_datetime(value: str) -> np.datetime64:
+    """Parse one ISO timestamp to whole seconds in UTC, applying a Z or +hh:mm suffix; NaT if it cannot be parsed."""
+    text = value.strip()
+    offset = 0
+    if text[-1:] in ('Z', 'z'):
+        text = text[:-1]
+    elif 'T' in text or ' ' in text:
+        match = TIMESTAMP_OFFSET_PATTERN.search(text)
+        if match:
+            sign, hours, minutes = match.groups()
+            offset = (int(hours) * 3600 + int(minutes) * 60) * (-1 if sign == '-' else 1)
+            text = text[:match.start()]
+    try:
+        return np.datetime64(text).astype(DATETIME_DTYPE) - np.timedelta64(offset, 's')
+    except ValueError:
+        return np.datetime64('NaT', 's')
+
+UTC_OFFSET_PATTERN = re.compile(r'^([+-])?(\d{1,2})(?::(\d{2}))?(?::(\d{2}))?$')
+ISO_DURATION_PATTERN = re.compile(r'^([+-])?PT(?:([+-]?\d+)H)?(?:([+-]?\d+)M)?(?:([+-]?\d+)S)?$')
+
+def parse_utc_offset(value: Optional[str]) -> np.timedelta64:
+    """Parse a ReportInformation UtcOffset, either "-07:00:00" style or an ISO 8601 duration such as "PT-7H".
+
+    Empty or unrecognised values are treated as UTC.
+    """
+    value = (value or '').strip()
+    match = UTC_OFFSET_PATTERN.match(value)
+    if match:
+        sign, hours, minutes, seconds = match.groups()
+        total = int(hours) * 3600 + int(minutes or 0) * 60 + int(seconds or 0)
+        return np.timedelta64(-total if sign == '-' else total, 's')
+    match = ISO_DURATION_PATTERN.match(value.upper())
+    if match and any(match.groups()[1:]):
+        sign, hours, minutes, seconds = match.groups()
+        total = int(hours or 0) * 3600 + int(minutes or 0) * 60 + int(seconds or 0)
+        return np.timedelta64(-total if sign == '-' else total, 's')
+    return np.timedelta64(0, 's')
+
+BOOLEAN_SPELLINGS = {'1': True, 'true': True, '0': False, 'false': False}
+
+def _integer_cells(values: List[str]):
+    """Convert strings to int64, returning (array, valid mask or None, {position: original string})."""
+    try:
+        numbers = list(map(int, values))
+        parsed = np.array(numbers, dtype=np.int64)
+    except (ValueError, OverflowError):
+        parsed = np.zeros(len(values), dtype=np.int64)
+        valid = np.ones(len(values), dtype=bool)
+        raw = {}
+        for position, value in enumerate(values):
+            try:
+                parsed[position] = int(value)
+            except (ValueError, OverflowError):
+                valid[position] = False
+                raw[position] = value
+            else:
+                if str(parsed[position]) != value:
+                    raw[position] = value
+        return parsed, valid, raw
+    # Values such as " 5" or "007" parse but would not be reproduced by str()
+    text = list(map(str, numbers))
+    if text == values:
+        return parsed, None, {}
+    return parsed, None, {position: value for position, (value, canonical) in enumerate(zip(values, text)) if value != canonical}
+
+def _datetime_cells(values: List[str], suffix: str):
+    """Convert ISO strings to datetime64[s], returning (array, valid mask or None, {position: original string}).
+
+    Strings other than "YYYY-MM-DDTHH:MM:SS" plus the column's suffix (e.g. with sub-second digits or an
+    offset) are parsed one at a time and kept verbatim for display.
+    """
+    try:
+        # Longer strings are cut to whole seconds here and parsed properly below once they fail the comparison
+        parsed = np.array(values, dtype='U19').astype(DATETIME_DTYPE)
+        exact = False
+    except ValueError:
+        parsed = np.array([_parse_datetime(value) for value in values], dtype=DATETIME_DTYPE)
+        exact = True
+    text = np.datetime_as_string(parsed, unit='s')
+    changed = (np.char.add(text, suffix) if suffix else text) != np.array(values, dtype=str)
+    raw = {}
+    for position in np.flatnonzero(changed).tolist():
+        if not exact:
+            # Only the first 19 characters were parsed, which ignores an offset
+            parsed[position] = _parse_datetime(values[position])
+        raw[position] = values[position]
+    valid = ~np.isnat(parsed)
+    return parsed, None if valid.all() else valid, raw
+
+def _boolean_cells(values: List[str]):
+    """Convert flag strings to bool, returning (array, valid mask or None, {position: original string}, spellings).
+
+    spellings is the [true, false] pair used by most rows; other spellings and unknown values are kept verbatim.
+    """
+    spellings, inverse = np.unique(np.array(values, dtype=str), return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(spellings))
+    meaning = [BOOLEAN_SPELLINGS.get(spelling.strip().lower()) for spelling in spellings.tolist()]
+    usual = {True: '1', False: '0'}
+    for flag in (True, False):
+        candidates = [index for index, value in enumerate(meaning) if value is flag]
+        if candidates:
+            usual[flag] = str(spellings[max(candidates, key=lambda index: counts[index])])
+    parsed = np.array([value is True for value in meaning], dtype=bool)[inverse]
+    valid = np.array([value is not None for value in meaning], dtype=bool)[inverse]
+    verbatim = np.array([value is None or str(spelling) != usual[value] for spelling, value in zip(spellings, meaning)],
+                        dtype=bool)[inverse]
+    raw = {position: values[position] for position in np.flatnonzero(verbatim).tolist()}
+    return parsed, None if valid.all() else valid, raw, [usual[True], usual[False]]
+
+def encode_raw(raw: Dict[str, Dict[int, str]]) -> Dict[str, List[list]]:
+    """Return UsageTable.raw in a JSON-serializable form ([row, string] pairs per column)."""
+    return {key: sorted([row, value] for row, value in cells.items()) for key, cells in raw.items() if cells}
+
+def decode_raw(encoded: Optional[Dict[str, List[list]]], start: int = 0, stop: Optional[int] = None) -> Dict[str, Dict[int, str]]:
+    """Rebuild UsageTable.raw from encode_raw output, keeping rows start <= row < stop renumbered from start."""
+    raw = {}
+    for key, pairs in (encoded or {}).items():
+        cells = {row - start: value for row, value in pairs if row >= start and (stop is None or row < stop)}
+        if cells:
+            raw[key] = cells
+    return raw
+
+class UsageTable(Sequence):
+    """Columnar recent usage data backed by typed NumPy arrays.
+
+    Timestamps are stored as datetime64, capacities and durations as int64, the Ac/IsNextOnBattery flags as
+    bool and any other attribute (such as EntryType) dictionary-encoded. Indexing with an integer returns the
+    row as a Dict[str, str] with the strings of the report, so code written against the list-of-dicts
+    representation keeps working.
+
+    Typed values are rendered back in the column's usual spelling (formats: the suffix of a timestamp column such
+    as 'Z', the [true, false] strings of a flag column). Cells that spelling cannot reproduce, and cells that could
+    not be converted at all, keep their original string in raw; unconverted cells are left out of the presence
+    mask, so the calculations skip them instead of failing on the whole report.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], present: Optional[Dict[str, np.ndarray]] = None,
+                 categories: Optional[Dict[str, List[str]]] = None, formats: Optional[Dict[str, List[str]]] = None,
+                 raw: Optional[Dict[str, Dict[int, str]]] = None):
+        self.columns = columns
+        # Masks are only kept for columns that are missing (or unconvertible) in some rows
+        self.present = present or {}
+        self.categories = categories or {}
+        self.formats = formats or {}
+        self.raw = raw or {}
+        self._length = len(next(iter(columns.values()))) if columns else 0
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Dict[str, str]], infer_types: bool = False) -> 'UsageTable':
+        """Build a table from UsageEntry attribute dicts, converting every column in one vectorized pass.
+
+        The usage columns get their fixed types. With infer_types, other attributes become int64 when every value
+        round-trips through int() (so serial numbers with leading zeros stay strings) and datetime64 when the
+        name ends in Date or Timestamp and every value parses; the rest are dictionary-encoded.
+        """
+        values: Dict[str, list] = {}
+        rows: Dict[str, list] = {}
+        length = 0
+        for entry in entries:
+            for key, value in entry.items():
+                if key not in values:
+                    values[key] = []
+                    rows[key] = []
+                values[key].append(value)
+                rows[key].append(length)
+            length += 1
+
+        columns = {}
+        present = {}
+        categories = {}
+        formats = {}
+        raw = {}
+        for key, column in values.items():
+            converted = cls._convert(key, column, infer_types)
+            if converted is None:
+                vocabulary: Dict[str, int] = {}
+                codes = [vocabulary.setdefault(value, len(vocabulary)) for value in column]
+                converted = (np.array(codes, dtype=np.min_scalar_type(-len(vocabulary))), None, {}, None)
+                categories[key] = list(vocabulary)
+            typed, valid, cells, spelling = converted
+            if spelling is not None:
+                formats[key] = spelling
+            if len(column) == length:
+                columns[key] = typed
+                positions = None
+                mask = valid
+            else:
+                positions = np.array(rows[key], dtype=np.int64)
+                columns[key] = cls._allocate(typed.dtype, length, key in categories)
+                columns[key][positions] = typed
+                mask = np.zeros(length, dtype=bool)
+                mask[positions] = True if valid is None else valid
+            if mask is not None:
+                present[key] = mask
+            if cells:
+                raw[key] = cells if positions is None else {rows[key][position]: value for position, value in cells.items()}
+        return cls(columns, present, categories, formats, raw)
+
+    @staticmethod
+    def _convert(key: str, column: List[str], infer_types: bool):
+        """Return (typed values, valid mask or None, {position: original string}, format), or None for a string column."""
+        if key in INTEGER_COLUMNS:
+            return _integer_cells(column) + (None,)
+        if key in BOOLEAN_COLUMNS:
+            return _boolean_cells(column)
+        suffix = 'Z' if column[0].endswith('Z') else ''
+        if key in DATETIME_COLUMNS:
+            return _datetime_cells(column, suffix) + ([suffix],)
+        if not infer_types:
+            return None
+        typed, valid, cells = _integer_cells(column)
+        if valid is None and not cells:
+            return typed, None, {}, None
+        if key.endswith(('Date', 'Timestamp')):
+            typed, valid, cells = _datetime_cells(column, suffix)
+            if valid is None:
+                return typed, None, cells, [suffix]
+        return None
+
+    @staticmethod
+    def _allocate(dtype: np.dtype, length: int, codes: bool) -> np.ndarray:
+        if codes:
+            # Dictionary codes use -1 for a missing string
+            return np.full(length, -1, dtype=dtype)
+        if dtype.kind == 'M':
+            return np.full(length, np.datetime64('NaT'), dtype=dtype)
+        return np.zeros(length, dtype=dtype)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(np.arange(self._length)[index])
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("UsageTable index out of range")
+        return self.row(index)
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        for index in range(self._length):
+            yield self.row(index)
+
+    def __repr__(self) -> str:
+        return f"UsageTable({self._length} rows, columns={list(self.columns)})"
+
+    def has_column(self, name: str) -> bool:
+        """Return True if any row has the given attribute."""
+        return name in self.columns
+
+    def column(self, name: str) -> np.ndarray:
+        """Return the typed array for a column; string columns are decoded to an object array."""
+        if name in self.categories:
+            vocabulary = np.array(self.categories[name] + [''], dtype=object)
+            return vocabulary[self.columns[name]]
+        return self.columns[name]
+
+    def mask(self, name: str) -> np.ndarray:
+        """Return a boolean array that is True where the row has a typed value for the given attribute."""
+        if name not in self.columns:
+            return np.zeros(self._length, dtype=bool)
+        if name in self.present:
+            return self.present[name]
+        return np.ones(self._length, dtype=bool)
+
+    def take(self, indices) -> 'UsageTable':
+        """Return a new table containing only the given rows (an index array or boolean mask)."""
+        columns = {key: column[indices] for key, column in self.columns.items()}
+        present = {key: mask[indices] for key, mask in self.present.items()}
+        return UsageTable(columns, present, self.categories, self.formats, self._take_raw(indices))
+
+    def _take_raw(self, indices) -> Dict[str, Dict[int, str]]:
+        if not self.raw:
+            return {}
+        order = np.arange(self._length)[indices]
+        raw = {}
+        for key, cells in self.raw.items():
+            rows = np.fromiter(cells, dtype=np.int64, count=len(cells))
+            kept = np.flatnonzero(np.isin(order, rows))
+            if len(kept):
+                raw[key] = {int(position): cells[int(order[position])] for position in kept}
+        return raw
+
+    def row(self, index: int) -> Dict[str, str]:
+        """Return a single row as a UsageEntry attribute dict."""
+        entry = {}
+        for key, column in self.columns.items():
+            cells = self.raw.get(key)
+            if cells and index in cells:
+                entry[key] = cells[index]
+                continue
+            if key in self.present and not self.present[key][index]:
+                continue
+            value = column[index]
+            if key in self.categories:
+                entry[key] = self.categories[key][value]
+            elif column.dtype.kind == 'M':
+                entry[key] = str(np.datetime_as_string(value, unit='s')) + self.formats.get(key, [''])[0]
+            elif column.dtype.kind == 'b':
+                entry[key] = self.formats.get(key, ['1', '0'])[0 if value else 1]
+            else:
+                entry[key] = str(value)
+        return entry
+
+    @classmethod
+    def concat(cls, tables: Iterable['UsageTable']) -> 'UsageTable':
+        """Join tables end to end; every row renders the same strings as it did in its own table.
+
+        String vocabularies are merged and codes translated. A column takes the format of the first table that has
+        it, and cells of tables that spell the column differently keep their strings in raw. Raises ValueError if
+        a column is typed differently in two of the tables.
+        """
+        tables = [table for table in tables if len(table)]
+        if len(tables) == 1:
+            return tables[0]
+        offsets = np.cumsum([0] + [len(table) for table in tables])
+        length = int(offsets[-1])
+        columns = {}
+        present = {}
+        categories = {}
+        formats = {}
+        raw = {}
+        for key in dict.fromkeys(key for table in tables for key in table.columns):
+            owners = [table for table in tables if key in table.columns]
+            if len({key in table.categories for table in owners}) > 1 or \
+                    len({table.columns[key].dtype for table in owners if key not in table.categories}) > 1:
+                raise ValueError(f"Column {key} has different types in the tables being joined")
+            vocabulary: Dict[str, int] = {}
+            if key in owners[0].categories:
+                for table in owners:
+                    for value in table.categories[key]:
+                        vocabulary.setdefault(value, len(vocabulary))
+                categories[key] = list(vocabulary)
+                dtype = np.min_scalar_type(-len(vocabulary))
+            else:
+                dtype = owners[0].columns[key].dtype
+                if key in owners[0].formats:
+                    formats[key] = owners[0].formats[key]
+            column = cls._allocate(dtype, length, key in categories)
+            mask = np.zeros(length, dtype=bool)
+            cells = {}
+            for table, offset in zip(tables, offsets.tolist()):
+                if key not in table.columns:
+                    continue
+                values = table.columns[key]
+                if key in categories:
+                    values = np.array([vocabulary[value] for value in table.categories[key]] + [-1], dtype=dtype)[values]
+                column[offset:offset + len(table)] = values
+                mask[offset:offset + len(table)] = table.mask(key)
+                own = table.raw.get(key, {})
+                if key not in categories and table.formats.get(key) != formats.get(key):
+                    rows = [row for row in np.flatnonzero(table.mask(key)).tolist() if row not in own]
+                    cells.update((offset + row, value) for row, value in zip(rows, table._strings(key, rows)))
+                cells.update((offset + row, value) for row, value in own.items())
+            columns[key] = column
+            if not mask.all():
+                present[key] = mask
+            if cells:
+                raw[key] = cells
+        return cls(columns, present, categories, formats, raw)
+
+    def _strings(self, key: str, rows: List[int]) -> List[str]:
+        # The strings row() renders for typed values of a datetime or flag column
+        values = self.columns[key][rows]
+        if values.dtype.kind == 'M':
+            suffix = self.formats.get(key, [''])[0]
+            return [text + suffix for text in np.datetime_as_string(values, unit='s').tolist()]
+        if values.dtype.kind == 'b':
+            spelling = self.formats.get(key, ['1', '0'])
+            return [spelling[0] if value else spelling[1] for value in values.tolist()]
+        return [str(value) for value in values.tolist()]
+
+    def to_dicts(self) -> List[Dict[str, str]]:
+        """Materialize every row as a UsageEntry attribute dict."""
+        return list(self)
@@ -0,0 +1,122 @@
+import tkinter as tk
+from tkinter import ttk
+import numpy as np
+from typing import List, Dict, Optional, Sequence, Union
+from .usage_table import UsageTable
+
+class VirtualTable(ttk.Frame):
+    """A Treeview that only holds as many items as fit on screen and pages rows in from the data as it scrolls.
+
+    Sorting by a column reorders an index array over the data (argsort on UsageTable columns), so neither
+    scrolling nor sorting materializes every row.
+    """
+
+    def __init__(self, parent, columns: Sequence[str], height: int = 10, column_width: int = 100):
+        super().__init__(parent)
+        self.columns = tuple(columns)
+        self.tree = ttk.Treeview(self, columns=self.columns, show="headings", height=height, selectmode='none')
+        for col in self.columns:
+            self.tree.heading(col, text=col, command=lambda col=col: self.sort_by(col))
+            self.tree.column(col, width=column_width)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self._rows: Union[UsageTable, List[Dict[str, str]]] = []
+        self._order: Optional[np.ndarray] = None
+        self._sort_column: Optional[str] = None
+        self._sort_descending = False
+        self._first = 0
+        self._items: List[str] = []
+        self._resize_items(height)
+
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<MouseWheel>", self._on_mouse_wheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll(3))
+
+    @property
+    def visible_rows(self) -> int:
+        return len(self._items)
+
+    def set_rows(self, rows: Union[UsageTable, List[Dict[str, str]]]):
+        """Show a new data set, keeping the current sort column."""
+        self._rows = rows
+        self._first = 0
+        self._order = self._sort_order() if self._sort_column else None
+        self.refresh()
+
+    def sort_by(self, column: str):
+        """Sort by a column; selecting the same column again reverses the order."""
+        if self._sort_column == column:
+            self._sort_descending = not self._sort_descending
+        else:
+            self._sort_column = column
+            self._sort_descending = False
+        for col in self.columns:
+            arrow = (' ▼' if self._sort_descending else ' ▲') if col == column else ''
+            self.tree.heading(col, text=col + arrow)
+        self._order = self._sort_order()
+        self._first = 0
+        self.refresh()
+
+    def _sort_order(self) -> np.ndarray:
+        column = self._sort_column
+        length = len(self._rows)
+        if isinstance(self._rows, UsageTable):
+            if not self._rows.has_column(column):
+                return np.arange(length)
+            values = self._rows.column(column)
+            order = np.argsort(values, kind='stable')
+        else:
+            order = np.array(sorted(range(length), key=lambda index: self._rows[index].get(column, '')), dtype=np.int64)
+        return order[::-1] if self._sort_descending else order
+
+    def scroll(self, rows: int):
+        self._first += rows
+        self.refresh()
+
+    def refresh(self):
+        """Write the rows for the current scroll position into the fixed set of Treeview items."""
+        length = len(self._rows)
+        self._first = max(0, min(self._first, length - self.visible_rows))
+        for offset, item in enumerate(self._items):
+            position = self._first + offset
+            if position >= length:
+                self.tree.item(item, values=())
+                continue
+            index = int(self._order[position]) if self._order is not None else position
+            row = self._rows[index]
+            self.tree.item(item, values=[row.get(col, '') for col in self.columns])
+        if length:
+            self.scrollbar.set(self._first / length, min(1.0, (self._first + self.visible_rows) / length))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _resize_items(self, count: int):
+        count = max(1, count)
+        while len(self._items) < count:
+            self._items.append(self.tree.insert("", "end", values=()))
+        while len(self._items) > count:
+            self.tree.delete(self._items.pop())
+
+    def _on_configure(self, event):
+        bbox = self.tree.bbox(self._items[0]) if self._items else None
+        if not bbox:
+            return
+        heading_height, row_height = bbox[1], bbox[3]
+        self._resize_items((event.height - heading_height) // max(row_height, 1))
+        self.refresh()
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        length = len(self._rows)
+        if action == 'moveto':
+            self._first = int(float(amount) * length)
+        elif action == 'scroll':
+            step = self.visible_rows if unit == 'pages' else 1
+            self._first += int(amount) * step
+        self.refresh()
+
+    def _on_mouse_wheel(self, event):
+        self.scroll(int(-1 * (event.delta / 120)) * 3)
+        return "break"
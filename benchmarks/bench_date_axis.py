@@ -0,0 +1,91 @@
+"""Compare rendering a usage chart on a categorical axis of Timestamp strings with a real date axis.
+
+Usage: python benchmarks/bench_date_axis.py [--sizes 10000 100000] [--repeat 1] [--memory]
+
+The categorical variant is what plotting entry['Timestamp'] strings does: matplotlib maps every distinct string to
+its own category and ticks each one. The date variant parses the column once to datetime64 (shifted by UtcOffset),
+converts it with date2num and plots it on an AutoDateLocator/ConciseDateFormatter axis, as graph_generator does.
+The categorical draw grows by a few milliseconds per row, so the 100k-row case takes minutes.
+"""
+import argparse
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.dates as mdates
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+from batterpy.report_generator import parse_report_streaming
+from batterpy.synthetic import write_synthetic_report
+from batterpy.usage_table import parse_utc_offset
+
+def categorical_axis(timestamps, values):
+    fig = Figure(figsize=(8, 6), dpi=100)
+    ax = fig.add_subplot(111)
+    ax.plot(timestamps, values)
+    return fig
+
+def date_axis(timestamps, values):
+    fig = Figure(figsize=(8, 6), dpi=100)
+    ax = fig.add_subplot(111)
+    locator = mdates.AutoDateLocator()
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+    ax.plot(timestamps, values)
+    return fig
+
+def measure(build, timestamps, values, repeat: int, memory: bool) -> dict:
+    """Return the best plot+draw wall time and, with memory, the peak memory allocated while doing it."""
+    best = float('inf')
+    peak = 0
+    for _ in range(repeat):
+        if memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        fig = build(timestamps, values)
+        FigureCanvasAgg(fig).draw()
+        best = min(best, time.perf_counter() - start)
+        if memory:
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    return {'render_s': best, 'peak_mb': peak / 1e6 if memory else float('nan')}
+
+def run(sizes, repeat: int, memory: bool = False):
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            report_path = str(pathlib.Path(directory) / f'report_{size}.xml')
+            write_synthetic_report(report_path, entries=size)
+            report_info, _, _, usage = parse_report_streaming(report_path)
+            values = usage.column('ChargeCapacity')
+            strings = [entry['Timestamp'] for entry in usage]
+            start = time.perf_counter()
+            dates = mdates.date2num(usage.column('Timestamp') + parse_utc_offset(report_info.get('UtcOffset')))
+            convert = time.perf_counter() - start
+            row = {'points': size, 'convert_s': convert}
+            for name, build, x in (('categorical', categorical_axis, strings), ('date', date_axis, dates)):
+                for key, value in measure(build, x, values, repeat, memory).items():
+                    row[f'{name}_{key}'] = value
+            results.append(row)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--memory', action='store_true', help="Also record peak allocations (slows both variants down).")
+    args = parser.parse_args()
+    print(f"{'points':>10} {'categorical':>12} {'(MB)':>8} {'date':>9} {'(MB)':>8} {'convert':>9} {'speedup':>8}")
+    for row in run(args.sizes, args.repeat, args.memory):
+        print(f"{row['points']:>10} {row['categorical_render_s']:>12.3f} {row['categorical_peak_mb']:>8.1f} "
+              f"{row['date_render_s']:>9.3f} {row['date_peak_mb']:>8.1f} {row['convert_s']:>9.4f} "
+              f"{row['categorical_render_s'] / row['date_render_s']:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
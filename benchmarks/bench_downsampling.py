@@ -0,0 +1,63 @@
+"""Compare Agg render time of a time-series chart with and without downsampling.
+
+Usage: python benchmarks/bench_downsampling.py [--sizes 10000 100000 1000000] [--budget 2000]
+"""
+import argparse
+import pathlib
+import sys
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+from batterpy.downsample import downsample
+
+def synthetic_series(size: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    x = np.arange(size, dtype=np.float64) / 144.0
+    y = 40000 + np.cumsum(rng.normal(0, 50, size))
+    return x, y
+
+def render_time(x, y, repeat: int) -> float:
+    fig = Figure(figsize=(8, 6), dpi=100)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    ax.plot(x, y)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        canvas.draw()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run(sizes, budget: int, repeat: int):
+    results = []
+    for size in sizes:
+        x, y = synthetic_series(size)
+        full = render_time(x, y, repeat)
+        row = {'points': size, 'full_s': full}
+        for method in ('lttb', 'minmax'):
+            start = time.perf_counter()
+            reduced_x, reduced_y = downsample(x, y, budget, method)
+            row[f'{method}_downsample_s'] = time.perf_counter() - start
+            row[f'{method}_render_s'] = render_time(reduced_x, reduced_y, repeat)
+        results.append(row)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--budget', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    print(f"{'points':>10} {'full':>9} {'lttb':>9} {'(ds)':>9} {'minmax':>9} {'(ds)':>9}")
+    for row in run(args.sizes, args.budget, args.repeat):
+        print(f"{row['points']:>10} {row['full_s']:>9.4f} {row['lttb_render_s']:>9.4f} {row['lttb_downsample_s']:>9.4f} "
+              f"{row['minmax_render_s']:>9.4f} {row['minmax_downsample_s']:>9.4f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Measure module import times (python -X importtime) and the GUI's time to first window.
+
+Usage: python benchmarks/bench_startup.py [--repeat 5]
+"""
+import argparse
+import os
+import pathlib
+import re
+import subprocess
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+MODULES = ('batterpy.report_generator', 'batterpy.calculations', 'batterpy.graph_generator', 'batterpy.virtual_table')
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+def import_time(module: str) -> dict:
+    """Import a module in a fresh interpreter and return its cumulative import time and heaviest dependencies."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            cumulative[match.group(4)] = int(match.group(2))
+    heaviest = sorted(((name, us) for name, us in cumulative.items() if '.' not in name and name != module.split('.')[0]),
+                      key=lambda item: item[1], reverse=True)[:5]
+    return {
+        'cumulative_ms': cumulative.get(module, 0) / 1000,
+        'heaviest_ms': {name: us / 1000 for name, us in heaviest},
+        'loads_matplotlib': 'matplotlib' in cumulative,
+        'loads_tkinter': 'tkinter' in cumulative,
+    }
+
+# Runs the GUI script with mainloop patched to close the window as soon as it has been drawn
+FIRST_WINDOW_PROBE = """
+import runpy, sys, tkinter
+mainloop = tkinter.Misc.mainloop
+def close_once_drawn(self, n=0):
+    self.after_idle(self.destroy)
+    mainloop(self, n)
+tkinter.Misc.mainloop = close_once_drawn
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name='__main__')
+"""
+
+def time_to_first_window(repeat: int):
+    """Start the GUI under FIRST_WINDOW_PROBE, which closes it once drawn, and return the best wall time."""
+    if sys.platform != 'win32' and not os.environ.get('DISPLAY'):
+        return None
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', FIRST_WINDOW_PROBE, str(ROOT / '__main__.py')], cwd=ROOT, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def measure(repeat: int = 3) -> dict:
+    imports = {}
+    for module in MODULES:
+        runs = [import_time(module) for _ in range(repeat)]
+        imports[module] = min(runs, key=lambda run: run['cumulative_ms'])
+    return {'imports': imports, 'time_to_first_window_ms': time_to_first_window(repeat)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    results = measure(args.repeat)
+    for module, stats in results['imports'].items():
+        flags = ', '.join(name for name, loaded in (('matplotlib', stats['loads_matplotlib']), ('tkinter', stats['loads_tkinter'])) if loaded)
+        print(f"{module:<28} {stats['cumulative_ms']:>8.1f} ms  {('loads ' + flags) if flags else ''}")
+        for name, ms in stats['heaviest_ms'].items():
+            print(f"    {name:<24} {ms:>8.1f} ms")
+    window = results['time_to_first_window_ms']
+    print(f"time to first window: {'skipped (no display)' if window is None else f'{window:.1f} ms'}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""Time parsing, extraction, calculations and offscreen chart rendering on synthetic reports.
+
+Usage: python benchmarks/run_benchmarks.py [--sizes 1000 10000 100000] [--output results.json] [--label v0.1.0]
+
+Each size gets a synthetic powercfg-schema report written to a temporary directory; every stage is timed
+(best of --repeat runs) and the results are written as JSON so runs from different versions can be compared.
+"""
+import argparse
+import json
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+from batterpy import calculations  # noqa: E402
+from batterpy.graph_generator import update_graphs  # noqa: E402
+from batterpy.report_generator import (BATTERY_NS, parse_xml, parse_report_streaming, extract_report, get_report_information,  # noqa: E402
+                                       get_system_information, get_battery_information, get_recent_usage)
+from batterpy.synthetic import write_synthetic_report  # noqa: E402
+import bench_startup  # noqa: E402
+
+def best_of(function, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def benchmark_report(report_path: str, repeat: int) -> dict:
+    timings = {}
+    timings['parse_xml'] = best_of(lambda: parse_xml(report_path), repeat)
+    timings['parse_report_streaming'] = best_of(lambda: parse_report_streaming(report_path), repeat)
+
+    root = parse_xml(report_path)
+    timings['extract_report'] = best_of(lambda: extract_report(root, BATTERY_NS), repeat)
+    for extractor in (get_report_information, get_system_information, get_battery_information, get_recent_usage):
+        timings[extractor.__name__] = best_of(lambda: extractor(root, BATTERY_NS), repeat)
+
+    report_info = get_report_information(root, BATTERY_NS)
+    battery_info = get_battery_information(root, BATTERY_NS)
+    recent_usage = get_recent_usage(root, BATTERY_NS)
+    recent_usage_dicts = recent_usage.to_dicts()
+    battery = battery_info[0]
+    design_capacity = int(battery['DesignCapacity'])
+    usage_calculations = {
+        'calculate_cycle_count_over_time': lambda usage: calculations.calculate_cycle_count_over_time(usage),
+        'calculate_discharge_rate': lambda usage: calculations.calculate_discharge_rate(usage),
+        'calculate_historical_health': lambda usage: calculations.calculate_historical_health(usage, design_capacity),
+        'calculate_average_discharge_rate': lambda usage: calculations.calculate_average_discharge_rate(usage),
+        'count_charge_discharge_cycles': lambda usage: calculations.count_charge_discharge_cycles(usage),
+        'calculate_energy_consumption': lambda usage: calculations.calculate_energy_consumption(usage),
+        'calculate_charge_discharge_efficiency': lambda usage: calculations.calculate_charge_discharge_efficiency(usage),
+    }
+    for name, function in usage_calculations.items():
+        timings[name] = best_of(lambda: function(recent_usage), repeat)
+        timings[f'{name}[dicts]'] = best_of(lambda: function(recent_usage_dicts), repeat)
+    timings['calculate_battery_health'] = best_of(lambda: calculations.calculate_battery_health(battery), repeat)
+    timings['calculate_battery_degradation'] = best_of(lambda: calculations.calculate_battery_degradation(battery), repeat)
+    timings['estimate_time_to_full_charge'] = best_of(lambda: calculations.estimate_time_to_full_charge(1000, 50000, 2.5), repeat)
+    timings['estimate_time_to_empty'] = best_of(lambda: calculations.estimate_time_to_empty(1000, 2.5), repeat)
+
+    figures = [Figure(figsize=(8, 6), dpi=100) for _ in range(9)]
+    canvases = [FigureCanvasAgg(fig) for fig in figures]
+    arguments = [item for pair in zip(figures, canvases) for item in pair]
+    timings['update_graphs'] = best_of(lambda: update_graphs(*arguments, recent_usage, battery_info, report_info), repeat)
+    return timings
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--batteries', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--label', default=None, help="Name for this run (defaults to the git revision).")
+    parser.add_argument('--baseline', default=None, help="Earlier results JSON to compare against.")
+    parser.add_argument('--skip-startup', action='store_true', help="Skip the import-time and first-window measurements.")
+    args = parser.parse_args()
+
+    results = {
+        'label': args.label or git_revision(),
+        'revision': git_revision(),
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'matplotlib': matplotlib.__version__,
+        'sizes': {},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            report_path = str(pathlib.Path(directory) / f'report_{size}.xml')
+            write_synthetic_report(report_path, entries=size, batteries=args.batteries)
+            timings = benchmark_report(report_path, args.repeat)
+            results['sizes'][str(size)] = timings
+            print(f"{size} entries")
+            for name, seconds in timings.items():
+                print(f"  {name:<48} {seconds * 1000:>10.3f} ms")
+
+    if not args.skip_startup:
+        results['startup'] = bench_startup.measure(args.repeat)
+        for module, stats in results['startup']['imports'].items():
+            print(f"  import {module:<41} {stats['cumulative_ms']:>10.3f} ms")
+        window = results['startup']['time_to_first_window_ms']
+        if window is not None:
+            print(f"  {'time to first window':<48} {window:>10.3f} ms")
+
+    pathlib.Path(args.output).write_text(json.dumps(results, indent=2), encoding='utf-8')
+    print(f"Results written to {args.output}")
+    if args.baseline:
+        compare(json.loads(pathlib.Path(args.baseline).read_text(encoding='utf-8')), results)
+
+def compare(baseline: dict, results: dict):
+    """Print the ratio of each timing to the same timing in the baseline run."""
+    print(f"Compared with {baseline.get('label') or 'baseline'} (ratio > 1 is slower)")
+    for size, timings in results['sizes'].items():
+        previous = baseline.get('sizes', {}).get(size, {})
+        for name, seconds in timings.items():
+            if previous.get(name):
+                print(f"  {size:>8} {name:<48} {seconds / previous[name]:>6.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,14 @@
+import pathlib
+import tempfile
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+@pytest.fixture
+def temp_dir(tmp_path, monkeypatch):
+    """Route temporary report files into a directory the test can inspect, and let commands import batterpy."""
+    directory = tmp_path / 'temp'
+    directory.mkdir()
+    monkeypatch.setattr(tempfile, 'tempdir', str(directory))
+    monkeypatch.setenv('PYTHONPATH', str(ROOT))
+    return directory
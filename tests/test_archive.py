@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from batterpy.archive import encode_archive, open_archive, read_archive, write_archive
+from batterpy.cli import main
+from batterpy.report_generator import parse_report_sections
+from batterpy.synthetic import write_synthetic_report
+from tests.test_report_generator import truncated_report
+
+HISTORY = [
+    {'StartDate': '2024-02-01T00:00:00Z', 'DesignCapacity': '50000', 'FullChargeCapacity': '41000', 'SerialNumber': '0042'},
+    {'StartDate': '2024-01-01T00:00:00Z', 'DesignCapacity': '50000', 'SerialNumber': '0042'},
+    {'StartDate': '2024-03-01T12:30:00Z', 'DesignCapacity': '50000', 'FullChargeCapacity': '40500', 'SerialNumber': 'A7'},
+]
+
+@pytest.fixture
+def sections(tmp_path):
+    path = tmp_path / 'report.xml'
+    write_synthetic_report(str(path), entries=500, seed=3)
+    return parse_report_sections(str(path))
+
+def assert_same_report(report, expected):
+    assert report.keys() == expected.keys()
+    for name, value in expected.items():
+        if name == 'RecentUsage':
+            assert report[name].to_dicts() == value.to_dicts()
+        else:
+            assert report[name] == value
+
+def test_to_report_matches_extract_report(sections, tmp_path):
+    path = tmp_path / 'report.bta'
+    write_archive(sections, str(path))
+    report = open_archive(path).to_report()
+    assert_same_report(report, sections)
+    assert isinstance(report['History'], list) and isinstance(report['EnergyDrains'], list)
+
+def test_file_and_bytes_layouts_are_identical(sections, tmp_path):
+    path = tmp_path / 'report.bta'
+    write_archive(sections, str(path))
+    data = encode_archive(sections)
+    assert path.read_bytes() == data
+    assert_same_report(read_archive(data).to_report(), sections)
+    assert not list(tmp_path.glob('*.tmp'))
+
+def test_record_tables_are_typed_and_round_trip():
+    archive = read_archive(encode_archive({'History': HISTORY}))
+    history = archive.table('History')
+    assert history.columns['StartDate'].dtype.kind == 'M'
+    assert history.columns['DesignCapacity'].dtype == np.int64
+    # Leading zeros must survive, so serial numbers stay strings
+    assert history.categories['SerialNumber'] == ['0042', 'A7']
+    assert archive.to_report()['History'] == sorted(HISTORY, key=lambda record: record['StartDate'])
+
+def test_time_range_reads(sections):
+    archive = read_archive(encode_archive(sections))
+    timestamps = [row['Timestamp'] for row in sections['RecentUsage']]
+    start, end = timestamps[100], timestamps[200]
+    assert archive.usage(start, end).to_dicts() == [row for row in sections['RecentUsage'] if start <= row['Timestamp'] < end]
+
+def test_unsorted_tables_keep_their_order_without_sort():
+    archive = read_archive(encode_archive({'History': HISTORY}, sort=False))
+    assert archive.to_report()['History'] == HISTORY
+    assert archive.header['tables']['History']['sorted_by'] is None
+
+def test_archive_command_fails_without_touching_the_output(tmp_path):
+    output = tmp_path / 'out.bta'
+    assert main(['archive', str(tmp_path / 'missing.xml'), str(output)]) == 1
+    assert not output.exists()
+    output.write_bytes(b'previous archive')
+    assert main(['archive', str(truncated_report(tmp_path / 'report.xml')), str(output)]) == 1
+    assert output.read_bytes() == b'previous archive'
+    assert not list(tmp_path.glob('*.tmp'))
+
+def test_archive_command_writes_the_report(sections, tmp_path):
+    report = tmp_path / 'report.xml'
+    write_synthetic_report(str(report), entries=500, seed=3)
+    assert main(['archive', str(report), str(tmp_path / 'out.bta')]) == 0
+    assert_same_report(open_archive(tmp_path / 'out.bta').to_report(), sections)
@@ -0,0 +1,114 @@
+import os
+import pathlib
+import shlex
+import sys
+import time
+import pytest
+from batterpy.background import ReportWorker
+
+posix_only = pytest.mark.skipif(os.name != 'posix', reason="process groups are POSIX only")
+
+def synthetic_command(entries: int = 50) -> str:
+    return f"{shlex.quote(sys.executable)} -m batterpy.synthetic {{report_path}} --entries {entries}"
+
+def hanging_command(pid_file: pathlib.Path) -> str:
+    """A wrapper that starts a long-running child, records its pid and waits on it."""
+    return f"sh -c 'sleep 30 & echo $! > {pid_file}; wait'"
+
+def alive(pid: int) -> bool:
+    """Whether pid is still running; zombies left for the container's init to reap count as gone."""
+    try:
+        with open(f'/proc/{pid}/stat') as stat:
+            return stat.read().rsplit(')', 1)[1].split()[0] not in ('Z', 'X')
+    except FileNotFoundError:
+        return False
+    except OSError:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        return True
+
+def exits(pid: int, timeout: float = 5.0) -> bool:
+    """Whether pid is gone within timeout; a SIGKILLed process can take a moment to exit after killpg returns."""
+    deadline = time.monotonic() + timeout
+    while alive(pid):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def wait_for_pid(pid_file: pathlib.Path, timeout: float = 10.0) -> int:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if pid_file.exists() and pid_file.read_text().strip():
+            return int(pid_file.read_text())
+        time.sleep(0.02)
+    raise AssertionError(f"{pid_file} was never written")
+
+def wait_for_result(worker: ReportWorker, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = worker.poll()
+        if result is not None:
+            return result
+        time.sleep(0.02)
+    raise AssertionError("worker did not finish")
+
+def start(worker: ReportWorker) -> ReportWorker:
+    assert worker.start()
+    return worker
+
+def test_report_from_environment_command(temp_dir, monkeypatch):
+    monkeypatch.setenv('BATTERPY_REPORT_COMMAND', synthetic_command(50))
+    worker = ReportWorker()
+    assert worker.start()
+    assert not worker.start()
+    status, report = wait_for_result(worker)
+    assert status == 'done'
+    report_info, system_info, battery_info, usage = report
+    assert len(usage) == 50 and battery_info
+    assert not worker.busy
+    assert list(temp_dir.iterdir()) == []
+
+def test_nonzero_exit_is_an_error(temp_dir, monkeypatch):
+    monkeypatch.setenv('BATTERPY_REPORT_COMMAND', "sh -c 'exit 3'")
+    status, message = wait_for_result(start(ReportWorker()))
+    assert status == 'error' and 'exit status 3' in message
+    assert list(temp_dir.iterdir()) == []
+
+def test_missing_command_is_an_error(temp_dir, monkeypatch):
+    monkeypatch.setenv('BATTERPY_REPORT_COMMAND', 'batterpy-no-such-command {report_path}')
+    status, _ = wait_for_result(start(ReportWorker()))
+    assert status == 'error'
+    assert list(temp_dir.iterdir()) == []
+
+def test_unparseable_report_is_an_error(temp_dir, monkeypatch):
+    monkeypatch.setenv('BATTERPY_REPORT_COMMAND', "sh -c 'echo not xml > {report_path}'")
+    assert wait_for_result(start(ReportWorker())) == ('error', "Failed to parse the battery report.")
+    assert list(temp_dir.iterdir()) == []
+
+@posix_only
+def test_timeout_kills_the_process_group(temp_dir, tmp_path, monkeypatch):
+    pid_file = tmp_path / 'child.pid'
+    monkeypatch.setenv('BATTERPY_REPORT_COMMAND', hanging_command(pid_file))
+    started = time.monotonic()
+    status, message = wait_for_result(start(ReportWorker(timeout=0.5)))
+    assert status == 'error' and 'did not finish' in message
+    assert time.monotonic() - started < 10
+    assert exits(wait_for_pid(pid_file))
+    assert list(temp_dir.iterdir()) == []
+
+@posix_only
+def test_cancel_kills_the_process_group(temp_dir, tmp_path, monkeypatch):
+    pid_file = tmp_path / 'child.pid'
+    monkeypatch.setenv('BATTERPY_REPORT_COMMAND', hanging_command(pid_file))
+    worker = start(ReportWorker())
+    child = wait_for_pid(pid_file)
+    worker.cancel()
+    assert wait_for_result(worker, timeout=10) == ('cancelled', None)
+    assert exits(child)
+    assert list(temp_dir.iterdir()) == []
+    # A cancelled worker can start again
+    monkeypatch.setenv('BATTERPY_REPORT_COMMAND', synthetic_command(10))
+    assert wait_for_result(start(worker))[0] == 'done'
@@ -0,0 +1,56 @@
+import csv
+import pytest
+from batterpy.batch import NUMERIC_FIELDS, SUMMARY_FIELDS, run_batch, typed_columns
+from batterpy.cli import main
+from batterpy.synthetic import write_synthetic_report
+
+@pytest.fixture
+def report_dir(tmp_path):
+    for index in range(3):
+        write_synthetic_report(str(tmp_path / f'report{index}.xml'), entries=50, batteries=2, seed=index)
+    (tmp_path / 'broken.xml').write_text('<BatteryReport', encoding='utf-8')
+    return tmp_path
+
+def test_csv_has_one_row_per_battery(report_dir, tmp_path):
+    output = tmp_path / 'summary.csv'
+    run_batch(str(report_dir), str(output), workers=2)
+    with open(output, newline='', encoding='utf-8') as summary:
+        rows = list(csv.DictReader(summary))
+    assert len(rows) == 3 * 2 + 1
+    assert sum(bool(row['Error']) for row in rows) == 1
+    assert all(0 < float(row['Health']) <= 100 for row in rows if not row['Error'])
+
+def test_typed_columns():
+    rows = [{field: '' for field in SUMMARY_FIELDS}, {field: '' for field in SUMMARY_FIELDS}]
+    rows[0].update({'ComputerName': 'laptop', 'DesignCapacity': '50000', 'Health': 82.5, 'UsageEntries': 10, 'CycleCount': 'n/a'})
+    columns = typed_columns(rows)
+    assert columns['DesignCapacity'] == [50000, None]
+    assert columns['Health'] == [82.5, None]
+    assert columns['UsageEntries'] == [10, None]
+    assert columns['CycleCount'] == [None, None]
+    assert columns['ComputerName'] == ['laptop', '']
+
+def test_parquet_keeps_numeric_types(report_dir, tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+    output = tmp_path / 'summary.parquet'
+    rows = run_batch(str(report_dir), str(output), workers=1)
+    table = pq.read_table(output)
+    for field, kind in NUMERIC_FIELDS.items():
+        assert table.schema.field(field).type == (pa.int64() if kind is int else pa.float64())
+    assert table.schema.field('ComputerName').type == pa.string()
+    assert table.column('Health').to_pylist() == [row['Health'] if row['Health'] != '' else None for row in rows]
+
+@pytest.mark.parametrize('value', ['0', '-5', 'many'])
+def test_progress_every_must_be_positive(report_dir, tmp_path, value, capsys):
+    with pytest.raises(SystemExit) as error:
+        main(['batch', str(report_dir), '-o', str(tmp_path / 'summary.csv'), '--progress-every', value])
+    assert error.value.code == 2
+    assert '--progress-every' in capsys.readouterr().err
+    assert not (tmp_path / 'summary.csv').exists()
+    with pytest.raises(ValueError):
+        run_batch(str(report_dir), str(tmp_path / 'summary.csv'), progress_every=0)
+
+def test_progress_every_one_logs_each_report(report_dir, tmp_path):
+    assert main(['batch', str(report_dir), '-o', str(tmp_path / 'summary.csv'), '-w', '1', '--progress-every', '1']) == 0
+    assert (tmp_path / 'summary.csv').exists()
@@ -0,0 +1,142 @@
+import math
+import numpy as np
+import pytest
+from batterpy import calculations as calc
+from batterpy.usage_table import UsageTable
+
+USAGE_FUNCTIONS = (
+    calc.calculate_cycle_count_over_time,
+    calc.calculate_discharge_rate,
+    calc.calculate_average_discharge_rate,
+    calc.count_charge_discharge_cycles,
+    calc.calculate_energy_consumption,
+    calc.calculate_charge_discharge_efficiency,
+)
+
+def usage_rows(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for index in range(count):
+        rows.append({
+            'Timestamp': f'2024-01-01T00:{index // 60 % 60:02d}:{index % 60:02d}',
+            'Duration': str(int(rng.integers(1, 5000))),
+            'ChargeCapacity': str(int(rng.integers(0, 60000))),
+            'Discharge': str(int(rng.integers(0, 3000))),
+            'FullChargeCapacity': str(int(rng.integers(40000, 60000))),
+            'CycleCount': str(index // 10),
+        })
+    return rows
+
+def outcome(function, *args):
+    """Return ('ok', result) or ('error', exception type) so scalar and table paths can be compared."""
+    try:
+        return 'ok', function(*args)
+    except Exception as e:
+        return 'error', type(e)
+
+def assert_same(scalar, batch):
+    assert scalar[0] == batch[0]
+    if scalar[0] == 'error':
+        assert scalar[1] is batch[1]
+        return
+    expected, actual = scalar[1], batch[1]
+    if isinstance(actual, np.ndarray):
+        actual = actual.tolist()
+    assert type(actual) is type(expected) or isinstance(expected, (int, float))
+    assert actual == expected
+
+def without(rows, key, every=3):
+    return [{k: v for k, v in row.items() if k != key or index % every} for index, row in enumerate(rows)]
+
+CASES = {
+    'normal': usage_rows(500),
+    'empty': [],
+    'single': usage_rows(1),
+    'missing_discharge': without(usage_rows(50), 'Discharge'),
+    'missing_duration': without(usage_rows(50), 'Duration'),
+    'missing_full_charge': without(usage_rows(50), 'FullChargeCapacity'),
+    'missing_cycle_count': without(usage_rows(50), 'CycleCount'),
+    'missing_charge': without(usage_rows(50), 'ChargeCapacity'),
+    'no_charge_column': [{k: v for k, v in row.items() if k != 'ChargeCapacity'} for row in usage_rows(20)],
+    'zero_duration': [{**row, 'Duration': '0' if index == 7 else row['Duration']} for index, row in enumerate(usage_rows(20))],
+    'zero_charge': [{**row, 'ChargeCapacity': '0'} for row in usage_rows(20)],
+}
+
+@pytest.mark.parametrize('case', sorted(CASES))
+@pytest.mark.parametrize('function', USAGE_FUNCTIONS, ids=lambda function: function.__name__)
+def test_usage_table_matches_dicts(function, case):
+    rows = CASES[case]
+    assert_same(outcome(function, rows), outcome(function, UsageTable.from_entries(rows)))
+
+@pytest.mark.parametrize('case', sorted(CASES))
+@pytest.mark.parametrize('design_capacity', [50000, 0])
+def test_historical_health_matches_dicts(case, design_capacity):
+    rows = CASES[case]
+    assert_same(outcome(calc.calculate_historical_health, rows, design_capacity),
+                outcome(calc.calculate_historical_health, UsageTable.from_entries(rows), design_capacity))
+
+def columns(rows, key):
+    present = np.array([key in row for row in rows], dtype=bool)
+    values = np.array([int(row.get(key, 0)) for row in rows], dtype=np.int64)
+    return values, present
+
+@pytest.mark.parametrize('case', sorted(CASES))
+def test_batch_functions_match_scalar(case):
+    rows = CASES[case]
+    charge, charge_present = columns(rows, 'ChargeCapacity')
+    discharge, discharge_present = columns(rows, 'Discharge')
+    duration, duration_present = columns(rows, 'Duration')
+    full, full_present = columns(rows, 'FullChargeCapacity')
+    cycle_count, _ = columns(rows, 'CycleCount')
+    both = discharge_present & duration_present
+
+    assert_same(outcome(calc.calculate_cycle_count_over_time, rows),
+                outcome(calc.calculate_cycle_count_over_time_batch, cycle_count))
+    assert_same(outcome(calc.calculate_discharge_rate, rows),
+                outcome(calc.calculate_discharge_rate_batch, discharge, duration, both))
+    assert_same(outcome(calc.calculate_average_discharge_rate, rows),
+                outcome(calc.calculate_average_discharge_rate_batch, discharge, duration, both))
+    assert_same(outcome(calc.calculate_historical_health, rows, 50000),
+                outcome(calc.calculate_historical_health_batch, full, 50000, full_present))
+    assert_same(outcome(calc.calculate_historical_health, rows, 0),
+                outcome(calc.calculate_historical_health_batch, full, 0, full_present))
+    assert_same(outcome(calc.calculate_energy_consumption, rows),
+                outcome(calc.calculate_energy_consumption_batch, charge, charge_present))
+    assert_same(outcome(calc.calculate_charge_discharge_efficiency, rows),
+                outcome(calc.calculate_charge_discharge_efficiency_batch, charge, discharge))
+    if charge_present.all():
+        assert_same(outcome(calc.count_charge_discharge_cycles, rows),
+                    outcome(calc.count_charge_discharge_cycles_batch, charge))
+
+BATTERIES = [
+    {'DesignCapacity': '50000', 'FullChargeCapacity': '41000'},
+    {'DesignCapacity': '0', 'FullChargeCapacity': '41000'},
+    {'DesignCapacity': '0', 'FullChargeCapacity': '0'},
+    {'FullChargeCapacity': '30000'},
+    {'DesignCapacity': '45000'},
+    {},
+]
+
+def test_health_and_degradation_batch_match_scalar():
+    design = np.array([int(battery.get('DesignCapacity', 0)) for battery in BATTERIES])
+    full = np.array([int(battery.get('FullChargeCapacity', 0)) for battery in BATTERIES])
+    assert calc.calculate_battery_health_batch(design, full).tolist() == [calc.calculate_battery_health(b) for b in BATTERIES]
+    assert calc.calculate_battery_degradation_batch(design, full).tolist() == [calc.calculate_battery_degradation(b) for b in BATTERIES]
+
+def test_estimator_batches_match_scalar_including_inf():
+    current = np.array([1000, 0, 5000, 2500, 100])
+    full = np.array([5000, 5000, 5000, 5000, 100])
+    rates = np.array([2.5, 0.0, -1.5, 0.0, 3.0])
+    to_full = calc.estimate_time_to_full_charge_batch(current, full, rates)
+    to_empty = calc.estimate_time_to_empty_batch(current, rates)
+    assert to_full.tolist() == [calc.estimate_time_to_full_charge(c, f, r) for c, f, r in zip(current.tolist(), full.tolist(), rates.tolist())]
+    assert to_empty.tolist() == [calc.estimate_time_to_empty(c, r) for c, r in zip(current.tolist(), rates.tolist())]
+    assert math.isinf(to_full[1]) and math.isinf(to_empty[3])
+    # Scalar arguments broadcast like the per-battery call
+    assert calc.estimate_time_to_empty_batch(1000, 0.0).tolist() == calc.estimate_time_to_empty(1000, 0.0)
+
+def test_average_discharge_rate_is_order_independent():
+    rows = usage_rows(2000, seed=3)
+    rates = calc.calculate_discharge_rate(rows)
+    assert calc.calculate_average_discharge_rate(rows) == math.fsum(rates) / len(rates)
+    assert calc.calculate_average_discharge_rate(rows[::-1]) == calc.calculate_average_discharge_rate(rows)
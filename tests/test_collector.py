@@ -0,0 +1,107 @@
+import asyncio
+import subprocess
+import xml.etree.ElementTree as ET
+import sys
+import pytest
+from batterpy.cli import main
+from batterpy.collector import collect_report, collect_reports, stand_in_command
+from batterpy.report_generator import ReportTimeout, parse_report_sections
+from batterpy.synthetic import write_synthetic_report
+from tests.test_background import exits, posix_only
+from tests.test_report_generator import truncated_report
+
+def file_command(entries: int):
+    return [sys.executable, '-m', 'batterpy.synthetic', '{report_path}', '--entries', str(entries)]
+
+def hanging_command(pid_file, report_path: bool = False):
+    """A wrapper that starts a long-running child, records its pid and waits on it."""
+    return ['sh', '-c', f'sleep 30 & echo $! > {pid_file}; wait', 'sh'] + (['{report_path}'] if report_path else [])
+
+def assert_same_report(report, expected):
+    assert report.keys() == expected.keys()
+    for section, value in expected.items():
+        if section == 'RecentUsage':
+            assert report[section].to_dicts() == value.to_dicts()
+        else:
+            assert report[section] == value
+
+@pytest.fixture
+def expected(tmp_path):
+    path = tmp_path / 'expected.xml'
+    write_synthetic_report(str(path), entries=300)
+    return parse_report_sections(str(path))
+
+def test_stream_matches_file_parse(temp_dir, expected):
+    report = asyncio.run(collect_report(stand_in_command(entries=300)))
+    assert len(report['RecentUsage']) == 300
+    assert_same_report(report, expected)
+    assert list(temp_dir.iterdir()) == []
+
+def test_file_command_matches_file_parse(temp_dir, expected):
+    report = asyncio.run(collect_report(file_command(300)))
+    assert_same_report(report, expected)
+    assert list(temp_dir.iterdir()) == []
+
+@pytest.mark.parametrize('command', [['sh', '-c', 'exit 3'], ['sh', '-c', 'exit 3', 'sh', '{report_path}'],
+                                     ['sh', '-c', 'echo "<BatteryReport><Batteries>"; exit 3']],
+                         ids=['stream', 'file', 'truncated'])
+def test_nonzero_exit_raises(temp_dir, command):
+    with pytest.raises(subprocess.CalledProcessError) as error:
+        asyncio.run(collect_report(command))
+    assert error.value.returncode == 3
+    assert list(temp_dir.iterdir()) == []
+
+@posix_only
+@pytest.mark.parametrize('report_path', [False, True], ids=['stream', 'file'])
+def test_timeout_kills_the_process_group(temp_dir, tmp_path, report_path):
+    pid_file = tmp_path / 'child.pid'
+    with pytest.raises(ReportTimeout):
+        asyncio.run(collect_report(hanging_command(pid_file, report_path), timeout=0.5))
+    assert exits(int(pid_file.read_text()))
+    assert list(temp_dir.iterdir()) == []
+
+async def wait_for_pid(pid_file) -> int:
+    for _ in range(500):
+        if pid_file.exists() and pid_file.read_text().strip():
+            return int(pid_file.read_text())
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"{pid_file} was never written")
+
+@posix_only
+@pytest.mark.parametrize('report_path', [False, True], ids=['stream', 'file'])
+def test_cancel_kills_the_process_group(temp_dir, tmp_path, report_path):
+    pid_file = tmp_path / 'child.pid'
+
+    async def run() -> int:
+        task = asyncio.ensure_future(collect_report(hanging_command(pid_file, report_path)))
+        child = await wait_for_pid(pid_file)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return child
+
+    assert exits(asyncio.run(run()))
+    assert list(temp_dir.iterdir()) == []
+
+def test_collect_reports_returns_results_in_order(temp_dir, expected):
+    commands = [stand_in_command(entries=300), ['sh', '-c', 'exit 4'], file_command(300)]
+    first, failed, last = asyncio.run(collect_reports(commands, concurrency=2))
+    assert_same_report(first, expected)
+    assert isinstance(failed, subprocess.CalledProcessError) and failed.returncode == 4
+    assert_same_report(last, expected)
+    assert list(temp_dir.iterdir()) == []
+
+@pytest.mark.parametrize('stream', [True, False], ids=['stream', 'file'])
+def test_truncated_report_raises(temp_dir, tmp_path, stream):
+    truncated = truncated_report(tmp_path / 'truncated.xml')
+    command = ['cat', str(truncated)] if stream else ['cp', str(truncated), '{report_path}']
+    with pytest.raises(ET.ParseError):
+        asyncio.run(collect_report(command))
+    assert list(temp_dir.iterdir()) == []
+
+def test_collect_command_reports_truncated_files_as_failed(temp_dir, tmp_path):
+    truncated = truncated_report(tmp_path / 'truncated.xml')
+    output = tmp_path / 'archives'
+    assert main(['collect', str(output), '-c', f'cp {truncated} {{report_path}}',
+                 '-c', ' '.join(stand_in_command(entries=50))]) == 1
+    assert sorted(path.name for path in output.iterdir()) == ['report2.bta']
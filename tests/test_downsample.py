@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from batterpy.downsample import downsample, lttb, minmax
+
+def series(length: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return np.arange(length, dtype=np.float64), rng.normal(size=length).cumsum()
+
+def reference_minmax(y: np.ndarray, threshold: int) -> np.ndarray:
+    """Per-bucket nanargmin/nanargmax over the same bucket edges, one bucket at a time."""
+    edges = np.linspace(0, len(y), threshold // 2 + 1).astype(np.int64)
+    kept = {0, len(y) - 1}
+    for start, stop in zip(edges[:-1], edges[1:]):
+        bucket = y[start:stop]
+        if not np.isnan(bucket).all():
+            kept.update((start + int(np.nanargmin(bucket)), start + int(np.nanargmax(bucket))))
+    return np.array(sorted(kept))
+
+@pytest.mark.parametrize('threshold', [2, 3, 1000, 2000])
+def test_minmax_handles_every_length_up_to_three_times_the_budget(threshold):
+    x, y = series(3 * threshold + 1)
+    for length in range(threshold + 1, 3 * threshold + 1):
+        indices = minmax(x[:length], y[:length], threshold)
+        assert indices[0] == 0 and indices[-1] == length - 1
+        assert np.all(np.diff(indices) > 0)
+        assert len(indices) <= threshold + 2
+        assert {int(np.argmin(y[:length])), int(np.argmax(y[:length]))} <= set(indices.tolist())
+
+@pytest.mark.parametrize('length', [1001, 1500, 2500, 2999])
+def test_minmax_matches_per_bucket_reference(length):
+    x, y = series(length, seed=length)
+    y[::7] = np.nan
+    y[100:130] = np.nan
+    # Ties keep the first occurrence, like argmin/argmax
+    y[500:520] = 0.0
+    assert minmax(x, y, 1000).tolist() == reference_minmax(y, 1000).tolist()
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+def test_short_series_are_returned_whole(method):
+    x, y = series(50)
+    reduced_x, reduced_y = downsample(x, y, 2000, method)
+    assert reduced_x.tolist() == x.tolist() and reduced_y.tolist() == y.tolist()
+
+def test_lttb_keeps_exactly_threshold_points():
+    x, y = series(5000)
+    for length in (1001, 2500, 5000):
+        indices = lttb(x[:length], y[:length], 1000)
+        assert len(indices) == 1000 and indices[0] == 0 and indices[-1] == length - 1
+        assert np.all(np.diff(indices) > 0)
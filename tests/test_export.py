@@ -0,0 +1,37 @@
+import pathlib
+import pytest
+from batterpy.export import export_reports, output_names
+from batterpy.synthetic import write_synthetic_report
+
+def test_output_names_keep_unique_stems():
+    assert output_names(['reports/a.xml', 'reports/b.bta']) == {'reports/a.xml': 'a', 'reports/b.bta': 'b'}
+
+def test_output_names_disambiguate_shared_stems():
+    paths = ['one/battery-report.xml', 'two/battery-report.xml', 'two/Battery-Report.bta', 'other.xml']
+    names = output_names(paths)
+    assert names['other.xml'] == 'other'
+    assert len({name.lower() for name in names.values()}) == len(paths)
+    assert all(names[path].startswith(pathlib.Path(path).stem + '-') for path in paths[:3])
+    # Names depend only on the path, so re-exporting writes to the same directories
+    assert output_names(paths) == names
+
+def test_output_names_refuse_remaining_clashes():
+    # A file that happens to be named like another report's hashed directory
+    clash = output_names(['a.xml', 'a.bta'])['a.xml'] + '.xml'
+    with pytest.raises(ValueError):
+        output_names(['a.xml', 'a.bta', clash])
+
+def test_reports_with_the_same_stem_do_not_overwrite_each_other(tmp_path):
+    paths = []
+    for machine, seed in (('one', 1), ('two', 2)):
+        path = tmp_path / machine / 'battery-report.xml'
+        path.parent.mkdir()
+        write_synthetic_report(str(path), entries=200, seed=seed)
+        paths.append(str(path))
+    results = export_reports(paths + [paths[0]], str(tmp_path / 'charts'), workers=1)
+    assert sorted(results) == sorted(paths)
+    targets = [results[path] for path in paths]
+    assert None not in targets and targets[0] != targets[1]
+    for target in targets:
+        assert sorted(file.name for file in target.iterdir()) == sorted([f'chart{i}.png' for i in range(1, 10)] + ['report.html'])
+    assert (targets[0] / 'chart1.png').read_bytes() != (targets[1] / 'chart1.png').read_bytes()
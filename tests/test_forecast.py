@@ -0,0 +1,151 @@
+import csv
+import math
+import numpy as np
+import pytest
+from batterpy.archive import write_archive
+from batterpy.forecast import crossing_within, forecast_fleet, health_series, project_threshold_crossing, run_forecast
+from batterpy.usage_table import UsageTable
+
+SYSTEM = {'ComputerName': 'laptop'}
+BATTERIES = [{'Id': 'BAT1', 'SerialNumber': 'S1', 'DesignCapacity': '50000'},
+             {'Id': 'BAT2', 'SerialNumber': 'S2', 'DesignCapacity': '40000'}]
+MONTHS = ['2024-01-01T00:00:00', '2024-02-01T00:00:00', '2024-03-01T00:00:00']
+
+def battery_history(fade=(1000, 2000)):
+    """Monthly per-battery records; BAT1 loses fade[0] and BAT2 fade[1] mWh of full charge capacity a month."""
+    return [{'StartDate': month, 'Id': battery['Id'], 'DesignCapacity': battery['DesignCapacity'],
+             'FullChargeCapacity': str(int(battery['DesignCapacity']) - step * loss)}
+            for step, month in enumerate(MONTHS) for battery, loss in zip(BATTERIES, fade)]
+
+def combined_history(batteries):
+    design = sum(int(battery['DesignCapacity']) for battery in batteries)
+    return [{'StartDate': month, 'DesignCapacity': str(design), 'FullChargeCapacity': str(design - step * 3000)}
+            for step, month in enumerate(MONTHS)]
+
+def report(batteries=BATTERIES, history=(), battery_history_records=(), usage=()):
+    return {'SystemInformation': SYSTEM, 'Batteries': list(batteries), 'History': list(history),
+            'BatteryHistory': list(battery_history_records), 'RecentUsage': UsageTable.from_entries(list(usage))}
+
+def test_per_battery_history_gives_one_series_per_battery():
+    series = health_series(report(history=combined_history(BATTERIES), battery_history_records=battery_history()))
+    assert [(machine, battery) for machine, battery, _, _ in series] == [('laptop|S1|S2', 'S1'), ('laptop|S1|S2', 'S2')]
+    assert series[0][3].tolist() == [100.0, 98.0, 96.0]
+    assert series[1][3].tolist() == [100.0, 95.0, 90.0]
+    assert series[0][2].tolist() == np.array(MONTHS, dtype='datetime64[s]').tolist()
+
+def test_machine_history_is_named_after_a_single_battery():
+    (machine, battery, _, health), = health_series(report(BATTERIES[:1], history=combined_history(BATTERIES[:1])))
+    assert (machine, battery) == ('laptop|S1', 'S1')
+    assert health.tolist() == [100.0, 94.0, 88.0]
+    (_, battery, _, _), = health_series(report(history=combined_history(BATTERIES)))
+    assert battery == ''
+
+def test_recent_usage_is_relative_to_the_total_design_capacity():
+    usage = [{'Timestamp': f'2024-01-0{day}T{hour:02d}:00:00', 'FullChargeCapacity': str(full)}
+             for day, full in ((1, 90000), (2, 81000)) for hour in (1, 13)]
+    (_, battery, _, health), = health_series(report(usage=usage))
+    assert battery == ''
+    assert health.tolist() == [100.0, 90.0]
+
+def test_no_usable_history_gives_no_series():
+    assert health_series(report()) == []
+    assert health_series(report(history=combined_history(BATTERIES)[:1])) == []
+
+def test_run_forecast_writes_a_row_per_battery(tmp_path):
+    reports = tmp_path / 'reports'
+    reports.mkdir()
+    write_archive(report(battery_history_records=battery_history()), str(reports / 'laptop.bta'))
+    single = report(BATTERIES[:1], history=combined_history(BATTERIES[:1]))
+    single['SystemInformation'] = {'ComputerName': 'tablet'}
+    write_archive(single, str(reports / 'tablet.bta'))
+    run_forecast(str(reports), str(tmp_path / 'forecast.csv'), workers=1, model='linear')
+    with open(tmp_path / 'forecast.csv', newline='', encoding='utf-8') as output:
+        rows = list(csv.DictReader(output))
+    assert [(row['Machine'], row['Battery'], row['Points']) for row in rows] == \
+        [('laptop|S1|S2', 'S1', '3'), ('laptop|S1|S2', 'S2', '3'), ('tablet|S1', 'S1', '3')]
+    assert all(row['CrossingDate'] for row in rows)
+
+START = np.datetime64('2024-01-01T00:00:00', 's')
+
+def sampled(health_at, days=range(0, 360, 30)):
+    """A (timestamps, health) series sampled every 30 days from START."""
+    days = np.array(list(days), dtype=np.int64)
+    return START + days * np.timedelta64(1, 'D'), np.array([health_at(day) for day in days], dtype=np.float64)
+
+def test_linear_fade_crosses_on_the_hand_computed_date():
+    # 100% falling 0.01 points a day reaches 80% after 2000 days
+    fit = forecast_fleet([sampled(lambda day: 100 - 0.01 * day)], threshold=80)
+    assert fit['model'][0] == 'linear'
+    assert fit['linear_slope'][0] == pytest.approx(-0.01)
+    assert fit['linear_sse'][0] == pytest.approx(0, abs=1e-18)
+    assert fit['crossing'][0] == np.datetime64('2029-06-23T00:00:00')
+    assert fit['points'][0] == 12 and fit['last_health'][0] == pytest.approx(96.7)
+
+def test_exponential_fade_crosses_on_the_hand_computed_date():
+    # Half-life of 3650 days: 80% is reached after 3650 * log2(1.25) = 1175.0375 days, i.e. 2027-03-21 00:54:04
+    rate = math.log(2) / 3650
+    fit = forecast_fleet([sampled(lambda day: 100 * math.exp(-rate * day))], threshold=80)
+    assert fit['model'][0] == 'exponential'
+    assert fit['exponential_rate'][0] == pytest.approx(rate)
+    expected = np.datetime64('2027-03-21T00:54:04')
+    assert abs(fit['crossing'][0] - expected) <= np.timedelta64(1, 's')
+    assert project_threshold_crossing(fit, 80, 'linear')[0] != fit['crossing'][0]
+
+def test_already_below_the_threshold_crosses_in_the_past():
+    fit = forecast_fleet([sampled(lambda day: 79 - 0.01 * day)], threshold=80, model='linear')
+    # 79% falling 0.01 points a day was at 80% 100 days before START
+    assert fit['crossing'][0] == np.datetime64('2023-09-23T00:00:00')
+
+@pytest.mark.parametrize('health_at', [lambda day: 95.0, lambda day: 85 + 0.01 * day], ids=['flat', 'improving'])
+@pytest.mark.parametrize('model', ['best', 'linear', 'exponential'])
+def test_flat_or_improving_series_never_cross(health_at, model):
+    fit = forecast_fleet([sampled(health_at)], threshold=80, model=model)
+    assert np.isnat(fit['crossing'][0])
+    assert not crossing_within(fit, START, START + np.timedelta64(36500, 'D'))[0]
+
+def test_single_sample_and_empty_inputs():
+    empty = forecast_fleet([])
+    assert all(len(values) == 0 for values in empty.values())
+    single, none = (START + np.array([0]), np.array([90.0])), (START + np.array([], dtype=np.int64), np.array([]))
+    fit = forecast_fleet([single, none, sampled(lambda day: 100 - 0.01 * day)], threshold=80)
+    assert fit['points'].tolist() == [1, 0, 12]
+    assert np.isnan(fit['linear_slope'][:2]).all() and np.isnan(fit['exponential_rate'][:2]).all()
+    assert fit['model'][:2].tolist() == ['', '']
+    assert np.isnat(fit['crossing'][:2]).all()
+    assert fit['last_health'][0] == 90.0 and np.isnan(fit['last_health'][1])
+    # The other batteries in the batch are unaffected
+    assert fit['crossing'][2] == np.datetime64('2029-06-23T00:00:00')
+
+def test_unknown_model_is_rejected():
+    with pytest.raises(ValueError):
+        forecast_fleet([sampled(lambda day: 100.0)], model='quadratic')
+
+def test_grouped_fits_match_per_battery_polyfit():
+    rng = np.random.default_rng(7)
+    series = []
+    for index in range(40):
+        # Different lengths, start dates and noisy fades, with non-positive health and NaT points mixed in
+        count = int(rng.integers(2, 60))
+        days = np.sort(rng.choice(np.arange(1500), count, replace=False)) + int(rng.integers(0, 1000))
+        health = 100 - rng.uniform(0, 0.02) * days + rng.normal(0, 0.5, count)
+        timestamps = START + days * np.timedelta64(1, 'D')
+        if index % 5 == 0:
+            health[0] = -1.0
+            timestamps = np.append(timestamps, np.datetime64('NaT', 's'))
+            health = np.append(health, 90.0)
+        series.append((timestamps, health))
+    fit = forecast_fleet(series, threshold=80)
+    for index, (timestamps, health) in enumerate(series):
+        valid = ~np.isnat(timestamps)
+        days = timestamps[valid].astype(np.int64) / 86400
+        values = health[valid]
+        slope, intercept = np.polyfit(days, values, 1)
+        assert fit['points'][index] == len(days)
+        assert fit['linear_slope'][index] == pytest.approx(slope, rel=1e-6, abs=1e-12)
+        mean_day = fit['linear_mean_day'][index]
+        assert fit['linear_mean_health'][index] == pytest.approx(intercept + slope * mean_day, rel=1e-9)
+        positive = values > 0
+        log_slope, _ = np.polyfit(days[positive], np.log(values[positive]), 1)
+        assert fit['exponential_rate'][index] == pytest.approx(-log_slope, rel=1e-6, abs=1e-12)
+        linear_sse = np.sum((values - np.polyval((slope, intercept), days)) ** 2)
+        assert fit['linear_sse'][index] == pytest.approx(linear_sse, rel=1e-6)
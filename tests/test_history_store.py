@@ -0,0 +1,104 @@
+import xml.etree.ElementTree as ET
+import numpy as np
+import pytest
+from batterpy.cli import main
+from batterpy.archive import open_archive
+from batterpy.history_store import HistoryStore, new_usage
+from batterpy.synthetic import write_synthetic_report
+from batterpy.usage_table import UsageTable
+from batterpy.report_generator import iterparse_report, parse_report_streaming
+from tests.test_report_generator import truncated_report
+
+SYSTEM = {'ComputerName': 'laptop'}
+BATTERIES = [{'SerialNumber': '42'}]
+
+def rows(minutes):
+    return [{'Timestamp': f'2024-01-01T{minute // 60:02d}:{minute % 60:02d}:00Z', 'ChargeCapacity': str(1000 - minute),
+             'Duration': '60'} for minute in minutes]
+
+def test_new_usage_sorts_and_filters():
+    table = UsageTable.from_entries(rows([5, 1, 9, 3, 7]) + [{'Timestamp': '', 'ChargeCapacity': '1'}])
+    result = new_usage(table, np.datetime64('2024-01-01T00:02:00'))
+    assert [row['Timestamp'] for row in result] == ['2024-01-01T00:03:00Z', '2024-01-01T00:05:00Z',
+                                                    '2024-01-01T00:07:00Z', '2024-01-01T00:09:00Z']
+    assert len(new_usage(table, None)) == 5
+
+def test_unsorted_reports_keep_range_queries_correct(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    assert store.ingest(SYSTEM, BATTERIES, rows([30, 10, 20, 0])) == 4
+    # Overlaps the first report and is out of order itself
+    assert store.ingest(SYSTEM, BATTERIES, rows([50, 20, 40, 30, 60, 45])) == 4
+    key = store.machines()[0]
+    stored = store.load(key)
+    timestamps = stored.column('Timestamp')
+    assert np.all(timestamps[1:] > timestamps[:-1])
+    assert [row['Timestamp'] for row in store.load(key, '2024-01-01T00:15:00', '2024-01-01T00:45:00')] == \
+        ['2024-01-01T00:20:00Z', '2024-01-01T00:30:00Z', '2024-01-01T00:40:00Z']
+    assert list(stored) == sorted(rows([0, 10, 20, 30, 40, 45, 50, 60]), key=lambda row: row['Timestamp'])
+
+def test_ingest_report_only_adds_new_rows(tmp_path):
+    report = tmp_path / 'report.xml'
+    write_synthetic_report(str(report), entries=300)
+    store = HistoryStore(str(tmp_path / 'store'))
+    assert store.ingest_report(str(report)) == 300
+    assert store.ingest_report(str(report)) == 0
+    key = store.machines()[0]
+    assert list(store.load(key)) == list(parse_report_streaming(str(report))[3])
+
+def test_ingest_report_stops_after_recent_usage(tmp_path, monkeypatch):
+    report = tmp_path / 'report.xml'
+    write_synthetic_report(str(report), entries=100)
+    seen = []
+    def recording(*args, **kwargs):
+        for section, data in iterparse_report(*args, **kwargs):
+            seen.append(section)
+            yield section, data
+    monkeypatch.setattr('batterpy.history_store.iterparse_report', recording)
+    store = HistoryStore(str(tmp_path / 'store'))
+    assert store.ingest_report(str(report)) == 100
+    assert seen.count('UsageEntry') == 100
+    # Only the first record after RecentUsage is read
+    assert seen[-2] == 'UsageEntry' and seen[-1] != 'UsageEntry'
+    assert 'RuntimeEstimates' not in seen
+
+def test_history_command_skips_unreadable_reports(tmp_path):
+    good = tmp_path / 'good.xml'
+    write_synthetic_report(str(good), entries=100)
+    bad = truncated_report(tmp_path / 'bad.xml')
+    store_dir = tmp_path / 'store'
+    assert main(['history', str(store_dir), str(bad), str(good)]) == 1
+    store = HistoryStore(str(store_dir))
+    assert [len(store.load(key)) for key in store.machines()] == [100]
+    with pytest.raises(ET.ParseError):
+        store.ingest_report(str(bad))
+
+def test_metrics_follow_the_stored_rows(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    assert store.ingest(SYSTEM, BATTERIES, rows([0, 1, 2])) == 3
+    store.ingest(SYSTEM, BATTERIES, rows([3, 4]))
+    key = store.machines()[0]
+    assert store.metrics(key).count == 5
+    assert store.metrics('nobody').count == 0
+    # A zero Duration is rejected by the batch functions, so the running metrics stop for good
+    store.ingest(SYSTEM, BATTERIES, [{**rows([5])[0], 'Duration': '0', 'Discharge': '5'}])
+    store.ingest(SYSTEM, BATTERIES, rows([6]))
+    with pytest.raises(ValueError, match='ZeroDivisionError'):
+        store.metrics(key)
+    assert len(store.load(key)) == 7
+
+def test_rows_keep_the_strings_of_their_report(tmp_path, monkeypatch):
+    store = HistoryStore(str(tmp_path))
+    first = [{**row, 'Ac': 'true', 'EntryType': 'Active'} for row in rows([0, 1, 2])]
+    first[1]['Duration'] = 'n/a'
+    # A later report spells timestamps and flags differently and has an attribute the first did not
+    second = [{'Timestamp': f'2024-01-01T00:0{minute}:00', 'ChargeCapacity': '900', 'Ac': '0', 'EntryType': 'Standby',
+               'Note': 'late'} for minute in (3, 4)]
+    store.ingest(SYSTEM, BATTERIES, first)
+    store.ingest(SYSTEM, BATTERIES, second)
+    key = store.machines()[0]
+    assert store.load(key).to_dicts() == first + second
+    assert store.load(key, '2024-01-01T00:02:00', '2024-01-01T00:04:00').to_dicts() == first[2:] + second[:1]
+    opened = []
+    monkeypatch.setattr('batterpy.history_store.open_archive', lambda path: opened.append(path.name) or open_archive(path))
+    assert store.load(key, '2024-01-01T00:03:00').to_dicts() == second
+    assert opened == ['usage-000000000003.bta']
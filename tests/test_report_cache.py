@@ -0,0 +1,57 @@
+import os
+import pytest
+from batterpy.report_cache import ReportCache, deserialize_report, serialize_report
+from batterpy.report_generator import load_report
+from batterpy.synthetic import write_synthetic_report
+
+@pytest.fixture
+def reports(tmp_path):
+    paths = []
+    for index in range(4):
+        path = tmp_path / 'reports' / f'report{index}.xml'
+        path.parent.mkdir(exist_ok=True)
+        write_synthetic_report(str(path), entries=200, seed=index)
+        paths.append(str(path))
+    return paths
+
+def assert_same_report(actual, expected):
+    assert actual[:3] == expected[:3]
+    assert list(actual[3]) == list(expected[3])
+
+def test_serialization_round_trip(reports):
+    report = load_report(reports[0])
+    assert_same_report(deserialize_report(serialize_report(report)), report)
+
+def test_hits_skip_parsing(reports, tmp_path, monkeypatch):
+    cache = ReportCache(str(tmp_path / 'cache'))
+    first = cache.load(reports[0])
+    monkeypatch.setattr('batterpy.report_cache.load_report', lambda *args: pytest.fail("parsed on a hit"))
+    assert_same_report(cache.load(reports[0]), first)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_eviction_keeps_recently_used_entries_within_cap(reports, tmp_path):
+    cache = ReportCache(str(tmp_path / 'cache'))
+    cache.load(reports[0])
+    entry_size = cache.stats()['bytes']
+    cache.max_bytes = int(entry_size * 2.5)
+    cache.load(reports[1])
+    cache.load(reports[0])
+    cache.load(reports[2])
+    assert cache.stats()['bytes'] <= cache.max_bytes
+    on_disk = sum(entry.stat().st_size for entry in os.scandir(tmp_path / 'cache'))
+    assert on_disk == cache.stats()['bytes']
+    hits = cache.hits
+    cache.load(reports[0])
+    assert cache.hits == hits + 1
+    cache.load(reports[1])
+    assert cache.hits == hits + 1
+
+def test_directory_is_only_scanned_when_opened(reports, tmp_path, monkeypatch):
+    ReportCache(str(tmp_path / 'cache')).load(reports[0])
+    cache = ReportCache(str(tmp_path / 'cache'), max_bytes=1)
+    assert cache.stats()['bytes'] > 0
+    monkeypatch.setattr(os, 'scandir', lambda *args: pytest.fail("directory scanned"))
+    for path in reports:
+        cache.load(path)
+    assert (cache.hits, cache.misses) == (1, len(reports) - 1)
+    assert cache.stats()['bytes'] == 0
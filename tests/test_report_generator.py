@@ -0,0 +1,61 @@
+import re
+import xml.etree.ElementTree as ET
+import pytest
+from batterpy.report_generator import NESTED_SECTIONS, REPORT_SECTIONS, extract_report, iterparse_report, parse_report_sections
+from batterpy.synthetic import write_synthetic_report
+
+HISTORY_ENTRY = re.compile(r'(<HistoryEntry [^>]*DesignCapacity="(\d+)" FullChargeCapacity="(\d+)"[^>]*?) />')
+
+def truncated_report(path, entries: int = 300):
+    """Write a synthetic report cut off in the middle of RecentUsage, as an interrupted powercfg run leaves it."""
+    write_synthetic_report(str(path), entries=entries)
+    text = path.read_text(encoding='utf-8')
+    start, end = text.index('<UsageEntry'), text.index('</RecentUsage>')
+    path.write_text(text[:(start + end) // 2], encoding='utf-8')
+    return path
+
+def test_truncated_report_raises(tmp_path):
+    path = truncated_report(tmp_path / 'report.xml')
+    with pytest.raises(ET.ParseError):
+        parse_report_sections(str(path))
+    records = []
+    with pytest.raises(ET.ParseError):
+        for record in iterparse_report(str(path)):
+            records.append(record)
+    # Records before the truncation are still yielded, so streaming callers can tell how far it got
+    assert any(section == 'UsageEntry' for section, _ in records)
+
+def test_missing_report_raises(tmp_path):
+    with pytest.raises(OSError):
+        parse_report_sections(str(tmp_path / 'missing.xml'))
+
+def nested_history_report(path, batteries: int = 2):
+    """Write a multi-battery synthetic report whose HistoryEntry elements hold one record per battery."""
+    write_synthetic_report(str(path), entries=2000, batteries=batteries)
+
+    def per_battery(match):
+        children = ''.join(f'\n      <Battery Id="BAT{number}" DesignCapacity="{match[2]}" '
+                           f'FullChargeCapacity="{int(match[3]) - number * 100}" CycleCount="{number}" />'
+                           for number in range(1, batteries + 1))
+        return f'{match[1]}>{children}\n    </HistoryEntry>'
+    text, count = HISTORY_ENTRY.subn(per_battery, path.read_text(encoding='utf-8'))
+    assert count
+    path.write_text(text, encoding='utf-8')
+    return path
+
+@pytest.fixture(scope='module')
+def report_pair(tmp_path_factory):
+    path = nested_history_report(tmp_path_factory.mktemp('equivalence') / 'report.xml')
+    return parse_report_sections(str(path)), extract_report(ET.parse(str(path)).getroot())
+
+@pytest.mark.parametrize('section', list(REPORT_SECTIONS) + list(NESTED_SECTIONS.values()))
+def test_streaming_parse_matches_tree_extraction(report_pair, section):
+    streamed, extracted = report_pair
+    assert streamed.keys() == extracted.keys()
+    if section == 'RecentUsage':
+        streamed, extracted = streamed[section].to_dicts(), extracted[section].to_dicts()
+    else:
+        streamed, extracted = streamed[section], extracted[section]
+    # Every section of the report is present, so an empty match cannot pass for a correct one
+    assert extracted
+    assert streamed == extracted
@@ -0,0 +1,82 @@
+import json
+import math
+import pytest
+from batterpy import calculations as calc
+from batterpy.history_store import HistoryStore
+from batterpy.streaming_metrics import StreamingMetrics
+from batterpy.usage_table import UsageTable
+from tests.test_calculations import usage_rows
+
+def assert_matches_batch(metrics: StreamingMetrics, rows):
+    efficiency = calc.calculate_charge_discharge_efficiency(rows)
+    assert metrics.count == len(rows)
+    assert metrics.average_discharge_rate == calc.calculate_average_discharge_rate(rows)
+    assert metrics.charge_discharge_cycles == calc.count_charge_discharge_cycles(rows)
+    assert metrics.total_energy_consumption == sum(calc.calculate_energy_consumption(rows))
+    assert metrics.average_efficiency == (math.fsum(efficiency) / len(efficiency) if efficiency else 0.0)
+    assert metrics.current_capacity == int(rows[-1]['ChargeCapacity'])
+    assert metrics.full_charge_capacity == int(rows[-1]['FullChargeCapacity'])
+    assert metrics.time_to_empty == calc.estimate_time_to_empty(metrics.current_capacity, calc.calculate_average_discharge_rate(rows))
+    if metrics.keep_series:
+        assert metrics.discharge_rates == calc.calculate_discharge_rate(rows)
+        assert metrics.energy_consumption == calc.calculate_energy_consumption(rows)
+        assert metrics.efficiency == efficiency
+
+@pytest.mark.parametrize('seed', range(5))
+def test_update_matches_batch(seed):
+    rows = usage_rows(3000, seed)
+    metrics = StreamingMetrics()
+    for row in rows:
+        metrics.update(row)
+    assert_matches_batch(metrics, rows)
+
+@pytest.mark.parametrize('chunk', [1, 7, 500, 3000])
+def test_extend_in_chunks_matches_batch(chunk):
+    rows = usage_rows(3000, seed=chunk)
+    metrics = StreamingMetrics()
+    for start in range(0, len(rows), chunk):
+        metrics.extend(UsageTable.from_entries(rows[start:start + chunk]))
+    assert_matches_batch(metrics, rows)
+
+def test_mixed_update_and_extend_matches_batch():
+    rows = usage_rows(1000, seed=11)
+    metrics = StreamingMetrics(keep_series=False)
+    metrics.extend(rows[:100])
+    metrics.extend(UsageTable.from_entries(rows[100:700]))
+    for row in rows[700:]:
+        metrics.update(row)
+    assert_matches_batch(metrics, rows)
+
+def test_state_round_trip():
+    rows = usage_rows(1000, seed=5)
+    metrics = StreamingMetrics()
+    metrics.extend(UsageTable.from_entries(rows[:600]))
+    restored = StreamingMetrics.from_state(json.loads(json.dumps(metrics.state())))
+    restored.extend(UsageTable.from_entries(rows[600:]))
+    assert_matches_batch(restored, rows)
+
+def test_rejected_entries_leave_state_unchanged():
+    rows = usage_rows(20)
+    metrics = StreamingMetrics()
+    metrics.extend(UsageTable.from_entries(rows[:10]))
+    before = metrics.state()
+    with pytest.raises(ZeroDivisionError):
+        metrics.update({**rows[10], 'Duration': '0'})
+    with pytest.raises(KeyError):
+        metrics.update({'Duration': '10'})
+    with pytest.raises(ZeroDivisionError):
+        metrics.extend(UsageTable.from_entries([rows[10], {**rows[11], 'Duration': '0'}]))
+    with pytest.raises(KeyError):
+        metrics.extend(UsageTable.from_entries([rows[10], {'Duration': '10'}]))
+    assert metrics.state() == before
+
+def test_history_store_keeps_running_metrics(tmp_path):
+    rows = usage_rows(1200, seed=8)
+    store = HistoryStore(str(tmp_path))
+    system_info = {'ComputerName': 'laptop'}
+    battery_info = [{'SerialNumber': '42'}]
+    # Successive reports overlap the previous one
+    for end in (400, 900, 1200):
+        store.ingest(system_info, battery_info, rows[max(0, end - 600):end])
+    key = store.machines()[0]
+    assert_matches_batch(store.metrics(key), rows)
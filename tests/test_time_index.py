@@ -0,0 +1,128 @@
+import matplotlib.dates as mdates
+import numpy as np
+import pytest
+from batterpy.graph_generator import _time_label, compute_chart_data
+from batterpy.time_index import UsageIndex
+from batterpy.usage_table import UsageTable, parse_utc_offset
+
+def table(timestamps):
+    return UsageTable.from_entries([{'Timestamp': timestamp, 'ChargeCapacity': str(1000 + position)}
+                                    for position, timestamp in enumerate(timestamps)])
+
+def seconds(value: str) -> np.datetime64:
+    return np.datetime64(value, 's')
+
+@pytest.mark.parametrize('text, expected', [
+    ('2024-03-10T12:00:00Z', '2024-03-10T12:00:00'),
+    ('2024-03-10T12:00:00+00:00', '2024-03-10T12:00:00'),
+    ('2024-03-10T12:00:00', '2024-03-10T12:00:00'),
+    ('2024-03-10T12:00:00+05:30', '2024-03-10T06:30:00'),
+    ('2024-03-10T12:00:00+0530', '2024-03-10T06:30:00'),
+    ('2024-03-10T12:00:00-07:00', '2024-03-10T19:00:00'),
+    # Offsets that move the timestamp across midnight and a year boundary
+    ('2024-03-10T02:00:00+05:00', '2024-03-09T21:00:00'),
+    ('2023-12-31T20:00:00-07:00', '2024-01-01T03:00:00'),
+], ids=['Z', 'zero', 'naive', 'positive', 'positive-compact', 'negative', 'previous-day', 'next-year'])
+def test_timestamps_parse_to_utc_and_round_trip(text, expected):
+    usage = table([text])
+    assert usage.column('Timestamp')[0] == seconds(expected)
+    assert usage.to_dicts()[0]['Timestamp'] == text
+
+@pytest.mark.parametrize('text, expected', [
+    ('-07:00:00', -7 * 3600),
+    ('05:30:00', 5 * 3600 + 30 * 60),
+    ('+05:30', 5 * 3600 + 30 * 60),
+    ('00:00:00', 0),
+    ('-00:30:00', -30 * 60),
+    ('PT-7H', -7 * 3600),
+    ('PT5H30M', 5 * 3600 + 30 * 60),
+    ('-PT3H', -3 * 3600),
+    ('PT0S', 0),
+    ('', 0),
+    (None, 0),
+    ('local', 0),
+])
+def test_parse_utc_offset(text, expected):
+    assert parse_utc_offset(text) == np.timedelta64(expected, 's')
+
+@pytest.mark.parametrize('offset, label', [
+    (-7 * 3600, 'Local time (UTC-07:00)'),
+    (5 * 3600 + 30 * 60, 'Local time (UTC+05:30)'),
+    (0, 'Local time (UTC+00:00)'),
+    (-30 * 60, 'Local time (UTC-00:30)'),
+])
+def test_time_label(offset, label):
+    assert _time_label(np.timedelta64(offset, 's')) == label
+
+@pytest.mark.parametrize('utc_offset', ['-07:00:00', '05:30:00', '00:00:00'])
+def test_chart_timestamps_are_shifted_to_local_time(utc_offset):
+    usage = table(['2024-01-01T00:00:00Z', '2024-01-01T06:00:00-02:00'])
+    data = compute_chart_data(usage, [], {'UtcOffset': utc_offset})
+    expected = np.array(['2024-01-01T00:00:00', '2024-01-01T08:00:00'], dtype='datetime64[s]') + parse_utc_offset(utc_offset)
+    np.testing.assert_array_equal(data['timestamps'], mdates.date2num(expected))
+
+def test_not_a_time_rows_are_left_out():
+    usage = table(['2024-01-01T00:02:00Z', 'bogus', '2024-01-01T00:00:00Z', '', '2024-01-01T00:01:00Z'])
+    index = UsageIndex(usage)
+    assert len(index) == 3
+    assert index.rows.tolist() == [2, 4, 0]
+    assert [row['Timestamp'] for row in index.window()] == \
+        ['2024-01-01T00:00:00Z', '2024-01-01T00:01:00Z', '2024-01-01T00:02:00Z']
+    assert index.aggregates('hour')['count'].tolist() == [3]
+
+@pytest.mark.parametrize('timestamps', [['bogus', ''], []], ids=['all-nat', 'empty'])
+def test_index_without_timestamps(timestamps):
+    index = UsageIndex(table(timestamps))
+    assert len(index) == 0
+    assert len(index.window('2024-01-01', '2025-01-01')) == 0
+    assert len(index.last(np.timedelta64(1, 'h'))) == 0
+    assert len(index.aggregates('day')['start']) == 0
+
+# Sorted and contiguous, then shuffled with a NaT row so the take path is used as well
+MINUTES = ['2024-01-01T00:00:00Z', '2024-01-01T00:01:00Z', '2024-01-01T02:02:00+02:00', '2024-01-01T00:03:00Z']
+
+@pytest.mark.parametrize('timestamps', [MINUTES, [MINUTES[3], 'bogus', MINUTES[1], MINUTES[0], MINUTES[2]]],
+                         ids=['contiguous', 'unordered'])
+@pytest.mark.parametrize('start, end, expected', [
+    ('2024-01-01T00:01:00', '2024-01-01T00:03:00', [1, 2]),
+    ('2024-01-01T00:00:59', '2024-01-01T00:03:01', [1, 2, 3]),
+    ('2024-01-01T00:01:01', '2024-01-01T00:02:00', []),
+    ('2024-01-01T00:03:00', '2024-01-01T00:01:00', []),
+    (None, '2024-01-01T00:00:00', []),
+    ('2024-01-01T00:03:00', None, [3]),
+    (None, None, [0, 1, 2, 3]),
+])
+def test_window_includes_start_and_excludes_end(timestamps, start, end, expected):
+    index = UsageIndex(table(timestamps))
+    assert [row['Timestamp'] for row in index.window(start, end)] == [MINUTES[position] for position in expected]
+    lo, hi = index.bounds(start, end)
+    assert hi - lo == len(expected)
+
+def test_window_accepts_datetime64_bounds():
+    index = UsageIndex(table(MINUTES))
+    assert len(index.window(seconds('2024-01-01T00:02:00'), np.datetime64('2024-01-01T00:03'))) == 1
+
+def test_last_includes_the_entry_exactly_one_duration_back():
+    index = UsageIndex(table(MINUTES))
+    assert [row['Timestamp'] for row in index.last(np.timedelta64(2, 'm'))] == MINUTES[1:]
+    assert [row['Timestamp'] for row in index.last(np.timedelta64(0, 's'))] == MINUTES[3:]
+
+def test_weeks_start_on_monday_in_utc():
+    # 2024-01-01 is a Monday; the second entry is Monday 01:00 local time but still Sunday in UTC
+    usage = table(['2023-12-31T23:59:59Z', '2024-01-01T01:00:00+02:00', '2024-01-01T00:00:00Z',
+                   '2024-01-07T23:59:59Z', '2024-01-08T00:00:00Z'])
+    weeks = UsageIndex(usage).aggregates('week')
+    assert weeks['start'].tolist() == [seconds('2023-12-25T00:00:00').item(), seconds('2024-01-01T00:00:00').item(),
+                                       seconds('2024-01-08T00:00:00').item()]
+    assert weeks['count'].tolist() == [2, 2, 1]
+
+def test_aggregates_select_the_buckets_overlapping_the_range():
+    usage = table([f'2024-01-0{day}T12:00:00Z' for day in range(1, 6)])
+    index = UsageIndex(usage)
+    def days(start, end):
+        return [str(value)[:10] for value in index.aggregates('day', start, end)['start']]
+    assert days('2024-01-02T00:00:00', '2024-01-04T00:00:00') == ['2024-01-02', '2024-01-03']
+    # A start inside a bucket keeps that bucket; an end on a bucket boundary drops the bucket it begins
+    assert days('2024-01-02T23:59:59', '2024-01-04T00:00:01') == ['2024-01-02', '2024-01-03', '2024-01-04']
+    assert days('2024-01-05T00:00:00', None) == ['2024-01-05']
+    assert days(None, '2024-01-01T00:00:00') == []
@@ -0,0 +1,106 @@
+import json
+import pytest
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from batterpy import tracing
+from batterpy.graph_generator import CHARTS, GraphManager
+from batterpy.report_generator import parse_report_streaming
+from batterpy.synthetic import write_synthetic_report
+
+@tracing.traced('outer')
+def outer(value: int) -> int:
+    with tracing.span('inner', value=value):
+        return value * 2
+
+@pytest.fixture(autouse=True)
+def no_tracer():
+    tracing.disable()
+    yield
+    tracing.disable()
+
+def test_traced_functions_write_complete_events(tmp_path):
+    tracer = tracing.enable()
+    assert tracing.enable() is tracer
+    assert outer(21) == 42
+    assert outer(1) == 2
+    path = tmp_path / 'trace.json'
+    tracer.write_chrome_trace(str(path))
+    events = json.loads(path.read_text(encoding='utf-8'))['traceEvents']
+    assert [event['name'] for event in events] == ['inner', 'outer', 'inner', 'outer']
+    assert all(event['ph'] == 'X' and event['dur'] >= 0 for event in events)
+    assert [event['args'] for event in events if event['name'] == 'inner'] == [{'value': 21}, {'value': 1}]
+    assert 'args' not in events[1]
+    # The inner span lies within the function's span
+    inner, wrapper = events[:2]
+    assert wrapper['ts'] <= inner['ts'] and inner['ts'] + inner['dur'] <= wrapper['ts'] + wrapper['dur']
+    assert tracer.summary()['outer']['count'] == 2
+
+def test_disabled_tracing_records_nothing(tmp_path):
+    assert outer(2) == 4
+    assert tracing.span('inner') is tracing.span('other')
+    assert tracing.active_tracer() is None
+    tracer = tracing.enable()
+    assert tracer.events == []
+    assert tracing.disable() is tracer
+    assert outer(3) == 6
+    assert tracer.events == []
+
+def test_tracing_to_writes_the_trace_at_the_end(tmp_path):
+    path = tmp_path / 'trace.json'
+    with tracing.tracing_to(str(path)) as tracer:
+        outer(5)
+        assert not path.exists()
+    assert tracing.active_tracer() is None
+    assert [event['name'] for event in json.loads(path.read_text(encoding='utf-8'))['traceEvents']] == ['inner', 'outer']
+    assert len(tracer.events) == 2
+    with tracing.tracing_to(None) as tracer:
+        assert tracer is None and tracing.active_tracer() is None
+
+class IdleCanvas:
+    """Stands in for FigureCanvasTkAgg: draws with Agg and queues after_idle callbacks until run_idle."""
+
+    def __init__(self, figure: Figure):
+        self.agg = FigureCanvasAgg(figure)
+        self.draws = 0
+        self.idle = []
+
+    def draw(self):
+        self.draws += 1
+        self.agg.draw()
+
+    def get_tk_widget(self):
+        return self
+
+    def after_idle(self, callback):
+        self.idle.append(callback)
+
+    def run_idle(self):
+        callbacks, self.idle = self.idle, []
+        for callback in callbacks:
+            callback()
+
+def test_graph_manager_traces_the_deferred_draws(tmp_path):
+    report = tmp_path / 'report.xml'
+    write_synthetic_report(str(report), entries=200)
+    report_info, _, battery_info, usage = parse_report_streaming(str(report))
+    figures = [Figure() for _ in CHARTS]
+    canvases = [IdleCanvas(figure) for figure in figures]
+    manager = GraphManager(figures, canvases)
+    tracer = tracing.enable()
+    manager.set_visible([0, 2])
+    manager.update(usage, battery_info, report_info)
+    manager.update(usage, battery_info, report_info)
+    # Nothing is drawn until the event loop is idle, and a pending draw is not queued twice
+    assert [len(canvas.idle) for canvas in canvases[:3]] == [1, 0, 1]
+    assert not any(event['name'].startswith('canvas.draw') for event in tracer.events)
+    for canvas in canvases:
+        canvas.run_idle()
+    assert [canvas.draws for canvas in canvases[:3]] == [1, 0, 1]
+    names = [event['name'] for event in tracer.events]
+    assert [name for name in names if name.startswith('canvas.draw')] == ['canvas.draw[1]', 'canvas.draw[3]']
+    assert names.count('render_figure') == 2 and names.count('GraphManager.update') == 2
+    # The canvases themselves are left as they were
+    assert all('draw' not in vars(canvas) for canvas in canvases)
+    manager.set_visible([1])
+    canvases[1].run_idle()
+    assert canvases[1].draws == 1
@@ -0,0 +1,93 @@
+import warnings
+import numpy as np
+import pytest
+from batterpy.report_generator import get_recent_usage, parse_xml, BATTERY_NS
+from batterpy.usage_table import UsageTable, decode_raw, encode_raw
+
+ROWS = [
+    {'Timestamp': '2024-01-01T00:00:00Z', 'Duration': '60', 'Ac': 'true', 'ChargeCapacity': '100', 'EntryType': 'Active'},
+    {'Timestamp': '2024-01-01T00:01:00.250Z', 'Duration': '', 'Ac': 'false', 'ChargeCapacity': '090'},
+    {'Timestamp': '2024-01-01T02:02:00+02:00', 'Duration': 'abc', 'Ac': '1', 'ChargeCapacity': '80', 'Discharge': '5'},
+    {'Timestamp': 'bogus', 'Duration': '5', 'Ac': 'maybe', 'ChargeCapacity': '70'},
+]
+
+def test_rows_round_trip_original_strings():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        table = UsageTable.from_entries(ROWS)
+    assert list(table) == ROWS
+    assert table.to_dicts() == ROWS
+
+def test_typed_columns():
+    table = UsageTable.from_entries(ROWS)
+    expected = np.array(['2024-01-01T00:00:00', '2024-01-01T00:01:00', '2024-01-01T00:02:00', 'NaT'], dtype='datetime64[s]')
+    np.testing.assert_array_equal(table.column('Timestamp'), expected)
+    np.testing.assert_array_equal(table.column('ChargeCapacity'), [100, 90, 80, 70])
+    np.testing.assert_array_equal(table.column('Ac'), [True, False, True, False])
+    assert table.column('EntryType').tolist() == ['Active', '', '', '']
+
+def test_unconvertible_cells_are_masked():
+    table = UsageTable.from_entries(ROWS)
+    np.testing.assert_array_equal(table.mask('Duration'), [True, False, False, True])
+    np.testing.assert_array_equal(table.mask('Ac'), [True, True, True, False])
+    np.testing.assert_array_equal(table.mask('Timestamp'), [True, True, True, False])
+    np.testing.assert_array_equal(table.mask('Discharge'), [False, False, True, False])
+
+def test_take_and_slice_keep_original_strings():
+    table = UsageTable.from_entries(ROWS)
+    assert list(table[1:3]) == ROWS[1:3]
+    assert list(table.take([3, 0])) == [ROWS[3], ROWS[0]]
+    assert list(table.take(np.array([False, True, False, True]))) == [ROWS[1], ROWS[3]]
+
+def test_empty():
+    table = UsageTable.from_entries([])
+    assert len(table) == 0
+    assert list(table) == []
+    assert not table.has_column('Timestamp')
+
+def test_infer_types():
+    records = [{'SerialNumber': '007', 'StartDate': '2024-01-01', 'DesignCapacity': '5000'},
+               {'SerialNumber': '12', 'StartDate': '2024-02-01', 'DesignCapacity': '4900'}]
+    table = UsageTable.from_entries(records, infer_types=True)
+    assert table.columns['DesignCapacity'].dtype == np.int64
+    assert table.columns['StartDate'].dtype.kind == 'M'
+    assert 'SerialNumber' in table.categories
+    assert list(table) == records
+    assert 'StartDate' in UsageTable.from_entries(records).categories
+
+def test_concat_keeps_every_row():
+    # Different spellings of the timestamps and flags, a second EntryType vocabulary and an extra attribute
+    other = [{'Timestamp': '2024-01-02T00:00:00', 'Ac': '0', 'EntryType': 'Standby', 'ChargeCapacity': '60', 'Note': 'x'},
+             {'Timestamp': '2024-01-02T00:01:00+01:00', 'Ac': '1', 'EntryType': 'Active', 'ChargeCapacity': '50'}]
+    tables = [UsageTable.from_entries(ROWS), UsageTable.from_entries([]), UsageTable.from_entries(other)]
+    joined = UsageTable.concat(tables)
+    assert joined.to_dicts() == ROWS + other
+    assert joined.categories['EntryType'] == ['Active', 'Standby']
+    np.testing.assert_array_equal(joined.column('Timestamp')[-2:], np.array(['2024-01-02T00:00:00', '2024-01-01T23:01:00'],
+                                                                           dtype='datetime64[s]'))
+    np.testing.assert_array_equal(joined.mask('Discharge'), [False, False, True, False, False, False])
+    assert joined[1:5].to_dicts() == (ROWS + other)[1:5]
+    assert UsageTable.concat([tables[0]]) is tables[0]
+    assert len(UsageTable.concat([])) == 0
+
+def test_raw_round_trip():
+    raw = UsageTable.from_entries(ROWS).raw
+    assert decode_raw(encode_raw(raw)) == raw
+    assert decode_raw(encode_raw(raw), 1, 3) == {key: {row - 1: value for row, value in cells.items() if 1 <= row < 3}
+                                                 for key, cells in raw.items() if any(1 <= row < 3 for row in cells)}
+
+def test_concat_rejects_mixed_column_types():
+    typed = UsageTable.from_entries([{'Cycle': '1'}], infer_types=True)
+    with pytest.raises(ValueError):
+        UsageTable.concat([typed, UsageTable.from_entries([{'Cycle': 'x'}])])
+
+def test_report_with_bad_cells_loads(tmp_path):
+    report = tmp_path / 'report.xml'
+    report.write_text(f'<BatteryReport xmlns="{BATTERY_NS[1:-1]}"><RecentUsage>'
+                      '<UsageEntry Timestamp="2024-01-01T00:00:00Z" Duration="" ChargeCapacity="10" />'
+                      '<UsageEntry Timestamp="2024-01-01T00:10:00Z" Duration="600" ChargeCapacity="n/a" />'
+                      '</RecentUsage></BatteryReport>', encoding='utf-8')
+    usage = get_recent_usage(parse_xml(str(report)), BATTERY_NS)
+    assert usage[0] == {'Timestamp': '2024-01-01T00:00:00Z', 'Duration': '', 'ChargeCapacity': '10'}
+    assert usage[1]['ChargeCapacity'] == 'n/a'
+    np.testing.assert_array_equal(usage.mask('ChargeCapacity'), [True, False])